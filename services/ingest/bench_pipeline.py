@@ -0,0 +1,160 @@
+# /home/melynxis/solace/services/ingest/bench_pipeline.py
+"""
+Throughput harness: sequential ingest_wiki_page vs wiki_pipeline, against a
+local fake MediaWiki api.php and fake Weaviate (/v1/objects and
+/v1/batch/objects) with configurable per-request latency.
+
+The fake api.php mimics TextExtracts paging: one full extract per response
+(20 with exintro), the rest handed out through `continue`.
+
+    python bench_pipeline.py --pages 500 --wiki-latency 40 --weaviate-latency 15
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse, json, threading, time
+
+import wiki_ingest
+import wiki_pipeline
+
+class FakeServers:
+    def __init__(self, wiki_latency: float, weaviate_latency: float, per_object: float):
+        self.wiki_latency = wiki_latency
+        self.weaviate_latency = weaviate_latency
+        self.per_object = per_object
+        self.objects = 0
+        self.requests = {"wiki": 0, "objects": 0, "batch": 0}
+        self.lock = threading.Lock()
+
+    def page(self, title: str) -> dict:
+        n = abs(hash(title)) % 10_000_000
+        return {"pageid": n, "ns": 0, "title": title, "revisions": [{"revid": n * 7 + 1}],
+                "extract": f"{title}. " + "Lorem ipsum dolor sit amet. " * 200}
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: dict | list, status: int = 200):
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                time.sleep(fake.wiki_latency)
+                with fake.lock:
+                    fake.requests["wiki"] += 1
+                titles = q.get("titles", "").split("|")
+                per_response = 20 if "exintro" in q else 1
+                offset = int(q.get("excontinue", 0))
+                pages = []
+                for i, t in enumerate(titles):
+                    p = fake.page(t)
+                    if not offset <= i < offset + per_response:
+                        p.pop("extract")
+                    pages.append(p)
+                body: dict = {"batchcomplete": offset + per_response >= len(titles)}
+                if q.get("formatversion") == "2":
+                    body["query"] = {"pages": pages}
+                else:
+                    body["query"] = {"pages": {str(p["pageid"]): p for p in pages}}
+                if offset + per_response < len(titles):
+                    body["continue"] = {"excontinue": offset + per_response, "continue": "||"}
+                self._send(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                if self.path == "/v1/batch/objects":
+                    objs = payload["objects"]
+                    time.sleep(fake.weaviate_latency + fake.per_object * len(objs))
+                    with fake.lock:
+                        fake.requests["batch"] += 1
+                        fake.objects += len(objs)
+                    self._send([{**o, "result": {}} for o in objs])
+                else:
+                    time.sleep(fake.weaviate_latency + fake.per_object)
+                    with fake.lock:
+                        fake.requests["objects"] += 1
+                        fake.objects += 1
+                    self._send({**payload, "id": payload.get("id", "00000000-0000-0000-0000-000000000000")})
+
+            do_PUT = do_POST
+
+        return Handler
+
+    def serve(self) -> tuple[ThreadingHTTPServer, str]:
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+def run_sequential(base: str, titles: list[str]) -> float:
+    wiki_ingest.WIKI_API = f"{base}/w/api.php"
+    wiki_ingest.WEAVIATE_URL = base
+    wiki_ingest.record_ingest_mysql = lambda title, meta: None  # no MySQL in the harness
+    t0 = time.perf_counter()
+    for t in titles:
+        wiki_ingest.ingest_wiki_page(t)
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--sequential-pages", type=int, default=100, help="the sequential baseline is slow; sample fewer")
+    ap.add_argument("--wiki-latency", type=float, default=40, help="ms per api.php request")
+    ap.add_argument("--weaviate-latency", type=float, default=15, help="ms per Weaviate request")
+    ap.add_argument("--per-object", type=float, default=0.2, help="extra ms per object written")
+    ap.add_argument("--fetch-workers", type=int, default=4)
+    ap.add_argument("--push-workers", type=int, default=2)
+    ap.add_argument("--batch-size", type=int, default=100)
+    ap.add_argument("--intro-only", action="store_true")
+    ap.add_argument("--embed", metavar="SPEC", help="add the chunk+embed stage, e.g. hashing:384 (run twice to see the cache)")
+    ap.add_argument("--embed-workers", type=int, default=None)
+    ap.add_argument("--embed-cache", default=None, help="cache dir (default: $EMBED_CACHE_DIR)")
+    args = ap.parse_args()
+
+    fake = FakeServers(args.wiki_latency / 1000, args.weaviate_latency / 1000, args.per_object / 1000)
+    srv, base = fake.serve()
+    titles = [f"Page {i}" for i in range(args.pages)]
+    try:
+        n_seq = min(args.sequential_pages, args.pages)
+        seq = run_sequential(base, titles[:n_seq])
+        print(f"sequential  pages={n_seq:<6} {seq:7.2f}s  {n_seq / seq:8.1f} pages/s  "
+              f"(wiki={fake.requests['wiki']} objects={fake.requests['objects']})")
+
+        fake.requests = {"wiki": 0, "objects": 0, "batch": 0}
+        cfg = wiki_pipeline.PipelineConfig(
+            wiki_api=f"{base}/w/api.php", weaviate_url=base, intro_only=args.intro_only,
+            fetch_workers=args.fetch_workers, push_workers=args.push_workers, batch_size=args.batch_size,
+        )
+        stage = None
+        if args.embed:
+            import embedding
+            stage = embedding.ChunkEmbedder(args.embed, workers=args.embed_workers,
+                                            cache_dir=args.embed_cache or embedding.EMBED_CACHE_DIR)
+        stats = wiki_pipeline.IngestPipeline(cfg, transform=stage.transform if stage else None).run(titles)
+        if stage:
+            stage.close()
+        print(f"pipeline    pages={stats.pages:<6} {stats.seconds:7.2f}s  {stats.pages_per_second:8.1f} pages/s  "
+              f"(wiki={stats.fetch_requests} batch={stats.batch_requests} objects={stats.objects} "
+              f"errors={len(stats.errors) + stats.object_errors})")
+        if stage:
+            print(f"embed       chunks embedded={stage.embedded} cache hits={stage.cache_hits}")
+        print(f"speedup x{stats.pages_per_second / (n_seq / seq):.1f}")
+    finally:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
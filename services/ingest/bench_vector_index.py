@@ -0,0 +1,102 @@
+# /home/melynxis/solace/services/ingest/bench_vector_index.py
+"""
+Recall/latency of the local vector index (exact and IVF) and, optionally,
+Weaviate on the same corpus. Ground truth is the exact scan.
+
+Queries are stored vectors with a little noise, so every one has a
+meaningful neighbourhood. Point --index at the directory the ingest wrote
+with --local-index to compare against the Weaviate it wrote at the same time:
+
+    python bench_vector_index.py --index /srv/solace/memory-index --weaviate http://localhost:8080
+    python bench_vector_index.py --synthetic 200000 --dim 384 --nprobe 4 8 16 32
+"""
+
+import argparse, os, shutil, statistics, tempfile, time, uuid
+
+import numpy as np
+
+from vector_index import LocalVectorIndex
+from wiki_pipeline import WEAVIATE_APIKEY, make_session
+
+def synthetic_index(path: str, n: int, dim: int, clusters: int = 256, seed: int = 0) -> LocalVectorIndex:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    index = LocalVectorIndex(path, dim)
+    for start in range(0, n, 10_000):
+        m = min(10_000, n - start)
+        vecs = centres[rng.integers(0, clusters, m)] + 2.0 * rng.normal(size=(m, dim)).astype(np.float32)
+        index.upsert([{"id": str(uuid.UUID(int=start + i + 1)), "vector": v,
+                       "properties": {"title": f"synthetic {start + i}", "text": ""}}
+                      for i, v in enumerate(vecs)])
+    return index
+
+def percentiles(samples: list[float]) -> str:
+    q = statistics.quantiles(samples, n=100)
+    return f"p50={q[49] * 1000:7.2f}ms p95={q[94] * 1000:7.2f}ms"
+
+def recall(found: list[set], truth: list[set]) -> float:
+    return sum(len(f & t) for f, t in zip(found, truth)) / sum(len(t) for t in truth)
+
+def weaviate_ids(session, url: str, vector: np.ndarray, k: int) -> set:
+    vec = ",".join(f"{x:.7g}" for x in vector)
+    gql = f"{{ Get {{ Memory(nearVector: {{vector: [{vec}]}}, limit: {k}) {{ _additional {{ id }} }} }} }}"
+    r = session.post(f"{url}/v1/graphql", json={"query": gql}, timeout=30)
+    r.raise_for_status()
+    return {o["_additional"]["id"] for o in r.json()["data"]["Get"]["Memory"]}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--index", help="existing local index dir")
+    src.add_argument("--synthetic", type=int, metavar="N", help="build a throwaway clustered index of N vectors")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, nargs="*", default=[4, 8, 16, 32])
+    ap.add_argument("--nlist", type=int, default=None, help="IVF lists (default sqrt(n)); builds IVF if missing")
+    ap.add_argument("--weaviate", help="also query this Weaviate (same corpus) with nearVector")
+    args = ap.parse_args()
+
+    tmp = None
+    if args.synthetic:
+        tmp = tempfile.mkdtemp(prefix="solace-vi-")
+        t0 = time.perf_counter()
+        index = synthetic_index(tmp, args.synthetic, args.dim)
+        print(f"built {len(index)} x {args.dim} in {time.perf_counter() - t0:.1f}s")
+    else:
+        index = LocalVectorIndex(args.index)
+    try:
+        if args.nprobe and (args.nlist or not os.path.exists(os.path.join(index.dir, "ivf.f32"))):
+            t0 = time.perf_counter()
+            nlist = index.build_ivf(args.nlist)
+            print(f"ivf: {nlist} lists in {time.perf_counter() - t0:.1f}s")
+
+        rng = np.random.default_rng(1)
+        live = index.live_rows()
+        rows = rng.choice(live, size=min(args.queries, len(live)), replace=False)
+        queries = index.vectors(rows) + 0.05 * rng.normal(size=(len(rows), index.dim)).astype(np.float32)
+
+        def run(fn):
+            lat, found = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                found.append(fn(q))
+                lat.append(time.perf_counter() - t0)
+            return lat, found
+
+        lat, exact = run(lambda q: {r for _, r in index.search(q, args.k)})
+        print(f"{'exact':<12} recall@{args.k}=1.000  {percentiles(lat)}  n={len(index)}")
+        truth_ids = [{index.doc(r)["id"] for r in rows_} for rows_ in exact]
+        for nprobe in args.nprobe:
+            lat, found = run(lambda q: {r for _, r in index.search(q, args.k, nprobe=nprobe)})
+            print(f"{'ivf/' + str(nprobe):<12} recall@{args.k}={recall(found, exact):.3f}  {percentiles(lat)}")
+        if args.weaviate:
+            session = make_session(1, WEAVIATE_APIKEY)
+            lat, found = run(lambda q: weaviate_ids(session, args.weaviate.rstrip("/"), q, args.k))
+            print(f"{'weaviate':<12} recall@{args.k}={recall(found, truth_ids):.3f}  {percentiles(lat)}")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# /home/melynxis/solace/services/ingest/embedding.py
+"""
+Chunking and local embedding for the wiki ingest.
+
+  chunk_text       token-bounded, overlapping windows over an extract
+  make_embedder    pluggable embedders, chosen by spec (EMBEDDER env):
+                     st:<model>       sentence-transformers on CPU (default)
+                     hashing[:<dim>]  dependency-free feature hashing; tests/benchmarks
+                     ollama:<model>   an Ollama /api/embed endpoint (OLLAMA_URL), e.g.
+                                      embeddinggemma on the GPU node, see Expansion/embedding.md
+  EmbeddingCache   memory-mapped float32 vectors keyed by chunk hash, so
+                   unchanged text is never embedded twice
+  ChunkEmbedder    pipeline stage: pages -> chunks -> cached/embedded vectors
+                   -> Memory objects carrying "vector"; CPU embedders run in a
+                   process pool with one model instance per worker process.
+                   With index_dir the objects are also written to the local
+                   vector index (vector_index.py) that memory search falls
+                   back to when Weaviate is down
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Sequence
+import fcntl, hashlib, json, logging, os, re, threading
+
+import numpy as np
+
+from wiki_pipeline import Page, memory_object
+
+log = logging.getLogger("solace.ingest.embedding")
+
+EMBEDDER = os.getenv("EMBEDDER", "st:sentence-transformers/all-MiniLM-L6-v2")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.expanduser("~/.cache/solace/embeddings"))
+
+# -----------------------------
+# Chunking
+# -----------------------------
+_TOKEN = re.compile(r"\S+")
+
+def chunk_text(text: str, max_tokens: int = 256, overlap: int = 32) -> list[str]:
+    """
+    Windows of at most max_tokens whitespace tokens, each starting
+    max_tokens - overlap tokens after the previous one. Chunks are slices of
+    the original text, so spacing and punctuation survive.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    spans = [m.span() for m in _TOKEN.finditer(text)]
+    if not spans:
+        return []
+    step = max_tokens - overlap
+    chunks = []
+    for start in range(0, len(spans), step):
+        window = spans[start:start + max_tokens]
+        chunks.append(text[window[0][0]:window[-1][1]])
+        if start + max_tokens >= len(spans):
+            break
+    return chunks
+
+def chunk_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+# -----------------------------
+# Embedders
+# -----------------------------
+class Embedder:
+    name: str = "embedder"
+    dim: int = 0
+    local_cpu: bool = True  # run in the process pool; False = I/O bound, use threads
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+class HashingEmbedder(Embedder):
+    """Signed feature hashing of word unigrams+bigrams, L2-normalised."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            words = re.findall(r"\w+", t.lower())
+            feats = words + [a + " " + b for a, b in zip(words, words[1:])]
+            for f in feats:
+                h = int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little")
+                out[i, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+class SentenceTransformerEmbedder(Embedder):
+    def __init__(self, model: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:  # optional dependency
+            raise RuntimeError("EMBEDDER=st:... needs sentence-transformers (pip install sentence-transformers)") from e
+        self.model = SentenceTransformer(model, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model.replace('/', '_')}"
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+class OllamaEmbedder(Embedder):
+    local_cpu = False
+
+    def __init__(self, model: str, url: str = OLLAMA_URL):
+        import requests
+        self.session = requests.Session()
+        self.url = url.rstrip("/")
+        self.model = model
+        self.name = f"ollama-{model.replace(':', '_')}"
+        self.dim = len(self.embed(["dimension probe"])[0])
+
+    def embed(self, texts):
+        r = self.session.post(f"{self.url}/api/embed", json={"model": self.model, "input": list(texts)}, timeout=120)
+        r.raise_for_status()
+        vecs = np.asarray(r.json()["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.where(norms == 0, 1, norms)
+
+def make_embedder(spec: str = EMBEDDER) -> Embedder:
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(arg or 384))
+    if kind == "st":
+        return SentenceTransformerEmbedder(arg)
+    if kind == "ollama":
+        return OllamaEmbedder(arg)
+    raise ValueError(f"unknown embedder {spec!r} (st:<model>, hashing[:dim], ollama:<model>)")
+
+# One embedder per pool process, built by the initializer.
+_worker_embedder: Optional[Embedder] = None
+
+def _init_worker(spec: str):
+    global _worker_embedder
+    _worker_embedder = make_embedder(spec)
+
+def _embed_in_worker(texts: list[str]) -> np.ndarray:
+    return _worker_embedder.embed(texts)
+
+# -----------------------------
+# Memory-mapped cache
+# -----------------------------
+class EmbeddingCache:
+    """
+    <dir>/<embedder name>/vectors.f32 holds rows of `dim` float32, keys.bin
+    the matching 16-byte chunk hashes, both append-only. The key -> row
+    index is rebuilt from keys.bin on open; vectors are read through a
+    memmap that is re-opened when the file has grown.
+
+    Several ingest processes may share a directory: appends happen under an
+    flock on <dir>/lock, after picking up the rows the others appended, so
+    the two files never interleave.
+    """
+
+    def __init__(self, root: str, name: str, dim: int):
+        self.dim = dim
+        self.dir = os.path.join(root, name)
+        os.makedirs(self.dir, exist_ok=True)
+        self.vec_path = os.path.join(self.dir, "vectors.f32")
+        self.key_path = os.path.join(self.dir, "keys.bin")
+        self.lock_path = os.path.join(self.dir, "lock")
+        meta_path = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)["dim"] != dim:
+                    raise ValueError(f"{self.dir} holds vectors of another dimension")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim}, f)
+        self._lock = threading.Lock()
+        self._index: dict[bytes, int] = {}
+        self._mm: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self):
+        self._index, self._rows = {}, 0
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._catch_up()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        """Index rows appended since we last looked, by us or another process (file lock held)."""
+        rows = os.path.getsize(self.vec_path) // (4 * self.dim) if os.path.exists(self.vec_path) else 0
+        keys = os.path.getsize(self.key_path) // 16 if os.path.exists(self.key_path) else 0
+        # A crash between the two appends leaves one file longer; trust the shorter.
+        n = min(rows, keys)
+        if n > self._rows:
+            with open(self.key_path, "rb") as f:
+                f.seek(self._rows * 16)
+                new = f.read((n - self._rows) * 16)
+            for i in range(n - self._rows):
+                self._index[new[i * 16:(i + 1) * 16]] = self._rows + i
+            self._rows = n
+        for path, size in ((self.vec_path, n * 4 * self.dim), (self.key_path, n * 16)):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+    def __len__(self):
+        return self._rows
+
+    def _view(self) -> np.ndarray:
+        if self._mm is None or self._mm.shape[0] < self._rows:
+            self._mm = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+        return self._mm
+
+    def get_many(self, keys: Sequence[bytes]) -> tuple[np.ndarray, list[int]]:
+        """(vectors with zero rows for misses, indices of the misses)."""
+        out = np.zeros((len(keys), self.dim), dtype=np.float32)
+        with self._lock:
+            rows = [self._index.get(k) for k in keys]
+            hits = [(i, r) for i, r in enumerate(rows) if r is not None]
+            if hits:
+                view = self._view()
+                idx = np.fromiter((r for _, r in hits), dtype=np.int64, count=len(hits))
+                out[[i for i, _ in hits]] = view[idx]
+        misses = [i for i, r in enumerate(rows) if r is None]
+        return out, misses
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._catch_up()
+            fresh = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+            seen = set()
+            fresh = [(k, v) for k, v in fresh if not (k in seen or seen.add(k))]
+            if fresh:
+                with open(self.vec_path, "ab") as f:
+                    f.write(np.stack([v for _, v in fresh]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self.key_path, "ab") as f:
+                    f.write(b"".join(k for k, _ in fresh))
+                for k, _ in fresh:
+                    self._index[k] = self._rows
+                    self._rows += 1
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+# -----------------------------
+# Pipeline stage
+# -----------------------------
+class ChunkEmbedder:
+    """
+    Turns pages into chunk Memory objects with vectors. Safe to call from
+    several fetch threads: cache access is locked and embedding batches from
+    all of them share one worker pool.
+    """
+
+    def __init__(self, spec: str = EMBEDDER, max_tokens: int = 256, overlap: int = 32,
+                 workers: Optional[int] = None, batch_size: int = 64, cache_dir: Optional[str] = EMBED_CACHE_DIR,
+                 index_dir: Optional[str] = None):
+        self.spec = spec
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.batch_size = batch_size
+        probe = make_embedder(spec)
+        self.dim = probe.dim
+        self.name = probe.name
+        self.cache = EmbeddingCache(cache_dir, probe.name, probe.dim) if cache_dir else None
+        self.index = None
+        if index_dir:
+            from vector_index import LocalVectorIndex
+            self.index = LocalVectorIndex(index_dir, probe.dim)
+        workers = workers or os.cpu_count() or 1
+        self.pool: Executor
+        if probe.local_cpu and workers > 1:
+            self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(spec,))
+        else:
+            self._local = probe
+            self.pool = ThreadPoolExecutor(max(1, workers if not probe.local_cpu else 1))
+        self.embedded = 0
+        self.cache_hits = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def signature(self) -> str:
+        """Changes whenever chunk boundaries or vectors would; feeds the delta content hash."""
+        return f"chunks:{self.max_tokens}/{self.overlap}|{self.name}"
+
+    def _embed_batch(self, texts: list[str]):
+        if isinstance(self.pool, ProcessPoolExecutor):
+            return self.pool.submit(_embed_in_worker, texts)
+        return self.pool.submit(self._local.embed, texts)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        keys = [chunk_key(t) for t in texts]
+        if self.cache is not None:
+            vectors, misses = self.cache.get_many(keys)
+        else:
+            vectors, misses = np.zeros((len(texts), self.dim), dtype=np.float32), list(range(len(texts)))
+        futures = [(idx, self._embed_batch([texts[i] for i in idx]))
+                   for idx in (misses[j:j + self.batch_size] for j in range(0, len(misses), self.batch_size))]
+        for idx, fut in futures:
+            vectors[idx] = fut.result()
+        if misses and self.cache is not None:
+            self.cache.put_many([keys[i] for i in misses], vectors[misses])
+        with self._stats_lock:
+            self.embedded += len(misses)
+            self.cache_hits += len(texts) - len(misses)
+        return vectors
+
+    def objects_for(self, pages: list[Page]) -> list[list[dict]]:
+        """Chunk objects per page, aligned with `pages`; one embed call for all chunks."""
+        per_page = [chunk_text(p.text, self.max_tokens, self.overlap) for p in pages]
+        flat = [c for chunks in per_page for c in chunks]
+        vectors = self.embed(flat) if flat else np.zeros((0, self.dim), dtype=np.float32)
+        out, n = [], 0
+        for page, chunks in zip(pages, per_page):
+            objs = []
+            for i, text in enumerate(chunks):
+                obj = memory_object(page, chunk=i, text=text)
+                obj["properties"]["metadata"]["chunks"] = len(chunks)
+                obj["vector"] = vectors[n].tolist()
+                objs.append(obj)
+                n += 1
+            out.append(objs)
+        if self.index is not None:
+            self.index.upsert([o for objs in out for o in objs])
+        return out
+
+    def transform(self, pages: list[Page]) -> list[dict]:
+        """IngestPipeline transform: flat list of chunk objects."""
+        return [o for objs in self.objects_for(pages) for o in objs]
+
+    def close(self):
+        self.pool.shutdown()
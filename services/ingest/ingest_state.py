@@ -0,0 +1,82 @@
+# /home/melynxis/solace/services/ingest/ingest_state.py
+"""
+Per-title ingest state in MySQL (wiki_ingest_state, created by
+tools/ingest_db_migrate_v1.sh): the revision and content hash last written
+to Weaviate, how many chunk objects that write produced, and the
+chunking/embedding signature it was written with (tools/ingest_db_migrate_v2_signature.sh).
+"""
+
+from dataclasses import dataclass
+from sqlalchemy import bindparam, create_engine, text
+from typing import Iterable, Optional
+import os
+
+MYSQL_URL = os.getenv("MYSQL_URL") or (
+    f"mysql+pymysql://{os.getenv('MYSQL_USER', 'solace_app')}:{os.getenv('MYSQL_PASSWORD', 'solace_app_pwd')}"
+    f"@{os.getenv('MYSQL_HOST', '127.0.0.1')}:{os.getenv('MYSQL_PORT', '3306')}/{os.getenv('MYSQL_DB', 'solace')}"
+)
+
+@dataclass
+class TitleState:
+    title: str
+    pageid: Optional[int]
+    revid: Optional[int]
+    content_hash: Optional[str]
+    chunks: int = 1
+    signature: Optional[str] = None
+
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(MYSQL_URL, pool_pre_ping=True, pool_recycle=300, future=True)
+    return _engine
+
+class IngestStateStore:
+    def __init__(self, engine=None):
+        self.engine = engine or get_engine()
+
+    def get_many(self, titles: Iterable[str]) -> dict[str, TitleState]:
+        titles = list(titles)
+        if not titles:
+            return {}
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT title, pageid, revid, content_hash, chunks, signature FROM wiki_ingest_state "
+                     "WHERE title IN :titles")
+                    .bindparams(bindparam("titles", expanding=True)),
+                {"titles": titles},
+            ).mappings().all()
+        return {r["title"]: TitleState(**r) for r in rows}
+
+    def upsert_many(self, states: list[TitleState]):
+        """One multi-row INSERT ... ON DUPLICATE KEY UPDATE."""
+        if not states:
+            return
+        params, values = {}, []
+        for n, st in enumerate(states):
+            values.append(f"(:t{n}, :p{n}, :r{n}, :h{n}, :c{n}, :s{n}, UTC_TIMESTAMP())")
+            params.update({f"t{n}": st.title, f"p{n}": st.pageid, f"r{n}": st.revid,
+                           f"h{n}": st.content_hash, f"c{n}": st.chunks, f"s{n}": st.signature})
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO wiki_ingest_state (title, pageid, revid, content_hash, chunks, signature, ingested_at) VALUES "
+                    + ", ".join(values)
+                    + " ON DUPLICATE KEY UPDATE pageid=VALUES(pageid), revid=VALUES(revid), "
+                      "content_hash=VALUES(content_hash), chunks=VALUES(chunks), signature=VALUES(signature), "
+                      "ingested_at=VALUES(ingested_at)"
+                ),
+                params,
+            )
+
+    def touch_revisions(self, revs: dict[str, int], signature: Optional[str] = None):
+        """Record a new revid (and the signature it was checked under) for titles whose text hashed the same."""
+        if not revs:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("UPDATE wiki_ingest_state SET revid=:r, signature=:s, ingested_at=UTC_TIMESTAMP() WHERE title=:t"),
+                [{"t": t, "r": r, "s": signature} for t, r in revs.items()],
+            )
@@ -0,0 +1,4 @@
+import os, sys
+
+# The ingest modules import each other as top-level modules (python wiki_delta.py).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+import hashlib, multiprocessing
+
+import numpy as np
+
+from embedding import EmbeddingCache
+
+DIM = 4
+
+def key(i: int) -> bytes:
+    return hashlib.blake2b(str(i).encode(), digest_size=16).digest()
+
+def vec(i: int) -> np.ndarray:
+    return np.full(DIM, i, dtype=np.float32)
+
+def check_aligned(root, n):
+    cache = EmbeddingCache(str(root), "fixed", DIM)
+    assert len(cache) == n
+    got, misses = cache.get_many([key(i) for i in range(n)])
+    assert misses == []
+    assert (got[:, 0] == np.arange(n)).all()
+
+def test_second_writer_picks_up_rows_it_did_not_write(tmp_path):
+    a = EmbeddingCache(str(tmp_path), "fixed", DIM)
+    b = EmbeddingCache(str(tmp_path), "fixed", DIM)
+    a.put_many([key(0)], vec(0)[None])
+    b.put_many([key(1), key(0)], np.stack([vec(1), vec(0)]))  # key(0) is a's: not appended twice
+    got, misses = b.get_many([key(0), key(1)])
+    assert misses == [] and got[:, 0].tolist() == [0, 1]
+    check_aligned(tmp_path, 2)
+
+def _writer(root, start):
+    cache = EmbeddingCache(root, "fixed", DIM)
+    for i in range(start, start + 200, 2):
+        cache.put_many([key(i)], vec(i)[None])
+
+def test_concurrent_processes_keep_the_files_aligned(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(str(tmp_path), start)) for start in (0, 1)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+    check_aligned(tmp_path, 200)
+
+def test_torn_tail_is_trimmed(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "fixed", DIM)
+    cache.put_many([key(0)], vec(0)[None])
+    with open(cache.vec_path, "ab") as f:  # crashed after the vector append, before the key append
+        f.write(vec(9).tobytes())
+    check_aligned(tmp_path, 1)
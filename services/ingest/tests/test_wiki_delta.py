@@ -0,0 +1,99 @@
+import pytest
+
+import wiki_delta
+from ingest_state import IngestStateStore, TitleState
+from wiki_delta import DeltaIngest, content_hash
+from wiki_pipeline import Page, PipelineConfig, object_uuid
+
+class MemoryState(IngestStateStore):
+    def __init__(self):
+        self.rows: dict[str, TitleState] = {}
+
+    def get_many(self, titles):
+        return {t: self.rows[t] for t in titles if t in self.rows}
+
+    def upsert_many(self, states):
+        for st in states:
+            self.rows[st.title] = st
+
+    def touch_revisions(self, revs, signature=None):
+        for title, revid in revs.items():
+            self.rows[title].revid = revid
+            self.rows[title].signature = signature
+
+PAGES = {
+    "Fox": Page("Fox", 1, 100, "A fox is a small canid."),
+    "Owl": Page("Owl", 2, 200, "Owls are nocturnal birds."),
+}
+
+@pytest.fixture
+def wiki(monkeypatch):
+    """Serves PAGES instead of Wikipedia; records every object the pipeline would push."""
+    pushed: list[dict] = []
+
+    def fetch_revisions(session, titles, cfg, stats=None):
+        return {t: (PAGES[t].pageid, PAGES[t].revid) for t in titles if t in PAGES}, \
+               [t for t in titles if t not in PAGES]
+
+    class Pipeline:
+        def __init__(self, cfg, transform, on_pushed):
+            self.transform, self.on_pushed = transform, on_pushed
+
+        def run(self, titles):
+            objects = self.transform([PAGES[t] for t in titles])
+            pushed.extend(objects)
+            self.on_pushed(objects)
+
+    monkeypatch.setattr(wiki_delta, "fetch_revisions", fetch_revisions)
+    monkeypatch.setattr(wiki_delta, "make_session", lambda *a, **kw: None)
+    monkeypatch.setattr(wiki_delta, "IngestPipeline", Pipeline)
+    return pushed
+
+def chunker(tag: str):
+    def to_objects(pages):
+        return [[{"id": object_uuid(p.pageid, 0), "properties": {"text": p.text, "by": tag}}] for p in pages]
+    return to_objects
+
+def run(state, tag):
+    return DeltaIngest(PipelineConfig(fetch_workers=1), state, chunker(tag), signature=tag).run(list(PAGES))
+
+def test_unchanged_pages_are_skipped_by_revision(wiki):
+    state = MemoryState()
+    assert run(state, "v1").recorded == 2
+    wiki.clear()
+    stats = run(state, "v1")
+    assert stats.unchanged_revision == 2 and stats.changed == 0
+    assert wiki == []
+
+def test_new_signature_rewrites_existing_pages(wiki):
+    state = MemoryState()
+    run(state, "v1")
+    wiki.clear()
+    stats = run(state, "v2")
+    assert stats.unchanged_revision == 0
+    assert stats.changed == stats.recorded == 2
+    assert {o["properties"]["by"] for o in wiki} == {"v2"}
+    assert {st.signature for st in state.rows.values()} == {"v2"}
+    assert state.rows["Fox"].content_hash == content_hash(PAGES["Fox"].text, "v2")
+    # and the new signature is then the one that is skipped
+    assert run(state, "v2").unchanged_revision == 2
+
+def test_state_without_signature_is_rechecked_once(wiki):
+    state = MemoryState()
+    for p in PAGES.values():  # rows written before signatures were stored
+        state.rows[p.title] = TitleState(p.title, p.pageid, p.revid, content_hash(p.text, "v1"), 1)
+    stats = run(state, "v1")
+    assert stats.unchanged_content == 2 and stats.changed == 0 and wiki == []
+    assert run(state, "v1").unchanged_revision == 2
+
+def test_single_page_ingest_is_skipped_by_the_next_delta(wiki, monkeypatch):
+    import wiki_ingest
+
+    state = MemoryState()
+    monkeypatch.setattr(wiki_ingest, "IngestStateStore", lambda: state)
+    fox = PAGES["Fox"]
+    wiki_ingest.record_ingest_mysql("Fox", {"pageid": fox.pageid, "revid": fox.revid,
+                                            "content_hash": content_hash(fox.text, wiki_delta.WHOLE_PAGE_SIGNATURE)})
+    stats = DeltaIngest(PipelineConfig(fetch_workers=1), state).run(["Fox"])
+    assert stats.unchanged_revision == 1 and stats.changed == 0
+    assert wiki == []
@@ -0,0 +1,290 @@
+# /home/melynxis/solace/services/ingest/vector_index.py
+"""
+Embedded vector index for Memory chunks: the fallback memory search uses
+when Weaviate is down, written by the ingest next to every Weaviate batch.
+
+Layout of <dir>/ (all append-only except the `live` byte of a row):
+  meta.json        {"dim": ...}
+  vectors.f32      one L2-normalised float32 row per chunk, read through a memmap
+  docs.jsonl       Memory properties (title, text, metadata) per row
+  rows.bin         per row: object id, docs.jsonl offset/length, live flag;
+                   appended last, so it is the commit point of an upsert
+  ivf.f32/ivf.i32  optional: k-means centroids and each row's list
+                   (build_ivf), kept up to date by later appends
+
+Re-ingesting an object appends a new row and clears `live` on the old one.
+Search is exact (blocked matrix-vector product over the memmap) or, once
+IVF is built, scans only the `nprobe` closest lists.
+"""
+
+from typing import Iterable, Optional, Sequence
+import fcntl, json, os, threading, time, uuid
+
+import numpy as np
+
+ROW = np.dtype([("id", "S16"), ("doc_off", "<u8"), ("doc_len", "<u4"), ("live", "u1"), ("pad", "V3")])
+BLOCK_ROWS = 65536
+
+def _id_bytes(oid: str) -> bytes:
+    return uuid.UUID(oid).bytes
+
+def _key(raw) -> bytes:
+    return bytes(raw).ljust(16, b"\0")  # numpy drops trailing NULs from S16
+
+def _normalize(vectors) -> np.ndarray:
+    v = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norms == 0, 1, norms)
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[part], rows[part]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], rows[order]
+
+class LocalVectorIndex:
+    def __init__(self, path: str, dim: Optional[int] = None):
+        self.dir = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored = json.load(f)["dim"]
+            if dim is not None and dim != stored:
+                raise ValueError(f"{path} holds vectors of dimension {stored}, not {dim}")
+            dim = stored
+        elif dim is None:
+            raise FileNotFoundError(f"no vector index at {path}")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim}, f)
+        self.dim = dim
+        self._p = {name: os.path.join(path, name) for name in
+                   ("vectors.f32", "docs.jsonl", "rows.bin", "ivf.f32", "ivf.i32", "lock")}
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._ids: dict[bytes, int] = {}  # writers only, filled by _catch_up
+        self._id_rows = 0
+        self._vecs: Optional[np.memmap] = None
+        self._meta: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Optional[tuple[np.ndarray, np.ndarray, int]] = None  # (rows by list, list bounds, rows covered)
+        self._checked = 0.0
+        self.refresh(force=True)
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def live(self) -> int:
+        return int(self._meta["live"].sum()) if self._rows else 0
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._meta["live"]) if self._rows else np.zeros(0, dtype=np.int64)
+
+    def vectors(self, rows) -> np.ndarray:
+        return np.asarray(self._vecs[rows])
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def _committed_rows(self) -> int:
+        p = self._p["rows.bin"]
+        return os.path.getsize(p) // ROW.itemsize if os.path.exists(p) else 0
+
+    def refresh(self, force: bool = False, min_interval: float = 1.0):
+        """Pick up rows appended by another process (at most every min_interval seconds)."""
+        now = time.monotonic()
+        if not force and now - self._checked < min_interval:
+            return
+        self._checked = now
+        with self._lock:
+            n = self._committed_rows()
+            if n == self._rows and not force:
+                return
+            if n:
+                self._meta = np.memmap(self._p["rows.bin"], dtype=ROW, mode="r", shape=(n,))
+                self._vecs = np.memmap(self._p["vectors.f32"], dtype=np.float32, mode="r", shape=(n, self.dim))
+            self._rows = n
+            if os.path.exists(self._p["ivf.f32"]):
+                self._centroids = np.fromfile(self._p["ivf.f32"], dtype=np.float32).reshape(-1, self.dim)
+                self._lists = None
+            else:
+                self._centroids = None
+
+    def _repair(self):
+        """After a crash mid-upsert: drop vector/doc bytes no committed row points at."""
+        n = self._committed_rows()
+        size = n * ROW.itemsize
+        if os.path.exists(self._p["rows.bin"]) and os.path.getsize(self._p["rows.bin"]) != size:
+            os.truncate(self._p["rows.bin"], size)
+        ends = {"vectors.f32": n * 4 * self.dim, "ivf.i32": n * 4, "docs.jsonl": 0}
+        if n:
+            last = np.fromfile(self._p["rows.bin"], dtype=ROW, count=1, offset=(n - 1) * ROW.itemsize)[0]
+            ends["docs.jsonl"] = int(last["doc_off"]) + int(last["doc_len"])
+        for name, end in ends.items():
+            if os.path.exists(self._p[name]) and os.path.getsize(self._p[name]) > end:
+                os.truncate(self._p[name], end)
+
+    # -----------------------------
+    # Writing (ingest)
+    # -----------------------------
+    def upsert(self, objects: Sequence[dict]):
+        """Memory objects carrying "id" and "vector" (ChunkEmbedder output)."""
+        objects = [o for o in objects if o.get("vector") is not None and o.get("id")]
+        if not objects:
+            return
+        vectors = _normalize([o["vector"] for o in objects])
+        docs = [json.dumps(o.get("properties") or {}, ensure_ascii=False).encode("utf-8") + b"\n" for o in objects]
+        with self._lock, open(self._p["lock"], "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._repair()
+            base = self._committed_rows()
+            self._catch_up(base)
+            doc_off = os.path.getsize(self._p["docs.jsonl"]) if os.path.exists(self._p["docs.jsonl"]) else 0
+            rows = np.zeros(len(objects), dtype=ROW)
+            for i, (o, d) in enumerate(zip(objects, docs)):
+                rows[i] = (_id_bytes(o["id"]), doc_off, len(d), 1, b"\0\0\0")
+                doc_off += len(d)
+            with open(self._p["vectors.f32"], "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._p["docs.jsonl"], "ab") as f:
+                f.write(b"".join(docs))
+            self._assign(base, vectors)
+            with open(self._p["rows.bin"], "ab") as f:
+                f.write(rows.tobytes())
+            # superseded rows die only after the new ones are committed
+            replaced = []
+            for i, r in enumerate(rows):
+                key = _key(r["id"])
+                if key in self._ids:
+                    replaced.append(self._ids[key])
+                self._ids[key] = base + i
+            self._id_rows = base + len(rows)
+            self._kill(replaced)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        self.refresh(force=True)
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock, open(self._p["lock"], "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._catch_up(self._committed_rows())
+            self._kill([self._ids.pop(_id_bytes(i)) for i in ids if _id_bytes(i) in self._ids])
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _assign(self, base: int, vectors: np.ndarray):
+        """Append IVF list ids for the new rows, first filling any rows a writer appended before IVF existed."""
+        if not os.path.exists(self._p["ivf.f32"]):
+            return
+        centroids = np.fromfile(self._p["ivf.f32"], dtype=np.float32).reshape(-1, self.dim)
+        have = os.path.getsize(self._p["ivf.i32"]) // 4
+        parts = []
+        if have < base:
+            old = np.memmap(self._p["vectors.f32"], dtype=np.float32, mode="r", shape=(base, self.dim))
+            parts += [old[s:min(base, s + BLOCK_ROWS)] for s in range(have, base, BLOCK_ROWS)]
+        parts.append(vectors)
+        with open(self._p["ivf.i32"], "ab") as f:
+            for part in parts:
+                f.write(np.argmax(part @ centroids.T, axis=1).astype(np.int32).tobytes())
+
+    def _catch_up(self, n: int):
+        """Index rows another writer appended since we last looked (lock held)."""
+        if n > self._id_rows:
+            meta = np.memmap(self._p["rows.bin"], dtype=ROW, mode="r", shape=(n,))
+            for i, oid in enumerate(meta["id"][self._id_rows:n].tolist(), start=self._id_rows):
+                self._ids[_key(oid)] = i
+            self._id_rows = n
+
+    def _kill(self, rows: list[int]):
+        if not rows:
+            return
+        live_at = ROW.fields["live"][1]
+        fd = os.open(self._p["rows.bin"], os.O_WRONLY)
+        try:
+            for r in rows:
+                os.pwrite(fd, b"\0", r * ROW.itemsize + live_at)
+        finally:
+            os.close(fd)
+
+    def build_ivf(self, nlist: Optional[int] = None, iters: int = 10, sample: int = 100_000, seed: int = 0):
+        """Spherical k-means over a sample of live rows; assigns every row to its closest centroid."""
+        self.refresh(force=True)
+        live = self.live_rows()
+        if len(live) == 0:
+            raise ValueError("index is empty")
+        nlist = nlist or max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+        pick = np.sort(rng.choice(live, size=min(sample, len(live)), replace=False))
+        data = np.asarray(self._vecs[pick])
+        centroids = data[rng.choice(len(data), size=min(nlist, len(data)), replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = data[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        with self._lock, open(self._p["lock"], "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            n = self._committed_rows()
+            vecs = np.memmap(self._p["vectors.f32"], dtype=np.float32, mode="r", shape=(n, self.dim))
+            assign = np.concatenate([np.argmax(vecs[s:s + BLOCK_ROWS] @ centroids.T, axis=1)
+                                     for s in range(0, n, BLOCK_ROWS)]).astype(np.int32)
+            centroids.astype(np.float32).tofile(self._p["ivf.f32"] + ".tmp")
+            assign.tofile(self._p["ivf.i32"] + ".tmp")
+            os.replace(self._p["ivf.i32"] + ".tmp", self._p["ivf.i32"])
+            os.replace(self._p["ivf.f32"] + ".tmp", self._p["ivf.f32"])
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        self.refresh(force=True)
+        return len(centroids)
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def _ivf_lists(self):
+        n = self._rows
+        if self._lists is None or self._lists[2] != n:
+            assign = np.fromfile(self._p["ivf.i32"], dtype=np.int32)[:n]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = (order, bounds, len(assign))
+        return self._lists
+
+    def _candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        order, bounds, covered = self._ivf_lists()
+        probe = np.argsort(-(self._centroids @ q))[:nprobe]
+        parts = [order[bounds[c]:bounds[c + 1]] for c in probe]
+        if covered < self._rows:  # appended by a writer that had not seen the centroids yet
+            parts.append(np.arange(covered, self._rows))
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def search(self, vector, k: int = 10, nprobe: Optional[int] = None) -> list[tuple[float, int]]:
+        """[(cosine, row)] best first. nprobe > 0 uses IVF when it has been built."""
+        self.refresh()
+        n = self._rows
+        if n == 0:
+            return []
+        q = _normalize(vector).reshape(-1)
+        live = self._meta["live"]
+        best_s, best_r = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        if nprobe and self._centroids is not None:
+            rows = self._candidates(q, nprobe)
+            rows = rows[live[rows] == 1]
+            best_s, best_r = _top_k(self._vecs[rows] @ q, rows, k)
+        else:
+            for s in range(0, n, BLOCK_ROWS):
+                e = min(n, s + BLOCK_ROWS)
+                scores = self._vecs[s:e] @ q
+                rows = np.flatnonzero(live[s:e])
+                scores, rows = _top_k(scores[rows], rows + s, k)
+                best_s, best_r = _top_k(np.concatenate([best_s, scores]), np.concatenate([best_r, rows]), k)
+        return [(float(s), int(r)) for s, r in zip(best_s, best_r)]
+
+    def doc(self, row: int) -> dict:
+        r = self._meta[row]
+        with open(self._p["docs.jsonl"], "rb") as f:
+            f.seek(int(r["doc_off"]))
+            props = json.loads(f.read(int(r["doc_len"])))
+        props["id"] = str(uuid.UUID(bytes=_key(r["id"])))
+        return props
@@ -0,0 +1,210 @@
+# /home/melynxis/solace/services/ingest/wiki_delta.py
+"""
+Delta refresh: only pages whose content changed since the last ingest are
+re-chunked and written to Weaviate.
+
+  1. revision ids for all titles, 50 per request, no page text
+  2. titles whose revid and signature match wiki_ingest_state are skipped
+     outright; a new chunker or embedder (signature) sends every page on to
+     step 3, where its content_hash no longer matches either
+  3. the rest go through IngestPipeline; a page whose text still hashes to
+     the stored content_hash only gets its revid bumped
+  4. changed pages are chunked and upserted under deterministic object ids
+     (object_uuid(pageid, chunk)); chunks left over from a longer previous
+     version are deleted
+  5. state is written once every chunk of a page was accepted, so a failed
+     write is retried by the next refresh
+
+    python wiki_delta.py --titles-file titles.txt
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+import argparse, hashlib, logging, threading, time
+
+from ingest_state import IngestStateStore, TitleState
+from wiki_pipeline import (
+    IngestPipeline, IngestStats, Page, PipelineConfig, MAX_TITLES_PER_QUERY,
+    add_embed_args, chunk_embedder_from_args, chunked, fetch_revisions, make_session, memory_object,
+    object_uuid, read_titles, http_request,
+)
+
+log = logging.getLogger("solace.ingest.delta")
+
+@dataclass
+class DeltaStats:
+    titles: int = 0
+    missing: int = 0
+    unchanged_revision: int = 0
+    unchanged_content: int = 0
+    changed: int = 0
+    recorded: int = 0
+    stale_deleted: int = 0
+    revision_requests: int = 0
+    pipeline: Optional[IngestStats] = None
+    seconds: float = 0.0
+
+def content_hash(text: str, signature: str = "") -> str:
+    """sha256 over the chunking/embedding signature and the page text."""
+    h = hashlib.sha256()
+    h.update(signature.encode())
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+WHOLE_PAGE_SIGNATURE = "page/v1"
+
+def whole_pages(pages: list[Page]) -> list[list[dict]]:
+    return [[memory_object(p)] for p in pages]
+
+class DeltaIngest:
+    """
+    `to_objects(pages)` turns changed pages into their Weaviate objects (one
+    list per page, one object per chunk, ids object_uuid(pageid, i), e.g.
+    ChunkEmbedder.objects_for); `signature` should change whenever that
+    mapping does (chunk sizes, embedding model) so pages get rewritten.
+    Stale chunks are also dropped from `index` (a LocalVectorIndex), if given.
+    """
+
+    def __init__(self, cfg: PipelineConfig, state: Optional[IngestStateStore] = None,
+                 to_objects: Callable[[list[Page]], list[list[dict]]] = whole_pages, signature: str = WHOLE_PAGE_SIGNATURE,
+                 index=None):
+        self.cfg = cfg
+        self.state = state or IngestStateStore()
+        self.to_objects = to_objects
+        self.signature = signature
+        self.index = index
+        self._lock = threading.Lock()
+        self._known: dict[str, TitleState] = {}
+        self._pending: dict[str, tuple[TitleState, set]] = {}  # title -> (new state, object ids not yet written)
+        self._by_id: dict[str, str] = {}
+        self._done: list[TitleState] = []
+        self._touch: dict[str, int] = {}
+
+    # -- step 1/2 --
+    def changed_titles(self, titles: Iterable[str], stats: DeltaStats) -> list[str]:
+        session = make_session(self.cfg.fetch_workers)
+        batches = list(chunked(titles, MAX_TITLES_PER_QUERY))
+        with ThreadPoolExecutor(self.cfg.fetch_workers) as pool:
+            results = list(pool.map(lambda b: fetch_revisions(session, b, self.cfg), batches))
+        stats.revision_requests += len(batches)
+        stats.titles += sum(len(b) for b in batches)
+        revs: dict[str, tuple[int, int]] = {}
+        for found, missing in results:
+            revs.update(found)
+            stats.missing += len(missing)
+        self._known = self.state.get_many(revs)
+        changed = []
+        for title, (_, revid) in revs.items():
+            prev = self._known.get(title)
+            if prev is not None and prev.revid == revid and prev.signature == self.signature:
+                stats.unchanged_revision += 1
+            else:
+                changed.append(title)
+        return changed
+
+    # -- step 3/4 (fetch threads) --
+    def _transform(self, pages: list[Page]) -> list[dict]:
+        changed = []
+        for page in pages:
+            digest = content_hash(page.text, self.signature)
+            prev = self._known.get(page.title)
+            if prev is not None and prev.content_hash == digest:
+                with self._lock:
+                    self._touch[page.title] = page.revid
+            else:
+                changed.append((page, digest))
+        out = []
+        per_page = self.to_objects([p for p, _ in changed]) if changed else []
+        for (page, digest), objects in zip(changed, per_page):
+            new = TitleState(page.title, page.pageid, page.revid, digest, len(objects), self.signature)
+            with self._lock:
+                if not objects:
+                    self._done.append(new)
+                    continue
+                self._pending[page.title] = (new, {o["id"] for o in objects})
+                for o in objects:
+                    self._by_id[o["id"]] = page.title
+            out.extend(objects)
+        return out
+
+    # -- step 5 (push threads) --
+    def _on_pushed(self, objects: list[dict]):
+        with self._lock:
+            for o in objects:
+                title = self._by_id.pop(o["id"], None)
+                if title is None:
+                    continue
+                new, ids = self._pending[title]
+                ids.discard(o["id"])
+                if not ids:
+                    del self._pending[title]
+                    self._done.append(new)
+
+    def _delete_stale(self, done: list[TitleState], stats: DeltaStats):
+        stale = []
+        for new in done:
+            prev = self._known.get(new.title)
+            if prev is not None and prev.pageid == new.pageid and prev.chunks > new.chunks:
+                stale += [object_uuid(new.pageid, i) for i in range(new.chunks, prev.chunks)]
+        if not stale:
+            return
+        if self.index is not None:
+            self.index.delete(stale)
+        session = make_session(self.cfg.push_workers, self.cfg.weaviate_apikey)
+        for oid in stale:
+            try:
+                http_request(session, "DELETE", f"{self.cfg.weaviate_url}/v1/objects/Memory/{oid}",
+                             self.cfg.retries, self.cfg.timeout)
+                stats.stale_deleted += 1
+            except Exception as e:  # 404 included: already gone
+                log.debug("stale chunk %s not deleted: %s", oid, e)
+
+    def run(self, titles: Iterable[str]) -> DeltaStats:
+        stats = DeltaStats()
+        t0 = time.perf_counter()
+        changed = self.changed_titles(titles, stats)
+        if changed:
+            stats.pipeline = IngestPipeline(self.cfg, transform=self._transform, on_pushed=self._on_pushed).run(changed)
+        self.state.touch_revisions(self._touch, self.signature)
+        self._delete_stale(self._done, stats)
+        self.state.upsert_many(self._done)
+        stats.unchanged_content = len(self._touch)
+        stats.changed = len(self._done) + len(self._pending)
+        stats.recorded = len(self._done)
+        stats.seconds = time.perf_counter() - t0
+        if self._pending:
+            log.warning("%d changed pages not fully written; they will be retried next refresh", len(self._pending))
+        return stats
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("titles", nargs="*")
+    ap.add_argument("--titles-file")
+    ap.add_argument("--fetch-workers", type=int, default=4)
+    ap.add_argument("--push-workers", type=int, default=2)
+    ap.add_argument("--batch-size", type=int, default=100)
+    add_embed_args(ap)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not args.titles and not args.titles_file:
+        ap.error("give titles or --titles-file")
+    titles = read_titles(args.titles_file) if args.titles_file else args.titles
+    cfg = PipelineConfig(fetch_workers=args.fetch_workers, push_workers=args.push_workers, batch_size=args.batch_size)
+    stage = chunk_embedder_from_args(args)
+    try:
+        delta = (DeltaIngest(cfg, to_objects=stage.objects_for, signature=stage.signature, index=stage.index)
+                 if stage else DeltaIngest(cfg))
+        s = delta.run(titles)
+    finally:
+        if stage:
+            stage.close()
+    p = s.pipeline or IngestStats()
+    print(f"titles={s.titles} missing={s.missing} unchanged_revision={s.unchanged_revision} "
+          f"unchanged_content={s.unchanged_content} changed={s.changed} recorded={s.recorded} "
+          f"stale_deleted={s.stale_deleted} objects={p.objects} object_errors={p.object_errors} "
+          f"requests={s.revision_requests}+{p.fetch_requests}+{p.batch_requests} {s.seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,19 @@
 import requests, json, os
 from datetime import datetime
 
+from ingest_state import IngestStateStore, TitleState, MYSQL_URL
+from wiki_delta import DeltaIngest, WHOLE_PAGE_SIGNATURE, content_hash
+from wiki_pipeline import IngestPipeline, PipelineConfig, object_uuid
+
 WIKI_API = "https://en.wikipedia.org/w/api.php"
 WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
 WEAVIATE_APIKEY = os.getenv("WEAVIATE_APIKEY", "changeme")
-MYSQL_URL = os.getenv("MYSQL_URL", "mysql+pymysql://...")
 
 def fetch_wiki_page(title):
     params = {
         "action": "query",
-        "prop": "extracts",
+        "prop": "extracts|revisions",
+        "rvprop": "ids",
         "explaintext": True,
         "titles": title,
         "format": "json"
@@ -31,28 +35,43 @@ def push_to_weaviate(page_title, content, metadata):
             "createdAt": datetime.utcnow().isoformat()
         }
     }
-    r = requests.post(f"{WEAVIATE_URL}/v1/objects", headers=headers, json=obj)
+    if metadata.get("pageid") is not None:
+        # Stable id: PUT replaces the page's object instead of adding another
+        obj["id"] = object_uuid(metadata["pageid"])
+        r = requests.put(f"{WEAVIATE_URL}/v1/objects/Memory/{obj['id']}", headers=headers, json=obj)
+    else:
+        r = requests.post(f"{WEAVIATE_URL}/v1/objects", headers=headers, json=obj)
     r.raise_for_status()
     return r.json()
 
 def record_ingest_mysql(title, meta):
-    # Logic to connect to MySQL and store ingest event/version
-    pass
+    # Store the ingested revision/content hash so ingest_delta can skip it next time
+    IngestStateStore().upsert_many([TitleState(
+        title, meta.get("pageid"), meta.get("revid"), meta.get("content_hash"), meta.get("chunks", 1),
+        signature=WHOLE_PAGE_SIGNATURE,
+    )])
 
 def ingest_wiki_page(title):
     data = fetch_wiki_page(title)
     # Extract page content
     page = next(iter(data["query"]["pages"].values()))
     content = page.get("extract", "")
-    metadata = {"source": "wikipedia", "pageid": page.get("pageid")}
+    revisions = page.get("revisions") or [{}]
+    metadata = {"source": "wikipedia", "pageid": page.get("pageid"), "revid": revisions[0].get("revid"),
+                "content_hash": content_hash(content, WHOLE_PAGE_SIGNATURE)}
     # Push to Weaviate
     push_to_weaviate(title, content, metadata)
     # Record event in MySQL
     record_ingest_mysql(title, metadata)
 
-def ingest_delta(title):
-    # Compare current content with last ingested version from MySQL
-    # Only push updates if changed
-    pass
+def ingest_wiki_pages(titles, **config):
+    """Bulk path: concurrent multi-title fetch + batch import (see wiki_pipeline.py)."""
+    return IngestPipeline(PipelineConfig(**config)).run(titles)
+
+def ingest_delta(titles, **config):
+    """Re-ingest only titles whose revision and content changed (see wiki_delta.py)."""
+    if isinstance(titles, str):
+        titles = [titles]
+    return DeltaIngest(PipelineConfig(**config)).run(titles)
 
-# Cron or dashboard trigger to run ingest_wiki_page / ingest_delta
\ No newline at end of file
+# Cron or dashboard trigger to run ingest_wiki_page / ingest_wiki_pages / ingest_delta
\ No newline at end of file
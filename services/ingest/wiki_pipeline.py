@@ -0,0 +1,364 @@
+# /home/melynxis/solace/services/ingest/wiki_pipeline.py
+"""
+Streaming Wikipedia -> Weaviate ingest.
+
+    titles --> [fetch workers] --pages--> [push workers] --> /v1/batch/objects
+                 (multi-title                (batches of
+                  MediaWiki queries)          --batch-size objects)
+
+Stages run concurrently and talk through bounded queues, so a slow side
+applies backpressure instead of buffering the whole run in memory. Each
+stage shares one requests.Session whose connection pool is sized to its
+worker count.
+
+MediaWiki accepts up to 50 titles per query. TextExtracts hands out
+full-article extracts one page per response and follows up through
+`continue`; with --intro-only it returns up to 20 per response. Either way
+the continuation stays on the same pooled connection.
+
+    python wiki_pipeline.py --titles-file titles.txt --fetch-workers 4 --batch-size 100
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from requests.adapters import HTTPAdapter
+from typing import Callable, Iterable, Iterator, Optional
+import argparse, logging, os, queue, threading, time, uuid
+
+import requests
+
+log = logging.getLogger("solace.ingest.pipeline")
+
+WIKI_API = os.getenv("WIKI_API", "https://en.wikipedia.org/w/api.php")
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
+WEAVIATE_APIKEY = os.getenv("WEAVIATE_APIKEY", "changeme")
+USER_AGENT = os.getenv("WIKI_USER_AGENT", "SolaceIngest/0.2 (https://github.com/Melynxis/Solace)")
+
+MAX_TITLES_PER_QUERY = 50
+_DONE = object()
+
+# Namespace for deterministic Memory object ids: re-ingesting a page writes
+# to the same ids, so batch imports replace objects instead of duplicating.
+MEMORY_NAMESPACE = uuid.UUID("5b0c3f1e-6a7d-4c55-9a3e-2f1d8e7c4b90")
+
+def object_uuid(pageid: int, chunk: int = 0) -> str:
+    return str(uuid.uuid5(MEMORY_NAMESPACE, f"wikipedia:{pageid}:{chunk}"))
+
+@dataclass
+class Page:
+    title: str
+    pageid: Optional[int]
+    revid: Optional[int]
+    text: str
+
+@dataclass
+class PipelineConfig:
+    wiki_api: str = WIKI_API
+    weaviate_url: str = WEAVIATE_URL
+    weaviate_apikey: str = WEAVIATE_APIKEY
+    titles_per_query: int = MAX_TITLES_PER_QUERY
+    intro_only: bool = False
+    fetch_workers: int = 4
+    push_workers: int = 2
+    batch_size: int = 100
+    queue_size: int = 8          # in batches, per queue
+    flush_seconds: float = 2.0   # push a partial batch after this long
+    retries: int = 3
+    timeout: float = 30.0
+
+@dataclass
+class IngestStats:
+    titles: int = 0
+    pages: int = 0
+    missing: int = 0
+    objects: int = 0
+    object_errors: int = 0
+    fetch_requests: int = 0
+    batch_requests: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+def make_session(pool_size: int, apikey: Optional[str] = None) -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = USER_AGENT
+    if apikey:
+        s.headers["Authorization"] = f"Bearer {apikey}"
+    return s
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for it in items:
+        batch.append(it)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_titles(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+def memory_object(page: Page, chunk: int = 0, text: Optional[str] = None) -> dict:
+    """A Memory object (same shape push_to_weaviate writes) with a stable id."""
+    obj = {
+        "class": "Memory",
+        "properties": {
+            "title": page.title,
+            "text": page.text if text is None else text,
+            "metadata": {"source": "wikipedia", "pageid": page.pageid, "revid": page.revid, "chunk": chunk},
+            "createdAt": datetime.utcnow().isoformat(),
+        },
+    }
+    if page.pageid is not None:
+        obj["id"] = object_uuid(page.pageid, chunk)
+    return obj
+
+def http_request(session: requests.Session, method: str, url: str, retries: int, timeout: float, **kw) -> requests.Response:
+    for attempt in range(retries + 1):
+        try:
+            r = session.request(method, url, timeout=timeout, **kw)
+            if r.status_code not in (429, 500, 502, 503, 504) or attempt == retries:
+                r.raise_for_status()
+                return r
+        except requests.ConnectionError:
+            if attempt == retries:
+                raise
+        time.sleep(min(8.0, 0.5 * 2 ** attempt))
+    raise RuntimeError("unreachable")
+
+def fetch_pages(session: requests.Session, titles: list[str], cfg: PipelineConfig,
+                stats: Optional[IngestStats] = None) -> list[Page]:
+    """
+    One multi-title query (plus its continuations) for up to 50 titles.
+    Redirects and normalisation are resolved; missing titles are dropped.
+    """
+    params = {
+        "action": "query", "format": "json", "formatversion": "2",
+        "prop": "extracts|revisions", "rvprop": "ids",
+        "explaintext": 1, "exlimit": "max", "redirects": 1,
+        "titles": "|".join(titles),
+    }
+    if cfg.intro_only:
+        params["exintro"] = 1
+    pages: dict[int, dict] = {}
+    cont: dict = {}
+    while True:
+        r = http_request(session, "GET", cfg.wiki_api, cfg.retries, cfg.timeout, params={**params, **cont})
+        if stats is not None:
+            stats.fetch_requests += 1
+        data = r.json()
+        for p in data.get("query", {}).get("pages", []):
+            if p.get("missing") or p.get("invalid"):
+                if stats is not None:
+                    stats.missing += 1
+                continue
+            slot = pages.setdefault(p["pageid"], {"title": p["title"], "revid": None, "extract": None})
+            if p.get("revisions"):
+                slot["revid"] = p["revisions"][0].get("revid")
+            if p.get("extract") is not None:
+                slot["extract"] = p["extract"]
+        if "continue" not in data:
+            break
+        cont = data["continue"]
+    return [Page(v["title"], pid, v["revid"], v["extract"] or "") for pid, v in pages.items()]
+
+def fetch_revisions(session: requests.Session, titles: list[str], cfg: PipelineConfig,
+                    stats: Optional[IngestStats] = None) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """
+    Latest revision ids for up to 50 titles in one request, no page text.
+    Returns ({canonical title: (pageid, revid)}, [missing titles]).
+    """
+    r = http_request(session, "GET", cfg.wiki_api, cfg.retries, cfg.timeout, params={
+        "action": "query", "format": "json", "formatversion": "2",
+        "prop": "revisions", "rvprop": "ids", "redirects": 1, "titles": "|".join(titles),
+    })
+    if stats is not None:
+        stats.fetch_requests += 1
+    found, missing = {}, []
+    for p in r.json().get("query", {}).get("pages", []):
+        if p.get("missing") or p.get("invalid") or not p.get("revisions"):
+            missing.append(p.get("title"))
+            continue
+        found[p["title"]] = (p["pageid"], p["revisions"][0]["revid"])
+    return found, missing
+
+def push_batch(session: requests.Session, objects: list[dict], cfg: PipelineConfig,
+               stats: Optional[IngestStats] = None) -> list[dict]:
+    """POST /v1/batch/objects; returns the per-object results that carry errors."""
+    r = http_request(session, "POST", f"{cfg.weaviate_url}/v1/batch/objects", cfg.retries, cfg.timeout,
+                 json={"objects": objects})
+    if stats is not None:
+        stats.batch_requests += 1
+    failed = [o for o in r.json() if (o.get("result") or {}).get("errors")]
+    return failed
+
+class IngestPipeline:
+    """
+    Thread-based fetch -> transform -> push pipeline. `transform` maps a list
+    of fetched pages to Weaviate objects (default: memory_object per page);
+    `on_pushed` gets each batch's successfully written objects.
+    """
+
+    def __init__(self, cfg: PipelineConfig,
+                 transform: Optional[Callable[[list[Page]], list[dict]]] = None,
+                 on_pushed: Optional[Callable[[list[dict]], None]] = None):
+        self.cfg = cfg
+        self.transform = transform or (lambda pages: [memory_object(p) for p in pages])
+        self.on_pushed = on_pushed
+        self.wiki = make_session(cfg.fetch_workers)
+        self.weaviate = make_session(cfg.push_workers, cfg.weaviate_apikey)
+        self._lock = threading.Lock()
+
+    def _feed(self, titles: Iterable[str], title_q: queue.Queue, stats: IngestStats):
+        try:
+            for batch in chunked(titles, min(self.cfg.titles_per_query, MAX_TITLES_PER_QUERY)):
+                with self._lock:
+                    stats.titles += len(batch)
+                title_q.put(batch)
+        finally:
+            for _ in range(self.cfg.fetch_workers):
+                title_q.put(_DONE)
+
+    def _fetch(self, title_q: queue.Queue, object_q: queue.Queue, stats: IngestStats):
+        while (batch := title_q.get()) is not _DONE:
+            local = IngestStats()
+            try:
+                pages = fetch_pages(self.wiki, batch, self.cfg, local)
+                objects = self.transform(pages) if pages else []
+            except Exception as e:
+                log.warning("fetch of %d titles failed: %s", len(batch), e)
+                with self._lock:
+                    stats.errors.append(f"fetch {batch[0]!r}..: {e}")
+                continue
+            finally:
+                with self._lock:
+                    stats.fetch_requests += local.fetch_requests
+                    stats.missing += local.missing
+            with self._lock:
+                stats.pages += len(pages)
+            for obj in objects:
+                object_q.put(obj)
+
+    def _push(self, object_q: queue.Queue, stats: IngestStats):
+        pending: list[dict] = []
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal pending, last_flush
+            batch, pending = pending, []
+            last_flush = time.monotonic()
+            if not batch:
+                return
+            local = IngestStats()
+            try:
+                failed = push_batch(self.weaviate, batch, self.cfg, local)
+            except Exception as e:
+                log.warning("batch of %d objects failed: %s", len(batch), e)
+                failed, err = batch, f"push: {e}"
+                with self._lock:
+                    stats.errors.append(err)
+            with self._lock:
+                stats.batch_requests += local.batch_requests
+                stats.objects += len(batch) - len(failed)
+                stats.object_errors += len(failed)
+            if self.on_pushed is not None and len(failed) < len(batch):
+                failed_ids = {o.get("id") for o in failed}
+                self.on_pushed([o for o in batch if o.get("id") not in failed_ids])
+
+        while True:
+            try:
+                item = object_q.get(timeout=self.cfg.flush_seconds)
+            except queue.Empty:
+                flush()
+                continue
+            if item is _DONE:
+                break
+            pending.append(item)
+            if len(pending) >= self.cfg.batch_size or time.monotonic() - last_flush >= self.cfg.flush_seconds:
+                flush()
+        flush()
+
+    def run(self, titles: Iterable[str]) -> IngestStats:
+        cfg = self.cfg
+        stats = IngestStats()
+        title_q: queue.Queue = queue.Queue(cfg.queue_size)
+        object_q: queue.Queue = queue.Queue(cfg.queue_size * cfg.batch_size)
+        t0 = time.perf_counter()
+        producers = [threading.Thread(target=self._feed, args=(titles, title_q, stats), name="ingest-feed")]
+        producers += [threading.Thread(target=self._fetch, args=(title_q, object_q, stats), name=f"ingest-fetch-{i}")
+                      for i in range(cfg.fetch_workers)]
+        pushers = [threading.Thread(target=self._push, args=(object_q, stats), name=f"ingest-push-{i}")
+                   for i in range(cfg.push_workers)]
+        for t in producers + pushers:
+            t.start()
+        # Every object is queued once the fetchers are done; one _DONE per
+        # push worker then drains and stops them.
+        for t in producers:
+            t.join()
+        for _ in pushers:
+            object_q.put(_DONE)
+        for t in pushers:
+            t.join()
+        stats.seconds = time.perf_counter() - t0
+        return stats
+
+def add_embed_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--embed", action="store_true", help="chunk pages and send locally computed vectors")
+    ap.add_argument("--embedder", default=None, help="embedder spec (default: $EMBEDDER, see embedding.py)")
+    ap.add_argument("--chunk-tokens", type=int, default=256)
+    ap.add_argument("--chunk-overlap", type=int, default=32)
+    ap.add_argument("--embed-workers", type=int, default=None, help="embedding processes (default: all cores)")
+    ap.add_argument("--local-index", default=os.getenv("MEMORY_LOCAL_INDEX"),
+                    help="also write chunks to this local vector index dir (default: $MEMORY_LOCAL_INDEX)")
+
+def chunk_embedder_from_args(args):
+    if not args.embed:
+        return None
+    import embedding  # numpy and the embedder backends are only needed with --embed
+    return embedding.ChunkEmbedder(args.embedder or embedding.EMBEDDER, args.chunk_tokens,
+                                   args.chunk_overlap, args.embed_workers, index_dir=args.local_index)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("titles", nargs="*", help="page titles (or use --titles-file)")
+    ap.add_argument("--titles-file", help="one title per line; # comments allowed")
+    ap.add_argument("--fetch-workers", type=int, default=4)
+    ap.add_argument("--push-workers", type=int, default=2)
+    ap.add_argument("--batch-size", type=int, default=100, help="objects per /v1/batch/objects request")
+    ap.add_argument("--titles-per-query", type=int, default=MAX_TITLES_PER_QUERY)
+    ap.add_argument("--queue-size", type=int, default=8)
+    ap.add_argument("--intro-only", action="store_true", help="ingest lead sections only (20 extracts per response)")
+    add_embed_args(ap)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not args.titles and not args.titles_file:
+        ap.error("give titles or --titles-file")
+    titles = read_titles(args.titles_file) if args.titles_file else args.titles
+    cfg = PipelineConfig(fetch_workers=args.fetch_workers, push_workers=args.push_workers,
+                         batch_size=args.batch_size, titles_per_query=args.titles_per_query,
+                         queue_size=args.queue_size, intro_only=args.intro_only)
+    stage = chunk_embedder_from_args(args)
+    try:
+        stats = IngestPipeline(cfg, transform=stage.transform if stage else None).run(titles)
+    finally:
+        if stage:
+            stage.close()
+    print(f"titles={stats.titles} pages={stats.pages} missing={stats.missing} objects={stats.objects} "
+          f"object_errors={stats.object_errors} fetch_requests={stats.fetch_requests} "
+          f"batch_requests={stats.batch_requests} {stats.seconds:.2f}s {stats.pages_per_second:.1f} pages/s")
+    for err in stats.errors[:20]:
+        print("error:", err)
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,68 @@
 # /home/melynxis/solace/services/orchestrator/ghostpaw_orchestrator.py
 
-from fastapi import FastAPI, Body, HTTPException
-from typing import Dict, Literal, Optional
-import time
+from fastapi import FastAPI, Body, HTTPException, Query
+from fastapi.responses import Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from typing import Literal, Optional
+import os
 
-app = FastAPI(title="Ghostpaw Orchestrator", version="0.1.0")
+from liveness import LivenessEngine
+from service_store import store_from_env
 
-# In-memory registry for demo; move to MySQL table for production
-registered_services: Dict[str, Dict] = {}
+app = FastAPI(title="Ghostpaw Orchestrator", version="0.2.0")
+
+# Backend chosen by ORCH_STORE (memory | redis | mysql), see service_store.py
+services = store_from_env()
+
+# Services that miss check-ins for ORCH_LIVENESS_WINDOW seconds go offline.
+liveness = LivenessEngine(
+    services,
+    window=float(os.getenv("ORCH_LIVENESS_WINDOW", "30")),
+    tick=float(os.getenv("ORCH_LIVENESS_TICK", "1")),
+)
+
+app.add_event_handler("startup", services.start)
+app.add_event_handler("startup", liveness.start)
+app.add_event_handler("shutdown", liveness.close)
+app.add_event_handler("shutdown", services.close)
+
+ServiceType = Literal["spirit", "builder", "dashboard", "memory", "control", "other"]
+ServiceStatus = Literal["online", "offline", "error"]
 
 @app.post("/v1/registry/checkin")
 def checkin_service(
     name: str = Body(..., embed=True),
-    service_type: Literal["spirit", "builder", "dashboard", "memory", "control", "other"] = Body(..., embed=True),
+    service_type: ServiceType = Body(..., embed=True),
     api_url: str = Body(..., embed=True),
     meta: Optional[dict] = Body(None, embed=True)
 ):
-    registered_services[name] = {
-        "type": service_type,
-        "api_url": api_url,
-        "meta": meta or {},
-        "last_checkin": int(time.time()),
-        "status": "online"
-    }
-    return {"ok": True, "data": registered_services[name]}
+    record = services.checkin(name, service_type, api_url, meta)
+    liveness.observe_checkin(name)
+    return {"ok": True, "data": record}
 
 @app.get("/v1/registry/services")
-def list_services():
-    return {"ok": True, "data": list(registered_services.values())}
+def list_services(
+    service_type: Optional[ServiceType] = Query(None),
+    status: Optional[ServiceStatus] = Query(None)
+):
+    return {"ok": True, "data": services.list(service_type=service_type, status=status)}
 
 @app.post("/v1/registry/service_status")
 def update_service_status(
     name: str = Body(..., embed=True),
-    status: Literal["online", "offline", "error"] = Body(..., embed=True)
+    status: ServiceStatus = Body(..., embed=True)
 ):
-    if name not in registered_services:
+    record = services.set_status(name, status)
+    if record is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    registered_services[name]["status"] = status
-    registered_services[name]["last_checkin"] = int(time.time())
-    return {"ok": True, "data": registered_services[name]}
+    liveness.observe_status(name, status)
+    return {"ok": True, "data": record}
 
 @app.get("/v1/registry/health")
 def registry_health():
     # Simple alive check
-    return {"ok": True, "services": len(registered_services)}
+    return {"ok": True, "services": services.count()}
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,166 @@
+# /home/melynxis/solace/services/orchestrator/liveness.py
+"""
+Heartbeat liveness for Ghostpaw services.
+
+Each online service sits in one slot of a hashed timer wheel keyed by
+floor(deadline / tick), where deadline = last check-in + window. A check-in
+moves the name to a later slot (O(1)); every tick pops only the slots that
+have come due, so tick cost tracks the number of services expiring, not
+the fleet size.
+
+Due names are confirmed against the store with expire_many(), which only
+flips services still online with last_checkin older than the window. With
+a shared backend another worker may have taken the heartbeat; those come
+back as alive with their real last_checkin and are re-armed from it.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Dict, Optional
+import logging, math, threading, time
+
+log = logging.getLogger("ghostpaw.liveness")
+
+status_transitions = Counter(
+    "ghostpaw_service_status_transitions_total", "Service status transitions", ["from_status", "to_status", "reason"]
+)
+checkin_lag_seconds = Histogram(
+    "ghostpaw_checkin_lag_seconds", "Seconds between consecutive check-ins of a service",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 300, 600),
+)
+liveness_tracked = Gauge("ghostpaw_liveness_tracked_services", "Services armed in the liveness wheel")
+liveness_tick_seconds = Histogram(
+    "ghostpaw_liveness_tick_seconds", "Time spent expiring due services per tick",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+class LivenessEngine:
+    def __init__(self, store, window: float = 30.0, tick: float = 1.0, batch: int = 500):
+        self.store = store
+        self.window = window
+        self.tick = tick
+        self.batch = batch
+        self._slots: Dict[int, set] = {}
+        self._slot_of: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._status: Dict[str, str] = {}
+        self._cursor = self._slot(time.time())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _slot(self, ts: float) -> int:
+        return math.floor(ts / self.tick)
+
+    # -- wheel --
+    def _arm(self, name: str, last_checkin: float):
+        slot = max(self._slot(last_checkin + self.window), self._cursor)
+        old = self._slot_of.get(name)
+        if old == slot:
+            return
+        if old is not None:
+            self._slots[old].discard(name)
+        self._slots.setdefault(slot, set()).add(name)
+        self._slot_of[name] = slot
+
+    def _disarm(self, name: str):
+        old = self._slot_of.pop(name, None)
+        if old is not None:
+            self._slots[old].discard(name)
+
+    # -- events from the API --
+    def _transition(self, name: str, status: str, reason: str):
+        prev = self._status.get(name, "unknown")
+        if prev != status:
+            status_transitions.labels(from_status=prev, to_status=status, reason=reason).inc()
+        self._status[name] = status
+
+    def observe_checkin(self, name: str, ts: Optional[float] = None):
+        ts = ts or time.time()
+        with self._lock:
+            prev = self._last_seen.get(name)
+            if prev is not None and ts >= prev:
+                checkin_lag_seconds.observe(ts - prev)
+            self._last_seen[name] = ts
+            self._transition(name, "online", "checkin")
+            self._arm(name, ts)
+        liveness_tracked.set(len(self._slot_of))
+
+    def observe_status(self, name: str, status: str):
+        with self._lock:
+            self._transition(name, status, "manual")
+            if status == "online":
+                self._arm(name, time.time())
+            else:
+                self._disarm(name)
+        liveness_tracked.set(len(self._slot_of))
+
+    # -- expiry --
+    def _due(self, now: float) -> list[str]:
+        with self._lock:
+            end = self._slot(now)
+            due = []
+            while self._cursor <= end:
+                for name in self._slots.pop(self._cursor, ()):
+                    self._slot_of.pop(name, None)
+                    due.append(name)
+                self._cursor += 1
+            return due
+
+    def run_once(self, now: Optional[float] = None) -> list[str]:
+        now = now or time.time()
+        t0 = time.perf_counter()
+        due = self._due(now)
+        cutoff = int(now - self.window)
+        expired_all = []
+        for i in range(0, len(due), self.batch):
+            chunk = due[i:i + self.batch]
+            try:
+                expired, alive = self.store.expire_many(chunk, cutoff)
+            except Exception as e:
+                log.warning("liveness expiry of %d services failed, retrying next tick: %s", len(chunk), e)
+                with self._lock:
+                    for name in chunk:
+                        if name not in self._slot_of:
+                            self._arm(name, now - self.window + self.tick)
+                continue
+            with self._lock:
+                for name in expired:
+                    self._transition(name, "offline", "expired")
+                for name, last in alive.items():
+                    if name not in self._slot_of:
+                        self._arm(name, last)
+            expired_all.extend(expired)
+        liveness_tracked.set(len(self._slot_of))
+        liveness_tick_seconds.observe(time.perf_counter() - t0)
+        if expired_all:
+            log.info("marked %d services offline after %ss without check-in", len(expired_all), self.window)
+        return expired_all
+
+    # -- lifecycle --
+    def seed(self):
+        """Arm services already online in the store (e.g. after a restart)."""
+        records = self.store.list(status="online")
+        with self._lock:
+            for rec in records:
+                self._status[rec["name"]] = "online"
+                self._arm(rec["name"], rec["last_checkin"])
+        liveness_tracked.set(len(self._slot_of))
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            try:
+                self.run_once()
+            except Exception as e:
+                log.exception("liveness tick failed: %s", e)
+
+    def start(self):
+        try:
+            self.seed()
+        except Exception as e:
+            log.warning("liveness seed failed, tracking new check-ins only: %s", e)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="liveness", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
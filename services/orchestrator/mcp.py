@@ -3,30 +3,45 @@
 Ghostpaw MCP — Master Control Program
 Section 3: MCP manages runtime, lifecycle, and orchestration.
 Tmux creation/modification logic will be added later.
+
+Birth and change are queued as jobs (see mcp_jobs.py): the endpoints answer
+202 with the job, and GET /v1/mcp/jobs/{id} reports its outcome.
 """
 
 from fastapi import FastAPI, Body, HTTPException
+from fastapi.responses import Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
 from typing import Optional, Literal
-import time
+import os, threading, time
+
+from mcp_jobs import JobError, JobExecutor, QueueFull
 
-app = FastAPI(title="Ghostpaw MCP", version="0.1.0")
+app = FastAPI(title="Ghostpaw MCP", version="0.2.0")
 
 # In-memory state (will wire to DB/Registry later)
 spirits: dict[str, dict] = {}
+spirits_lock = threading.Lock()
 
-@app.get("/v1/mcp/health")
-def health():
-    return {"ok": True, "spirits": len(spirits)}
+jobs = JobExecutor(
+    workers=int(os.getenv("MCP_WORKERS", "4")),
+    max_queue=int(os.getenv("MCP_QUEUE_MAX", "1000")),
+    retention=float(os.getenv("MCP_JOB_RETENTION", "3600")),
+)
 
-@app.post("/v1/mcp/birth")
-def birth_spirit(
-    name: str = Body(..., embed=True),
-    role: str = Body(..., embed=True),
-    meta: Optional[dict] = Body(None, embed=True)
-):
+app.add_event_handler("startup", jobs.start)
+app.add_event_handler("shutdown", jobs.close)
+
+def submit(op: str, name: str, fn) -> dict:
+    try:
+        return {"ok": True, "job": jobs.submit(op, name, fn)}
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e)) from e
+
+# -- operations (run on a job worker, serialized per name) --
+def _birth(name: str, role: str, meta: Optional[dict]) -> dict:
     # Tmux creation logic will be added in future
     if name in spirits:
-        raise HTTPException(status_code=409, detail="spirit name exists")
+        raise JobError(409, "spirit name exists")
     spirit = {
         "name": name,
         "role": role,
@@ -34,22 +49,50 @@ def birth_spirit(
         "meta": meta or {},
         "born_at": int(time.time())
     }
-    spirits[name] = spirit
-    return {"ok": True, "spirit": spirit}
+    with spirits_lock:
+        spirits[name] = spirit
+    return {"spirit": spirit}
+
+def _change(name: str, new_state: str, note: Optional[str]) -> dict:
+    if name not in spirits:
+        raise JobError(404, "spirit not found")
+    with spirits_lock:
+        spirit = {**spirits[name], "state": new_state, "note": note, "changed_at": int(time.time())}
+        spirits[name] = spirit
+    return {"spirit": spirit}
 
-@app.post("/v1/mcp/change")
+@app.get("/v1/mcp/health")
+def health():
+    return {"ok": True, "spirits": len(spirits), "jobs": jobs.stats()}
+
+@app.post("/v1/mcp/birth", status_code=202)
+def birth_spirit(
+    name: str = Body(..., embed=True),
+    role: str = Body(..., embed=True),
+    meta: Optional[dict] = Body(None, embed=True)
+):
+    return submit("birth", name, lambda: _birth(name, role, meta))
+
+@app.post("/v1/mcp/change", status_code=202)
 def change_spirit(
     name: str = Body(..., embed=True),
     new_state: Literal["ready", "error", "archived"] = Body(..., embed=True),
     note: Optional[str] = Body(None, embed=True)
 ):
-    if name not in spirits:
-        raise HTTPException(status_code=404, detail="spirit not found")
-    spirits[name]["state"] = new_state
-    spirits[name]["note"] = note
-    spirits[name]["changed_at"] = int(time.time())
-    return {"ok": True, "spirit": spirits[name]}
+    return submit("change", name, lambda: _change(name, new_state, note))
+
+@app.get("/v1/mcp/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return {"ok": True, "job": job}
 
 @app.get("/v1/mcp/spirits")
 def list_spirits():
-    return {"ok": True, "spirits": list(spirits.values())}
+    with spirits_lock:
+        return {"ok": True, "spirits": list(spirits.values())}
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,158 @@
+# /home/melynxis/solace/services/orchestrator/mcp_jobs.py
+"""
+Job executor for MCP lifecycle operations (birth, change).
+
+The API only enqueues: each submit returns a job record straight away and a
+bounded pool of worker threads runs the operation. Jobs for the same spirit
+name run one at a time in submission order; different names run in
+parallel. A name is in the ready queue at most once, so a burst of changes
+to one spirit occupies a single worker instead of parking the whole pool on
+its lock.
+
+Submits beyond max_queue pending jobs raise QueueFull (the API answers 429).
+Finished jobs stay readable for `retention` seconds.
+
+Everything lives in this process: run the MCP as a single uvicorn worker
+and size the pool with MCP_WORKERS.
+"""
+
+from collections import deque
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Callable, Deque, Dict, Optional
+import logging, queue, threading, time, uuid
+
+log = logging.getLogger("ghostpaw.mcp_jobs")
+
+jobs_total = Counter("ghostpaw_mcp_jobs_total", "MCP jobs finished", ["op", "status"])
+jobs_rejected = Counter("ghostpaw_mcp_jobs_rejected_total", "MCP jobs rejected because the queue was full", ["op"])
+queue_depth = Gauge("ghostpaw_mcp_queue_depth", "MCP jobs queued and not yet started")
+workers_total = Gauge("ghostpaw_mcp_workers", "MCP worker threads")
+workers_busy = Gauge("ghostpaw_mcp_workers_busy", "MCP worker threads running a job")
+job_wait_seconds = Histogram(
+    "ghostpaw_mcp_job_wait_seconds", "Seconds from submit to start", ["op"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+job_run_seconds = Histogram(
+    "ghostpaw_mcp_job_run_seconds", "Seconds spent running a job", ["op"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+
+class QueueFull(Exception):
+    pass
+
+class JobError(Exception):
+    """An operation's expected failure, recorded on the job as {code, message}."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class JobExecutor:
+    def __init__(self, workers: int = 4, max_queue: int = 1000, retention: float = 3600.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self._jobs: Dict[str, Dict] = {}
+        self._fns: Dict[str, Callable[[], Dict]] = {}
+        self._by_name: Dict[str, Deque[str]] = {}  # pending job ids per name, head runs next
+        self._finished: Deque[tuple] = deque()     # (finished_at, job_id), for retention
+        self._ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending = 0
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._threads: list = []
+
+    def submit(self, op: str, name: str, fn: Callable[[], Dict]) -> Dict:
+        """Queue fn() behind earlier jobs for `name`; returns a snapshot of the job."""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                jobs_rejected.labels(op=op).inc()
+                raise QueueFull(f"{self._pending} MCP jobs pending")
+            job_id = uuid.uuid4().hex
+            job = {"id": job_id, "op": op, "name": name, "status": "queued",
+                   "submitted_at": time.time(), "started_at": None, "finished_at": None,
+                   "result": None, "error": None}
+            self._jobs[job_id] = job
+            self._fns[job_id] = fn
+            self._pending += 1
+            backlog = self._by_name.setdefault(name, deque())
+            backlog.append(job_id)
+            if len(backlog) == 1:  # otherwise the name is already queued or running
+                self._ready.put(name)
+            queue_depth.set(self._pending)
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"workers": self.workers, "busy": self._busy, "queued": self._pending}
+
+    # -- workers --
+    def _expire(self, now: float):
+        while self._finished and self._finished[0][0] < now - self.retention:
+            self._jobs.pop(self._finished.popleft()[1], None)
+
+    def _take(self, name: str) -> tuple[Dict, Callable[[], Dict]]:
+        with self._lock:
+            job_id = self._by_name[name][0]
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._pending -= 1
+            self._busy += 1
+            queue_depth.set(self._pending)
+            workers_busy.set(self._busy)
+        job_wait_seconds.labels(op=job["op"]).observe(job["started_at"] - job["submitted_at"])
+        return job, self._fns.pop(job_id)
+
+    def _finish(self, name: str, job: Dict, status: str, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            job.update(status=status, finished_at=now, result=result, error=error)
+            self._finished.append((now, job["id"]))
+            self._expire(now)
+            backlog = self._by_name[name]
+            backlog.popleft()
+            if backlog:
+                self._ready.put(name)
+            else:
+                del self._by_name[name]
+            self._busy -= 1
+            workers_busy.set(self._busy)
+        jobs_total.labels(op=job["op"], status=status).inc()
+        job_run_seconds.labels(op=job["op"]).observe(now - job["started_at"])
+
+    def _run(self):
+        while (name := self._ready.get()) is not None:
+            job, fn = self._take(name)
+            try:
+                self._finish(name, job, "succeeded", result=fn())
+            except JobError as e:
+                self._finish(name, job, "failed", error={"code": e.code, "message": e.message})
+            except Exception as e:
+                log.exception("MCP job %s (%s %s) crashed", job["id"], job["op"], name)
+                self._finish(name, job, "failed", error={"code": 500, "message": str(e)})
+
+    # -- lifecycle --
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"mcp-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        workers_total.set(self.workers)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers (up to timeout each); jobs not yet started are dropped."""
+        for _ in self._threads:
+            self._ready.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
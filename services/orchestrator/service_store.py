@@ -0,0 +1,518 @@
+# /home/melynxis/solace/services/orchestrator/service_store.py
+"""
+Storage backends for Ghostpaw service check-ins.
+
+ORCH_STORE picks the backend:
+  memory  process-local dicts (default; single worker, lost on restart)
+  redis   one hash per service plus index sets per service_type and status
+  mysql   rows in registry_services (see tools/orchestrator_db_migrate_v1.sh)
+
+Every backend keeps service_type/status indexes so filtered listings cost
+O(matches), not O(fleet). Shared backends coalesce heartbeats: a check-in
+whose type/api_url/meta match what this worker last wrote only bumps
+last_checkin, and those bumps are flushed together every
+ORCH_HEARTBEAT_FLUSH_MS in one Redis call or one UPDATE.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import json, logging, os, threading, time, uuid
+
+try:
+    from sqlalchemy import bindparam, create_engine, text
+except ImportError:  # optional: only needed for ORCH_STORE=mysql
+    bindparam = create_engine = text = None
+
+try:
+    import redis
+except ImportError:  # optional: only needed for ORCH_STORE=redis
+    redis = None
+
+log = logging.getLogger("ghostpaw.service_store")
+
+SERVICE_TYPES = ("spirit", "builder", "dashboard", "memory", "control", "other")
+STATUSES = ("online", "offline", "error")
+
+def make_record(name: str, service_type: str, api_url: str, meta: Optional[dict],
+                last_checkin: int, status: str) -> Dict:
+    return {"name": name, "type": service_type, "api_url": api_url, "meta": meta or {},
+            "last_checkin": last_checkin, "status": status}
+
+class ServiceStore:
+    """Interface shared by the backends; records are plain dicts (make_record)."""
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def checkin(self, name: str, service_type: str, api_url: str, meta: Optional[dict]) -> Dict:
+        raise NotImplementedError
+
+    def set_status(self, name: str, status: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get(self, name: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def list(self, service_type: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def expire_many(self, names: List[str], cutoff: int) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Mark offline every name that is still online with last_checkin < cutoff.
+        Returns (expired names, {name: last_checkin} for those still online);
+        names neither expired nor online are in neither.
+        """
+        raise NotImplementedError
+
+# -----------------------------
+# Memory
+# -----------------------------
+class MemoryStore(ServiceStore):
+    def __init__(self):
+        self._records: Dict[str, Dict] = {}
+        self._by_type: Dict[str, set] = {}
+        self._by_status: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, rec: Dict, prev: Optional[Dict]):
+        name = rec["name"]
+        if prev is not None:
+            if prev["type"] != rec["type"]:
+                self._by_type[prev["type"]].discard(name)
+            if prev["status"] != rec["status"]:
+                self._by_status[prev["status"]].discard(name)
+        self._by_type.setdefault(rec["type"], set()).add(name)
+        self._by_status.setdefault(rec["status"], set()).add(name)
+
+    def checkin(self, name, service_type, api_url, meta):
+        rec = make_record(name, service_type, api_url, meta, int(time.time()), "online")
+        with self._lock:
+            self._index(rec, self._records.get(name))
+            self._records[name] = rec
+        return dict(rec)
+
+    def set_status(self, name, status):
+        with self._lock:
+            prev = self._records.get(name)
+            if prev is None:
+                return None
+            rec = {**prev, "status": status, "last_checkin": int(time.time())}
+            self._index(rec, prev)
+            self._records[name] = rec
+        return dict(rec)
+
+    def get(self, name):
+        rec = self._records.get(name)
+        return dict(rec) if rec else None
+
+    def list(self, service_type=None, status=None):
+        with self._lock:
+            names = _intersect(self._records.keys(),
+                               self._by_type.get(service_type, set()) if service_type else None,
+                               self._by_status.get(status, set()) if status else None)
+            return [dict(self._records[n]) for n in names]
+
+    def count(self):
+        return len(self._records)
+
+    def expire_many(self, names, cutoff):
+        expired, alive = [], {}
+        with self._lock:
+            for name in names:
+                prev = self._records.get(name)
+                if prev is None or prev["status"] != "online":
+                    continue
+                if prev["last_checkin"] >= cutoff:
+                    alive[name] = prev["last_checkin"]
+                    continue
+                rec = {**prev, "status": "offline"}
+                self._index(rec, prev)
+                self._records[name] = rec
+                expired.append(name)
+        return expired, alive
+
+def _intersect(all_names: Iterable[str], *indexes: Optional[set]) -> Iterable[str]:
+    """Walk the smallest applicable index; fall back to everything when unfiltered."""
+    sets = sorted((s for s in indexes if s is not None), key=len)
+    if not sets:
+        return list(all_names)
+    first, rest = sets[0], sets[1:]
+    return [n for n in first if all(n in s for s in rest)]
+
+# -----------------------------
+# Heartbeat coalescing (shared backends)
+# -----------------------------
+class HeartbeatBuffer:
+    """
+    Pending last_checkin bumps, flushed in one batch by a background thread.
+    Reads on this worker overlay pending values so they never go backwards.
+    """
+
+    def __init__(self, flush, interval: float, fingerprint_ttl: float = 60.0):
+        self._flush = flush
+        self.interval = interval
+        self.fingerprint_ttl = fingerprint_ttl
+        self._pending: Dict[str, int] = {}
+        self._written: Dict[str, tuple] = {}  # name -> (fingerprint, written_at)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def unchanged(self, name: str, fingerprint: tuple) -> bool:
+        seen = self._written.get(name)
+        return seen is not None and seen[0] == fingerprint and time.monotonic() - seen[1] < self.fingerprint_ttl
+
+    def remember(self, name: str, fingerprint: tuple):
+        self._written[name] = (fingerprint, time.monotonic())
+        with self._lock:
+            self._pending.pop(name, None)
+
+    def bump(self, name: str, ts: int):
+        with self._lock:
+            self._pending[name] = ts
+
+    def pending(self, name: str) -> Optional[int]:
+        return self._pending.get(name)
+
+    def overlay(self, rec: Optional[Dict]) -> Optional[Dict]:
+        if rec is not None:
+            ts = self._pending.get(rec["name"])
+            if ts is not None and ts > rec["last_checkin"]:
+                rec["last_checkin"] = ts
+                rec["status"] = "online"
+        return rec
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            self._flush(batch)
+        except Exception as e:
+            log.warning("heartbeat flush of %d services failed: %s", len(batch), e)
+            with self._lock:
+                for name, ts in batch.items():
+                    if self._pending.get(name, 0) < ts:
+                        self._pending[name] = ts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="heartbeat-flush", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+class _CoalescingStore(ServiceStore):
+    """Routes unchanged check-ins through a HeartbeatBuffer."""
+
+    def __init__(self, flush_interval: float):
+        self.heartbeats = HeartbeatBuffer(self._flush_heartbeats, flush_interval)
+
+    def start(self):
+        self.heartbeats.start()
+
+    def close(self):
+        self.heartbeats.close()
+
+    def checkin(self, name, service_type, api_url, meta):
+        ts = int(time.time())
+        meta_json = json.dumps(meta or {}, sort_keys=True, separators=(",", ":"))
+        fingerprint = (service_type, api_url, meta_json)
+        if self.heartbeats.unchanged(name, fingerprint):
+            self.heartbeats.bump(name, ts)
+        else:
+            self._write(name, service_type, api_url, meta_json, ts)
+            self.heartbeats.remember(name, fingerprint)
+        return make_record(name, service_type, api_url, meta, ts, "online")
+
+    def _write(self, name, service_type, api_url, meta_json, ts):
+        raise NotImplementedError
+
+    def _flush_heartbeats(self, batch: Dict[str, int]):
+        raise NotImplementedError
+
+    def expire_many(self, names, cutoff):
+        if any(self.heartbeats.pending(n) is not None for n in names):
+            self.heartbeats.flush()
+        return self._expire(names, cutoff)
+
+    def _expire(self, names, cutoff):
+        raise NotImplementedError
+
+# -----------------------------
+# Redis
+# -----------------------------
+# Keys (P = prefix): P:h:<name> hash, P:all, P:type:<t>, P:status:<s> sets.
+# Index keys are derived inside the scripts, so this assumes a single
+# (non-cluster) Redis, which is what infra/compose.core.yml runs.
+_REDIS_CHECKIN = """
+local p, name, t, st = ARGV[1], ARGV[2], ARGV[3], ARGV[6]
+local old = redis.call('HMGET', KEYS[1], 'type', 'status')
+if old[1] and old[1] ~= t then redis.call('SREM', p .. ':type:' .. old[1], name) end
+if old[2] and old[2] ~= st then redis.call('SREM', p .. ':status:' .. old[2], name) end
+redis.call('HSET', KEYS[1], 'name', name, 'type', t, 'api_url', ARGV[4], 'meta', ARGV[5],
+           'last_checkin', ARGV[7], 'status', st)
+redis.call('SADD', p .. ':all', name)
+redis.call('SADD', p .. ':type:' .. t, name)
+redis.call('SADD', p .. ':status:' .. st, name)
+return 1
+"""
+
+_REDIS_SET_STATUS = """
+local p, name, st = ARGV[1], ARGV[2], ARGV[3]
+local old = redis.call('HGET', KEYS[1], 'status')
+if not old then return nil end
+if old ~= st then
+  redis.call('SREM', p .. ':status:' .. old, name)
+  redis.call('SADD', p .. ':status:' .. st, name)
+end
+redis.call('HSET', KEYS[1], 'status', st, 'last_checkin', ARGV[4])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# ARGV = prefix, name1, ts1, name2, ts2, ... ; a heartbeat also means online.
+_REDIS_HEARTBEATS = """
+local p = ARGV[1]
+for i = 2, #ARGV, 2 do
+  local name, ts = ARGV[i], ARGV[i + 1]
+  local key = p .. ':h:' .. name
+  local old = redis.call('HMGET', key, 'status', 'last_checkin')
+  if old[1] and tonumber(ts) > tonumber(old[2] or 0) then
+    if old[1] ~= 'online' then
+      redis.call('SREM', p .. ':status:' .. old[1], name)
+      redis.call('SADD', p .. ':status:online', name)
+    end
+    redis.call('HSET', key, 'status', 'online', 'last_checkin', ts)
+  end
+end
+return 1
+"""
+
+# ARGV = prefix, cutoff, name1, name2, ... ; returns {{expired...}, {alive, ts, ...}}
+_REDIS_EXPIRE = """
+local p, cutoff = ARGV[1], tonumber(ARGV[2])
+local expired, alive = {}, {}
+for i = 3, #ARGV do
+  local name = ARGV[i]
+  local key = p .. ':h:' .. name
+  local cur = redis.call('HMGET', key, 'status', 'last_checkin')
+  if cur[1] == 'online' then
+    if tonumber(cur[2] or 0) < cutoff then
+      redis.call('HSET', key, 'status', 'offline')
+      redis.call('SREM', p .. ':status:online', name)
+      redis.call('SADD', p .. ':status:offline', name)
+      table.insert(expired, name)
+    else
+      table.insert(alive, name)
+      table.insert(alive, cur[2])
+    end
+  end
+end
+return {expired, alive}
+"""
+
+class RedisStore(_CoalescingStore):
+    def __init__(self, client, prefix: str = "ghostpaw:svc", flush_interval: float = 0.25):
+        super().__init__(flush_interval)
+        self.r = client
+        self.prefix = prefix
+        self._checkin = client.register_script(_REDIS_CHECKIN)
+        self._set_status = client.register_script(_REDIS_SET_STATUS)
+        self._heartbeats = client.register_script(_REDIS_HEARTBEATS)
+        self._expire_script = client.register_script(_REDIS_EXPIRE)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:h:{name}"
+
+    @staticmethod
+    def _decode(h: Dict) -> Optional[Dict]:
+        if not h:
+            return None
+        h = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+             for k, v in h.items()}
+        return make_record(h["name"], h["type"], h["api_url"], json.loads(h.get("meta") or "{}"),
+                           int(h["last_checkin"]), h["status"])
+
+    def _write(self, name, service_type, api_url, meta_json, ts):
+        self._checkin(keys=[self._key(name)],
+                      args=[self.prefix, name, service_type, api_url, meta_json, "online", ts])
+
+    def _flush_heartbeats(self, batch):
+        args = [self.prefix]
+        for name, ts in batch.items():
+            args += [name, ts]
+        self._heartbeats(keys=[], args=args)
+
+    def set_status(self, name, status):
+        # Land any buffered heartbeat first so it can't revive the service afterwards.
+        if self.heartbeats.pending(name) is not None:
+            self.heartbeats.flush()
+        flat = self._set_status(keys=[self._key(name)], args=[self.prefix, name, status, int(time.time())])
+        if not flat:
+            return None
+        return self._decode(dict(zip(flat[::2], flat[1::2])))
+
+    def get(self, name):
+        return self.heartbeats.overlay(self._decode(self.r.hgetall(self._key(name))))
+
+    def list(self, service_type=None, status=None):
+        keys = []
+        if service_type:
+            keys.append(f"{self.prefix}:type:{service_type}")
+        if status:
+            keys.append(f"{self.prefix}:status:{status}")
+        names = self.r.sinter(keys) if keys else self.r.smembers(f"{self.prefix}:all")
+        pipe = self.r.pipeline(transaction=False)
+        for n in names:
+            pipe.hgetall(self._key(n.decode() if isinstance(n, bytes) else n))
+        out = [self.heartbeats.overlay(self._decode(h)) for h in pipe.execute()]
+        return [rec for rec in out if rec is not None and (not status or rec["status"] == status)]
+
+    def count(self):
+        return self.r.scard(f"{self.prefix}:all")
+
+    def _expire(self, names, cutoff):
+        expired, alive = ([v.decode() if isinstance(v, bytes) else v for v in part]
+                          for part in self._expire_script(keys=[], args=[self.prefix, cutoff, *names]))
+        return expired, {alive[i]: int(alive[i + 1]) for i in range(0, len(alive), 2)}
+
+# -----------------------------
+# MySQL (registry_services)
+# -----------------------------
+class MySQLStore(_CoalescingStore):
+    """
+    Check-ins are rows of registry_services keyed by the unique name; api_url
+    and meta live in the config JSON. The (type, ...) and (status, ...)
+    indexes from registry_db_migrate_v2 serve the filtered listings.
+    """
+
+    COLUMNS = "name, type, config, status, last_checkin"
+
+    def __init__(self, engine, flush_interval: float = 0.25):
+        super().__init__(flush_interval)
+        self.engine = engine
+
+    @staticmethod
+    def _decode(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        config = row["config"]
+        if isinstance(config, (str, bytes)):
+            config = json.loads(config)
+        config = config or {}
+        return make_record(row["name"], row["type"], config.get("api_url"), config.get("meta"),
+                           int(row["last_checkin"] or 0), row["status"])
+
+    def _write(self, name, service_type, api_url, meta_json, ts):
+        config = json.dumps({"api_url": api_url, "meta": json.loads(meta_json)})
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO registry_services (id, name, type, config, auth_mode, status, last_checkin, created_at, updated_at) "
+                    "VALUES (:id, :name, :type, CAST(:config AS JSON), 'none', 'online', :ts, UTC_TIMESTAMP(), UTC_TIMESTAMP()) "
+                    "ON DUPLICATE KEY UPDATE type=VALUES(type), config=VALUES(config), status='online', "
+                    "last_checkin=VALUES(last_checkin), updated_at=VALUES(updated_at)"
+                ),
+                {"id": str(uuid.uuid4()), "name": name, "type": service_type, "config": config, "ts": ts},
+            )
+
+    def _flush_heartbeats(self, batch):
+        cases, params = [], {"names": list(batch)}
+        for n, (name, ts) in enumerate(batch.items()):
+            cases.append(f"WHEN :n{n} THEN :t{n}")
+            params.update({f"n{n}": name, f"t{n}": ts})
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"UPDATE registry_services SET last_checkin = GREATEST(COALESCE(last_checkin, 0), "
+                    f"CASE name {' '.join(cases)} END), status = 'online', updated_at = UTC_TIMESTAMP() "
+                    f"WHERE name IN :names"
+                ).bindparams(bindparam("names", expanding=True)),
+                params,
+            )
+
+    def set_status(self, name, status):
+        if self.heartbeats.pending(name) is not None:
+            self.heartbeats.flush()
+        with self.engine.begin() as conn:
+            hit = conn.execute(
+                text("UPDATE registry_services SET status=:s, last_checkin=:ts, updated_at=UTC_TIMESTAMP() WHERE name=:name"),
+                {"s": status, "ts": int(time.time()), "name": name},
+            ).rowcount
+            if not hit:
+                return None
+            row = conn.execute(text(f"SELECT {self.COLUMNS} FROM registry_services WHERE name=:name"),
+                               {"name": name}).mappings().first()
+        return self._decode(row)
+
+    def get(self, name):
+        with self.engine.connect() as conn:
+            row = conn.execute(text(f"SELECT {self.COLUMNS} FROM registry_services WHERE name=:name"),
+                               {"name": name}).mappings().first()
+        return self.heartbeats.overlay(self._decode(row))
+
+    def list(self, service_type=None, status=None):
+        where, params = ["last_checkin IS NOT NULL"], {}
+        if service_type:
+            where.append("type = :t")
+            params["t"] = service_type
+        if status:
+            where.append("status = :s")
+            params["s"] = status
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT {self.COLUMNS} FROM registry_services WHERE {' AND '.join(where)}"),
+                                params).mappings().all()
+        out = [self.heartbeats.overlay(self._decode(r)) for r in rows]
+        return [rec for rec in out if not status or rec["status"] == status]
+
+    def count(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM registry_services WHERE last_checkin IS NOT NULL")).scalar()
+
+    def _expire(self, names, cutoff):
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT name, last_checkin FROM registry_services "
+                     "WHERE name IN :names AND status = 'online' FOR UPDATE")
+                    .bindparams(bindparam("names", expanding=True)),
+                {"names": list(names)},
+            ).all()
+            expired = [r[0] for r in rows if (r[1] or 0) < cutoff]
+            if expired:
+                conn.execute(
+                    text("UPDATE registry_services SET status = 'offline', updated_at = UTC_TIMESTAMP() "
+                         "WHERE name IN :names").bindparams(bindparam("names", expanding=True)),
+                    {"names": expired},
+                )
+        return expired, {r[0]: int(r[1]) for r in rows if (r[1] or 0) >= cutoff}
+
+# -----------------------------
+# Factory
+# -----------------------------
+def store_from_env() -> ServiceStore:
+    kind = os.getenv("ORCH_STORE", "memory")
+    flush = float(os.getenv("ORCH_HEARTBEAT_FLUSH_MS", "250")) / 1000
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "redis":
+        client = redis.Redis(host=os.getenv("REDIS_HOST", "127.0.0.1"), port=int(os.getenv("REDIS_PORT", "6379")),
+                             password=os.getenv("REDIS_PASSWORD") or None, socket_timeout=1.0)
+        return RedisStore(client, prefix=os.getenv("ORCH_REDIS_PREFIX", "ghostpaw:svc"), flush_interval=flush)
+    if kind == "mysql":
+        url = (f"mysql+pymysql://{os.getenv('MYSQL_USER', 'solace_app')}:{os.getenv('MYSQL_PASSWORD', 'solace_app_pwd')}"
+               f"@{os.getenv('MYSQL_HOST', '127.0.0.1')}:{os.getenv('MYSQL_PORT', '3306')}/{os.getenv('MYSQL_DB', 'solace')}")
+        engine = create_engine(url, pool_pre_ping=True, pool_recycle=300, pool_size=5, max_overflow=10, future=True)
+        return MySQLStore(engine, flush_interval=flush)
+    raise ValueError(f"unknown ORCH_STORE {kind!r} (memory, redis, mysql)")
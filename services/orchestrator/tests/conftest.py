@@ -0,0 +1,4 @@
+import os, sys
+
+# The orchestrator modules import each other as top-level modules (uvicorn ghostpaw_orchestrator:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from liveness import LivenessEngine
+from service_store import MemoryStore
+
+WINDOW = 30.0
+
+def checkin(store, engine, name, ts):
+    """A check-in at ts, as the API does it: write the store, then tell the engine."""
+    store.checkin(name, "spirit", f"http://{name}", None)
+    store._records[name]["last_checkin"] = int(ts)
+    engine.observe_checkin(name, ts)
+
+@pytest.fixture
+def t0():
+    return float(int(time.time()))
+
+@pytest.fixture
+def store():
+    return MemoryStore()
+
+@pytest.fixture
+def engine(store):
+    return LivenessEngine(store, window=WINDOW, tick=1.0)
+
+def test_silent_service_expires_after_the_window(store, engine, t0):
+    checkin(store, engine, "eira", t0)
+    assert engine.run_once(t0 + WINDOW - 2) == []
+    assert engine.run_once(t0 + WINDOW + 2) == ["eira"]
+    assert store.get("eira")["status"] == "offline"
+    assert engine.run_once(t0 + WINDOW + 3) == []
+
+def test_checkin_moves_the_deadline(store, engine, t0):
+    checkin(store, engine, "eira", t0)
+    checkin(store, engine, "eira", t0 + 20)
+    assert engine.run_once(t0 + WINDOW + 2) == []
+    assert store.get("eira")["status"] == "online"
+    assert engine.run_once(t0 + 20 + WINDOW + 2) == ["eira"]
+
+def test_tick_only_touches_due_slots(store, engine, t0):
+    for i in range(100):
+        checkin(store, engine, f"s{i}", t0 + i)
+    assert engine.run_once(t0 + WINDOW + 4.5) == ["s0", "s1", "s2", "s3"]
+    assert len(engine._slot_of) == 96
+
+def test_heartbeat_taken_by_another_worker_rearms(store, engine, t0):
+    checkin(store, engine, "eira", t0)
+    store._records["eira"]["last_checkin"] = int(t0 + 25)  # written by another worker
+    assert engine.run_once(t0 + WINDOW + 2) == []
+    assert "eira" in engine._slot_of
+    assert engine.run_once(t0 + 25 + WINDOW + 2) == ["eira"]
+
+def test_manual_status_disarms(store, engine, t0):
+    checkin(store, engine, "eira", t0)
+    store.set_status("eira", "error")
+    engine.observe_status("eira", "error")
+    assert engine.run_once(t0 + WINDOW + 2) == []
+    assert store.get("eira")["status"] == "error"
+
+def test_store_failure_is_retried_next_tick(store, engine, t0, monkeypatch):
+    checkin(store, engine, "eira", t0)
+    real = store.expire_many
+
+    def down(names, cutoff):
+        raise ConnectionError("mysql went away")
+
+    monkeypatch.setattr(store, "expire_many", down)
+    assert engine.run_once(t0 + WINDOW + 2) == []
+    monkeypatch.setattr(store, "expire_many", real)
+    assert engine.run_once(t0 + WINDOW + 3) == ["eira"]
+
+def test_seed_arms_services_already_online(store, t0):
+    store.checkin("eira", "spirit", "http://eira", None)
+    store._records["eira"]["last_checkin"] = int(t0)
+    engine = LivenessEngine(store, window=WINDOW, tick=1.0)
+    engine.seed()
+    assert engine.run_once(t0 + WINDOW + 2) == ["eira"]
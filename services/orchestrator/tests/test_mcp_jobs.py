@@ -0,0 +1,98 @@
+import threading, time
+
+import pytest
+
+from mcp_jobs import JobError, JobExecutor, QueueFull
+
+def wait_done(ex, job_ids, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [ex.get(j) for j in job_ids]
+        if all(j["status"] in ("succeeded", "failed") for j in jobs):
+            return jobs
+        time.sleep(0.005)
+    raise AssertionError(f"jobs still running: {[j['status'] for j in jobs]}")
+
+@pytest.fixture
+def executor():
+    ex = JobExecutor(workers=4)
+    ex.start()
+    yield ex
+    ex.close()
+
+def test_jobs_for_one_name_run_one_at_a_time_in_order(executor):
+    order, running, overlap = [], [0], []
+    lock = threading.Lock()
+
+    def job(i):
+        def run():
+            with lock:
+                running[0] += 1
+                overlap.append(running[0])
+            time.sleep(0.002)
+            order.append(i)
+            with lock:
+                running[0] -= 1
+            return {"i": i}
+        return run
+
+    ids = [executor.submit("change", "eira", job(i))["id"] for i in range(20)]
+    jobs = wait_done(executor, ids)
+    assert order == list(range(20))
+    assert max(overlap) == 1
+    assert [j["result"] for j in jobs] == [{"i": i} for i in range(20)]
+
+def test_different_names_run_in_parallel(executor):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def meet():
+        barrier.wait()  # only passes if three jobs are running at once
+        return {}
+
+    ids = [executor.submit("birth", name, meet)["id"] for name in ("a", "b", "c")]
+    assert [j["status"] for j in wait_done(executor, ids)] == ["succeeded"] * 3
+
+def test_busy_name_holds_one_worker(executor):
+    gate = threading.Event()
+    slow = [executor.submit("change", "eira", lambda: gate.wait(5) and {})["id"] for _ in range(10)]
+    other = executor.submit("birth", "mica", lambda: {"ok": True})["id"]
+    assert wait_done(executor, [other])[0]["result"] == {"ok": True}
+    deadline = time.monotonic() + 5
+    while executor.stats()["busy"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.05)  # the other nine would have been picked up by now if they could be
+    assert executor.stats()["busy"] == 1
+    gate.set()
+    wait_done(executor, slow)
+
+def test_failures_are_recorded_and_do_not_block_the_name(executor):
+    def expected():
+        raise JobError(409, "spirit exists")
+
+    def crash():
+        raise RuntimeError("boom")
+
+    ids = [executor.submit("birth", "eira", fn)["id"] for fn in (expected, crash, lambda: {"ok": True})]
+    first, second, third = wait_done(executor, ids)
+    assert first["error"] == {"code": 409, "message": "spirit exists"}
+    assert second["error"] == {"code": 500, "message": "boom"}
+    assert third["status"] == "succeeded"
+
+def test_queue_full_rejects():
+    ex = JobExecutor(workers=1, max_queue=2)  # not started: nothing drains
+    ex.submit("birth", "a", dict)
+    ex.submit("birth", "b", dict)
+    with pytest.raises(QueueFull):
+        ex.submit("birth", "c", dict)
+
+def test_finished_jobs_expire_after_retention():
+    ex = JobExecutor(workers=1, retention=0.0)
+    ex.start()
+    try:
+        job_id = ex.submit("birth", "eira", dict)["id"]
+        deadline = time.monotonic() + 5
+        while ex.get(job_id) is not None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert ex.get(job_id) is None
+    finally:
+        ex.close()
@@ -1,25 +1,36 @@
 # /home/melynxis/solace/services/registry/app.py
 
 from fastapi import FastAPI, Body, HTTPException, Query, Request
-from fastapi.responses import PlainTextResponse, Response, JSONResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Optional, Literal
-import os, time, json, uuid, datetime
-
-# -----------------------------
-# Config (env with sane defaults)
-# -----------------------------
-MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
-MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
-MYSQL_DB   = os.getenv("MYSQL_DB", "solace")
-MYSQL_USER = os.getenv("MYSQL_USER", "solace_app")
-MYSQL_PW   = os.getenv("MYSQL_PASSWORD", "solace_app_pwd")
-REGISTRY_PORT = int(os.getenv("REGISTRY_PORT", "8081"))
-
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PW}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+from typing import Optional
+import time, datetime
+
+from changefeed import spirit_change
+from idempotency import Idempotency, IdempotencyConflict
+from instrumentation import RequestMetrics, instrument_engine
+from memory_search import SearchUnavailable
+from registry_core import (
+    DATABASE_URL, MAX_BATCH, State, RegistryServices,
+    REGISTRY_SLOW_QUERY_MS, REGISTRY_RBAC_DB, REGISTRY_RBAC_REFRESH,
+    spirit_creations_total, spirit_creation_seconds, spirit_batch_seconds, spirit_batch_items,
+    solace_http_exception_handler, get_request_id, solace_response,
+    rbac_check_items, rbac_policy_version, load_rbac_policy,
+    idempotency_key, replayed_response,
+    created_changes, state_changes, MemoryMode,
+    row_etag, if_none_match, not_modified, spirits_page_etag, registry_page_etag,
+    json_filters, SPIRIT_META_PATHS, REGISTRY_CONFIG_PATHS,
+    SPIRIT_JSON_COLS, EXPORT_CHUNK_ROWS, export_rows_total,
+    spirits_export_sql, events_export_sql, ndjson_chunk, ndjson_response, query_events,
+    ping_db, fetch_spirit, fetch_registry,
+    insert_spirit, validate_create_items, insert_spirits_batch,
+    validate_state_items, transition_spirits_batch, transition_spirit,
+    update_spirit_fields, query_spirits, search_spirits, read_stats,
+    insert_registry, update_registry, remove_registry, query_registry,
+)
 
 # -----------------------------
 # DB engine
@@ -32,11 +43,42 @@ engine = create_engine(
     max_overflow=10,
     future=True,
 )
+instrument_engine(engine, "sync", REGISTRY_SLOW_QUERY_MS)
+
+# -----------------------------
+# Redis + read-through caches, change feed, search, idempotency, RBAC
+# -----------------------------
+services = RegistryServices()
+redis_client = services.redis
+spirit_cache, registry_cache = services.spirit_cache, services.registry_cache
+change_feed = services.change_feed
+memory_search = services.memory_search
+idempotency = services.idempotency
+rbac = services.rbac
+
+def start_rbac():
+    if not REGISTRY_RBAC_DB:
+        return
+
+    def version():
+        with engine.connect() as conn:
+            return rbac_policy_version(conn)
+
+    def load():
+        with engine.connect() as conn:
+            return load_rbac_policy(conn)
+
+    rbac.start(version, load, REGISTRY_RBAC_REFRESH)
 
 # -----------------------------
 # App + CORS + Metrics
 # -----------------------------
 app = FastAPI(title="Solace Registry API", version="0.4.0")
+app.add_event_handler("startup", services.start_cache_listener)
+app.add_event_handler("startup", change_feed.start)
+app.add_event_handler("shutdown", change_feed.stop)
+app.add_event_handler("startup", start_rbac)
+app.add_event_handler("shutdown", rbac.stop)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,132 +86,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
-
-spirit_creations_total = Counter(
-    "spirit_creations_total", "Number of spirit creation requests", ["role"]
-)
-spirit_creation_seconds = Histogram(
-    "spirit_creation_duration_seconds", "Time to create a spirit"
-)
-request_counter = Counter(
-    "solace_requests_total", "Total requests", ["route", "status"]
-)
+app.add_middleware(RequestMetrics)
+app.add_exception_handler(HTTPException, solace_http_exception_handler)
 
 # -----------------------------
 # Helpers
 # -----------------------------
-State = Literal["pending", "created", "ready", "error"]
-
-ALLOWED_TRANSITIONS: dict[State, set[State]] = {
-    "pending": {"created", "error"},
-    "created": {"ready", "error"},
-    "ready": {"error"},
-    "error": {"pending", "created"},
-}
-
-def _json_or_none(obj: Optional[dict]) -> Optional[str]:
-    return json.dumps(obj) if obj is not None else None
-
-def _coerce_meta(row: dict) -> dict:
-    """Ensure 'meta' is a Python object, not a JSON string."""
-    r = dict(row)
-    m = r.get("meta")
-    if m is not None and isinstance(m, str) and m != "":
-        try:
-            r["meta"] = json.loads(m)
-        except Exception:
-            pass
-    return r
-
-def serialize_row(row: dict) -> dict:
+def idempotent(request: Request, scope: str, body, fn):
+    """(data, replayed): without an Idempotency-Key header fn() just runs."""
+    key = idempotency_key(request)
+    if key is None:
+        return fn(), False
+    try:
+        return idempotency.run(scope, key, Idempotency.fingerprint(body), fn)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+def stream_ndjson(sql: str, params: dict, json_cols, table: str):
     """
-    Convert all datetime/date fields to ISO8601 strings.
+    Server-side cursor export: PyMySQL's SSCursor via stream_results, fetched
+    yield_per rows at a time, so memory is bounded by one chunk.
     """
-    r = dict(row)
-    for k, v in r.items():
-        if isinstance(v, (datetime.datetime, datetime.date)):
-            r[k] = v.isoformat()
-    return r
-
-def get_request_id(request: Request) -> str:
-    req_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-    return req_id
-
-def solace_response(ok, data=None, error=None, request_id=None):
-    resp = {"ok": ok}
-    if ok and data is not None:
-        resp["data"] = data
-    if not ok and error is not None:
-        resp["error"] = error
-    resp["meta"] = {"requestId": request_id or str(uuid.uuid4())}
-    return JSONResponse(resp)
-
-def log_event(conn, spirit_id: int, event_type: str,
-              prev_state: Optional[str] = None,
-              new_state: Optional[str] = None,
-              note: Optional[str] = None,
-              meta: Optional[dict] = None):
-    conn.execute(
-        text(
-            "INSERT INTO spirit_events (spirit_id, event_type, prev_state, new_state, note, meta) "
-            "VALUES (:sid, :etype, :prev, :new, :note, CAST(:meta AS JSON))"
-        ),
-        {
-            "sid": spirit_id,
-            "etype": event_type,
-            "prev": prev_state,
-            "new": new_state,
-            "note": note,
-            "meta": _json_or_none(meta),
-        },
-    )
-
-def fetch_spirit(conn, spirit_id: int):
-    row = conn.execute(
-        text("SELECT id, name, role, state, meta, created_at, updated_at FROM spirits WHERE id=:id"),
-        {"id": spirit_id},
-    ).mappings().first()
-    return serialize_row(_coerce_meta(row)) if row else None
-
-def fetch_registry(conn, reg_id: str):
-    row = conn.execute(
-        text("SELECT id, name, type, config, auth_mode, status, created_at, updated_at FROM registry_services WHERE id=:id"),
-        {"id": reg_id},
-    ).mappings().first()
-    if row:
-        r = dict(row)
-        if r.get("config") is not None and isinstance(r["config"], str):
-            try:
-                r["config"] = json.loads(r["config"])
-            except Exception:
-                pass
-        return serialize_row(r)
-    return None
-
-def now_mysql():
-    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-
-# -----------------------------
-# Error handling
-# -----------------------------
-@app.exception_handler(HTTPException)
-async def solace_http_exception_handler(request: Request, exc: HTTPException):
-    request_id = get_request_id(request)
-    code = exc.status_code
-    msg = exc.detail if isinstance(exc.detail, str) else str(exc.detail)
-    error_code = {
-        400: "VALIDATION_FAILED",
-        401: "UNAUTHENTICATED",
-        403: "RBAC_DENIED",
-        404: "NOT_FOUND",
-        409: "CONFLICT",
-        429: "RATE_LIMITED",
-        500: "INTERNAL_ERROR"
-    }.get(code, "INTERNAL_ERROR")
-    error = { "code": error_code, "message": msg }
-    request_counter.labels(route=request.url.path, status=str(code)).inc()
-    return solace_response(False, error=error, request_id=request_id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(text(sql), params)
+        for part in result.mappings().partitions():
+            export_rows_total.labels(table=table).inc(len(part))
+            yield ndjson_chunk(part, json_cols)
 
 # -----------------------------
 # Health & meta endpoints
@@ -178,7 +122,7 @@ async def solace_http_exception_handler(request: Request, exc: HTTPException):
 def health():
     try:
         with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+            ping_db(conn)
         return "ok"
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
@@ -188,7 +132,7 @@ def healthz(request: Request):
     request_id = get_request_id(request)
     try:
         with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+            ping_db(conn)
         return solace_response(True, data={"status":"ok"}, request_id=request_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
@@ -203,7 +147,7 @@ def readyz(request: Request):
     request_id = get_request_id(request)
     try:
         with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+            ping_db(conn)
         return solace_response(True, data={"ready": True}, request_id=request_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
@@ -214,53 +158,233 @@ def readyz(request: Request):
 @app.get("/v1/rbac/roles", tags=["rbac"])
 def rbac_roles(request: Request):
     request_id = get_request_id(request)
-    roles = ["owner", "admin", "maintainer", "reader"]
-    return solace_response(True, data={"roles": roles}, request_id=request_id)
+    policy = rbac.policy
+    roles = [r["name"] for r in policy.role_info]
+    return solace_response(True, data={"roles": roles, "details": policy.role_info, "version": policy.version},
+                           request_id=request_id)
 
 @app.post("/v1/rbac/check", tags=["rbac"])
 def rbac_check(request: Request, subject: str = Body(...), action: str = Body(...), resource: str = Body(...)):
     request_id = get_request_id(request)
-    allowed = not (action == "delete" and subject != "owner")
-    result = { "allowed": allowed }
+    decision = rbac.check(subject, action, resource)
+    result = { "allowed": decision.allowed, "role": decision.role }
     return solace_response(True, data=result, request_id=request_id)
 
+@app.post("/v1/rbac/check:batch", tags=["rbac"])
+def rbac_check_batch(request: Request, subject: Optional[str] = Body(None), checks: list[dict] = Body(...)):
+    """
+    Authorize many (action, resource) pairs in one call, e.g. every action
+    on a dashboard page. Items may override the top-level subject.
+    """
+    request_id = get_request_id(request)
+    triples = rbac_check_items(subject, checks)
+    policy = rbac.policy
+    results = [{"subject": who, "action": action, "resource": resource, "allowed": d.allowed, "role": d.role}
+               for (who, action, resource), d in zip(triples, rbac.check_many(triples, policy))]
+    return solace_response(True, data={"results": results}, request_id=request_id,
+                           meta={"policyVersion": policy.version})
+
+# -----------------------------
+# Memory search
+# -----------------------------
+@app.get("/v1/memory/search", tags=["memory"])
+def search_memory(request: Request,
+                  q: str = Query(..., min_length=1, max_length=1000),
+                  k: int = Query(8, ge=1, le=50),
+                  mode: MemoryMode = Query("hybrid"),
+                  alpha: float = Query(0.75, ge=0.0, le=1.0),
+                  per_page: int = Query(2, ge=1, le=50)):
+    request_id = get_request_id(request)
+    try:
+        hits, meta = memory_search.search(q, k=k, mode=mode, alpha=alpha, per_page=per_page)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return solace_response(True, data=hits, request_id=request_id, meta=meta)
+
 # -----------------------------
 # Spirits endpoints
 # -----------------------------
+@app.post("/spirits:batch", tags=["spirits"])
+def create_spirits_batch(request: Request, items: list[dict] = Body(..., embed=True)):
+    """
+    Create many spirits in one transaction. Invalid items are reported per
+    index and skipped. Idempotency-Key works as for POST /spirits.
+    """
+    t0 = time.time()
+    request_id = get_request_id(request)
+    if not items or len(items) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"items must contain 1..{MAX_BATCH} entries")
+
+    def create():
+        results: list[Optional[dict]] = [None] * len(items)
+        valid = validate_create_items(items, results)
+        if valid:
+            with engine.begin() as conn:
+                ids = insert_spirits_batch(conn, valid)
+            change_feed.publish_many(created_changes(ids, valid))
+            for sid, (i, name, role, _) in zip(ids, valid):
+                spirit_creations_total.labels(role=role).inc()
+                results[i] = {"index": i, "ok": True,
+                              "data": {"id": sid, "name": name, "role": role, "state": "created"}}
+        return results
+
+    try:
+        results, replayed = idempotent(request, "spirits:batch", items, create)
+        return replayed_response(results, request_id, replayed)
+    finally:
+        spirit_batch_items.labels(op="create").observe(len(items))
+        spirit_batch_seconds.labels(op="create").observe(time.time() - t0)
+
+@app.put("/spirits/state:batch", tags=["spirits"])
+def update_spirit_state_batch(request: Request, items: list[dict] = Body(..., embed=True)):
+    """Apply many state transitions in one transaction, with per-item results."""
+    t0 = time.time()
+    request_id = get_request_id(request)
+    if not items or len(items) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"items must contain 1..{MAX_BATCH} entries")
+    results: list[Optional[dict]] = [None] * len(items)
+    wanted = validate_state_items(items, results)
+    try:
+        if wanted:
+            with engine.begin() as conn:
+                spirits = transition_spirits_batch(conn, wanted, results)
+            for sid in {r["data"]["id"] for r in results if r and r["ok"]}:
+                spirit_cache.invalidate(sid)
+            change_feed.publish_many(state_changes(results, spirits))
+        return solace_response(True, data=results, request_id=request_id)
+    finally:
+        spirit_batch_items.labels(op="state").observe(len(items))
+        spirit_batch_seconds.labels(op="state").observe(time.time() - t0)
+
 @app.post("/spirits", tags=["spirits"])
 def create_spirit(request: Request,
     name: str = Body(..., embed=True),
     role: str = Body(..., embed=True),
     meta: dict | None = Body(None, embed=True),
 ):
+    """
+    With an Idempotency-Key header, a retry (or a concurrent duplicate) of
+    the same body returns the first response instead of creating again.
+    """
     t0 = time.time()
     request_id = get_request_id(request)
-    spirit_creations_total.labels(role=role).inc()
-    try:
+
+    def create():
+        spirit_creations_total.labels(role=role).inc()
         with engine.begin() as conn:
-            result = conn.execute(
-                text(
-                    "INSERT INTO spirits (name, role, state, meta) "
-                    "VALUES (:name, :role, 'pending', CAST(:meta AS JSON))"
-                ),
-                {"name": name, "role": role, "meta": _json_or_none(meta)},
-            )
-            spirit_id = result.lastrowid
-            conn.execute(text("UPDATE spirits SET state='created' WHERE id=:id"), {"id": spirit_id})
-            log_event(conn, spirit_id, event_type="create", prev_state="pending", new_state="created", meta=meta)
+            spirit_id = insert_spirit(conn, name, role, meta)
+        spirit_cache.invalidate(spirit_id)
         data = {"id": spirit_id, "name": name, "role": role, "state": "created"}
-        return solace_response(True, data=data, request_id=request_id)
+        change_feed.publish(spirit_change("created", data, "pending"))
+        return data
+
+    try:
+        data, replayed = idempotent(request, "spirits", {"name": name, "role": role, "meta": meta}, create)
+        return replayed_response(data, request_id, replayed)
     finally:
         spirit_creation_seconds.observe(time.time() - t0)
 
+@app.get("/spirits/export", tags=["spirits"])
+def export_spirits(
+    state: Optional[State] = Query(None),
+    role: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="updated_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="updated_at < until"),
+):
+    """Stream every matching spirit as NDJSON (one object per line, id order)."""
+    sql, params = spirits_export_sql(state, role, since, until)
+    return ndjson_response(stream_ndjson(sql, params, SPIRIT_JSON_COLS, "spirits"), "spirits.ndjson")
+
+@app.get("/spirits/events/export", tags=["spirits"])
+def export_spirit_events(
+    spirit_id: Optional[int] = Query(None),
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+):
+    """Stream the spirit_events audit log as NDJSON (id order)."""
+    sql, params = events_export_sql(spirit_id, event_type, since, until)
+    return ndjson_response(stream_ndjson(sql, params, SPIRIT_JSON_COLS, "spirit_events"), "spirit_events.ndjson")
+
+@app.get("/spirits/stats", tags=["spirits"])
+def spirit_stats(request: Request):
+    request_id = get_request_id(request)
+    with engine.connect() as conn:
+        stats, source = read_stats(conn)
+    return solace_response(True, data=stats, request_id=request_id, meta={"source": source})
+
+@app.get("/spirits/search", tags=["spirits"])
+def search_spirits_route(request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    state: Optional[State] = Query(None),
+    role: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+):
+    request_id = get_request_id(request)
+    with engine.connect() as conn:
+        data, page = search_spirits(conn, q, state, role, limit, cursor)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
+@app.get("/spirits/stream", tags=["spirits"])
+async def stream_spirits(request: Request,
+    role: Optional[str] = Query(None),
+    state: Optional[State] = Query(None),
+    last_event_id: Optional[str] = Query(None, description="resume point for clients that cannot send Last-Event-ID"),
+):
+    """
+    Server-Sent Events for spirit create/state/patch commits. Reconnects
+    resume after the Last-Event-ID header (or ?last_event_id=).
+    """
+    last_id = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(
+        change_feed.stream(request, role, state, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/spirits/events", tags=["spirits"])
+def list_events(request: Request,
+    spirit_id: Optional[int] = Query(None),
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+    sort: str = Query("created_at:desc"),
+):
+    request_id = get_request_id(request)
+    with engine.connect() as conn:
+        data, page = query_events(conn, spirit_id, event_type, since, until, limit, cursor, sort)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
+@app.get("/spirits/{spirit_id}/events", tags=["spirits"])
+def list_spirit_events(request: Request, spirit_id: int,
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+    sort: str = Query("created_at:desc"),
+):
+    request_id = get_request_id(request)
+    with engine.connect() as conn:
+        data, page = query_events(conn, spirit_id, event_type, since, until, limit, cursor, sort)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
 @app.get("/spirits/{spirit_id}", tags=["spirits"])
 def get_spirit(request: Request, spirit_id: int):
     request_id = get_request_id(request)
-    with engine.connect() as conn:
-        row = fetch_spirit(conn, spirit_id)
-        if not row:
-            raise HTTPException(status_code=404, detail="not found")
-        return solace_response(True, data=row, request_id=request_id)
+    def load():
+        with engine.connect() as conn:
+            return fetch_spirit(conn, spirit_id)
+    row = spirit_cache.get_or_load(spirit_id, load)
+    if not row:
+        raise HTTPException(status_code=404, detail="not found")
+    etag = row_etag(row)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    return solace_response(True, data=row, request_id=request_id, headers={"ETag": etag})
 
 @app.put("/spirits/{spirit_id}/state", tags=["spirits"])
 def update_spirit_state(request: Request, spirit_id: int,
@@ -268,16 +392,10 @@ def update_spirit_state(request: Request, spirit_id: int,
                         note: str | None = Body(None, embed=True)):
     request_id = get_request_id(request)
     with engine.begin() as conn:
-        row = fetch_spirit(conn, spirit_id)
-        if not row:
-            raise HTTPException(status_code=404, detail="not found")
-        prev = row["state"]
-        if new_state not in ALLOWED_TRANSITIONS.get(prev, set()):
-            raise HTTPException(status_code=409, detail=f"illegal transition {prev} -> {new_state}")
-        conn.execute(text("UPDATE spirits SET state=:s WHERE id=:id"), {"s": new_state, "id": spirit_id})
-        log_event(conn, spirit_id, event_type="state_change", prev_state=prev, new_state=new_state, note=note)
-        row = fetch_spirit(conn, spirit_id)
-        return solace_response(True, data=row, request_id=request_id)
+        prev, row = transition_spirit(conn, spirit_id, new_state, note)
+    spirit_cache.invalidate(spirit_id)
+    change_feed.publish(spirit_change("state_change", row, prev))
+    return solace_response(True, data=row, request_id=request_id)
 
 @app.patch("/spirits/{spirit_id}", tags=["spirits"])
 def patch_spirit(request: Request, spirit_id: int,
@@ -288,70 +406,29 @@ def patch_spirit(request: Request, spirit_id: int,
     if name is None and meta is None:
         raise HTTPException(status_code=400, detail="no changes provided")
     with engine.begin() as conn:
-        raw = conn.execute(
-            text("SELECT id, name, role, state, meta FROM spirits WHERE id=:id"),
-            {"id": spirit_id},
-        ).mappings().first()
-        if not raw:
-            raise HTTPException(status_code=404, detail="not found")
-        updates = []
-        params = {"id": spirit_id}
-        if name is not None:
-            updates.append("name=:name")
-            params["name"] = name
-        if meta is not None:
-            updates.append("meta=CAST(:meta AS JSON)")
-            params["meta"] = _json_or_none(meta)
-        conn.execute(text(f"UPDATE spirits SET {', '.join(updates)} WHERE id=:id"), params)
-        if name is not None:
-            log_event(conn, spirit_id, event_type="name_update", note=note)
-        if meta is not None:
-            log_event(conn, spirit_id, event_type="meta_update", note=note, meta=meta)
-        row = fetch_spirit(conn, spirit_id)
-        return solace_response(True, data=row, request_id=request_id)
+        row = update_spirit_fields(conn, spirit_id, name, meta, note)
+    spirit_cache.invalidate(spirit_id)
+    change_feed.publish(spirit_change("updated", row))
+    return solace_response(True, data=row, request_id=request_id)
 
 @app.get("/spirits", tags=["spirits"])
 def list_spirits(request: Request,
     state: Optional[State] = Query(None),
     role: Optional[str] = Query(None),
-    q: Optional[str] = Query(None, description="substring match on name"),
+    q: Optional[str] = Query(None, description="substring match on name (ranked search: /spirits/search)"),
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page; replaces offset"),
     sort: str = Query("updated_at:desc"),
 ):
     request_id = get_request_id(request)
-    field_map = {"id": "id", "name": "name", "role": "role", "state": "state",
-                 "created_at": "created_at", "updated_at": "updated_at"}
-    f, d = (sort.split(":", 1) + [""])[:2]
-    order_field = field_map.get(f, "updated_at")
-    order_dir = "DESC" if d.lower() != "asc" else "ASC"
-
-    where = []
-    params = {}
-    if state:
-        where.append("state = :state")
-        params["state"] = state
-    if role:
-        where.append("role = :role")
-        params["role"] = role
-    if q:
-        where.append("name LIKE :q")
-        params["q"] = f"%{q}%"
-
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-    sql = f"""
-        SELECT id, name, role, state, meta, created_at, updated_at
-        FROM spirits
-        {where_sql}
-        ORDER BY {order_field} {order_dir}
-        LIMIT :limit OFFSET :offset
-    """
-    params.update({"limit": limit, "offset": offset})
+    meta = json_filters(request, "meta", SPIRIT_META_PATHS)
     with engine.connect() as conn:
-        rows = conn.execute(text(sql), params).mappings().all()
-        def rowmap(r):
-            return serialize_row(_coerce_meta(r))
-        return solace_response(True, data=[rowmap(r) for r in rows], request_id=request_id)
+        etag = spirits_page_etag(conn, state, role, q, limit, offset, cursor, sort, meta)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        data, page = query_spirits(conn, state, role, q, limit, offset, cursor, sort, meta)
+        return solace_response(True, data=data, request_id=request_id, meta=page, headers={"ETag": etag})
 
 # -----------------------------
 # Registry endpoints
@@ -366,43 +443,27 @@ def create_registry(request: Request,
 ):
     request_id = get_request_id(request)
     try:
-        reg_id = str(uuid.uuid4())
         with engine.begin() as conn:
-            conn.execute(
-                text(
-                    "INSERT INTO registry_services (id, name, type, config, auth_mode, status, created_at, updated_at) "
-                    "VALUES (:id, :name, :type, :config, :auth_mode, :status, :created_at, :updated_at)"
-                ),
-                {
-                    "id": reg_id,
-                    "name": name,
-                    "type": type,
-                    "config": _json_or_none(config),
-                    "auth_mode": auth_mode,
-                    "status": status_,
-                    "created_at": now_mysql(),
-                    "updated_at": now_mysql()
-                },
-            )
-        data = {
-            "id": reg_id,
-            "name": name,
-            "type": type,
-            "status": status_,
-            "auth_mode": auth_mode
-        }
+            data = insert_registry(conn, name, type, config, auth_mode, status_)
         return solace_response(True, data=data, request_id=request_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 @app.get("/registry/{reg_id}", tags=["registry"])
 def get_registry(request: Request, reg_id: str):
     request_id = get_request_id(request)
-    with engine.connect() as conn:
-        row = fetch_registry(conn, reg_id)
-        if not row:
-            raise HTTPException(status_code=404, detail="not found")
-        return solace_response(True, data=row, request_id=request_id)
+    def load():
+        with engine.connect() as conn:
+            return fetch_registry(conn, reg_id)
+    row = registry_cache.get_or_load(reg_id, load)
+    if not row:
+        raise HTTPException(status_code=404, detail="not found")
+    etag = row_etag(row)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    return solace_response(True, data=row, request_id=request_id, headers={"ETag": etag})
 
 @app.patch("/registry/{reg_id}", tags=["registry"])
 def patch_registry(request: Request, reg_id: str,
@@ -414,43 +475,16 @@ def patch_registry(request: Request, reg_id: str,
     if not any([name, config, auth_mode, status_]):
         raise HTTPException(status_code=400, detail="no changes provided")
     with engine.begin() as conn:
-        raw = conn.execute(
-            text("SELECT id FROM registry_services WHERE id=:id"),
-            {"id": reg_id},
-        ).mappings().first()
-        if not raw:
-            raise HTTPException(status_code=404, detail="not found")
-        updates = []
-        params = {"id": reg_id}
-        if name is not None:
-            updates.append("name=:name")
-            params["name"] = name
-        if config is not None:
-            updates.append("config=CAST(:config AS JSON)")
-            params["config"] = _json_or_none(config)
-        if auth_mode is not None:
-            updates.append("auth_mode=:auth_mode")
-            params["auth_mode"] = auth_mode
-        if status_ is not None:
-            updates.append("status=:status")
-            params["status"] = status_
-        updates.append("updated_at=:updated_at")
-        params["updated_at"] = now_mysql()
-        conn.execute(text(f"UPDATE registry_services SET {', '.join(updates)} WHERE id=:id"), params)
-        row = fetch_registry(conn, reg_id)
-        return solace_response(True, data=row, request_id=request_id)
+        row = update_registry(conn, reg_id, name, config, auth_mode, status_)
+    registry_cache.invalidate(reg_id)
+    return solace_response(True, data=row, request_id=request_id)
 
 @app.delete("/registry/{reg_id}", tags=["registry"])
 def delete_registry(request: Request, reg_id: str):
     request_id = get_request_id(request)
     with engine.begin() as conn:
-        raw = conn.execute(
-            text("SELECT id FROM registry_services WHERE id=:id"),
-            {"id": reg_id},
-        ).mappings().first()
-        if not raw:
-            raise HTTPException(status_code=404, detail="not found")
-        conn.execute(text("DELETE FROM registry_services WHERE id=:id"), {"id": reg_id})
+        remove_registry(conn, reg_id)
+    registry_cache.invalidate(reg_id)
     return solace_response(True, data={"id": reg_id, "deleted": True}, request_id=request_id)
 
 @app.get("/registry", tags=["registry"])
@@ -459,41 +493,17 @@ def list_registry(request: Request,
     status_: Optional[str] = Query(None, alias="status"),
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page; replaces offset"),
     sort: str = Query("updated_at:desc"),
 ):
     request_id = get_request_id(request)
-    field_map = {"id": "id", "name": "name", "type": "type", "status": "status",
-                 "created_at": "created_at", "updated_at": "updated_at"}
-    f, d = (sort.split(":", 1) + [""])[:2]
-    order_field = field_map.get(f, "updated_at")
-    order_dir = "DESC" if d.lower() != "asc" else "ASC"
-
-    where = []
-    params = {}
-    if type_:
-        where.append("type = :type")
-        params["type"] = type_
-    if status_:
-        where.append("status = :status")
-        params["status"] = status_
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-    sql = f"""
-        SELECT id, name, type, config, auth_mode, status, created_at, updated_at
-        FROM registry_services
-        {where_sql}
-        ORDER BY {order_field} {order_dir}
-        LIMIT :limit OFFSET :offset
-    """
-    params.update({"limit": limit, "offset": offset})
+    config = json_filters(request, "config", REGISTRY_CONFIG_PATHS)
     with engine.connect() as conn:
-        rows = conn.execute(text(sql), params).mappings().all()
-        def rowmap(r):
-            rr = dict(r)
-            if rr.get("config") is not None and isinstance(rr["config"], str):
-                try: rr["config"] = json.loads(rr["config"])
-                except Exception: pass
-            return serialize_row(rr)
-        return solace_response(True, data=[rowmap(r) for r in rows], request_id=request_id)
+        etag = registry_page_etag(conn, type_, status_, limit, offset, cursor, sort, config)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        data, page = query_registry(conn, type_, status_, limit, offset, cursor, sort, config)
+        return solace_response(True, data=data, request_id=request_id, meta=page, headers={"ETag": etag})
 
 # -----------------------------
 # Metrics endpoint
@@ -0,0 +1,545 @@
+# /home/melynxis/solace/services/registry/app_async.py
+"""
+Async variant of the Solace Registry API.
+
+Same routes and response envelope as app.py, served as `async def` on an
+async SQLAlchemy engine (aiomysql). DB work reuses the sync helpers in
+registry_core.py through AsyncConnection.run_sync, so both apps stay
+behaviourally identical. app.py is never imported: its sync engine, caches
+and app are not built in this process.
+
+Run:  uvicorn app_async:app --host 0.0.0.0 --port 8081 --workers $WEB_CONCURRENCY
+"""
+
+from fastapi import FastAPI, Body, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional
+import os, time, asyncio, datetime
+
+import anyio
+
+from cache import is_miss
+from changefeed import spirit_change
+from idempotency import Idempotency, IdempotencyConflict
+from instrumentation import RequestMetrics, instrument_engine
+from memory_search import SearchUnavailable
+
+from registry_core import (
+    MYSQL_HOST, MYSQL_PORT, MYSQL_DB, MYSQL_USER, MYSQL_PW, MAX_BATCH, State, RegistryServices,
+    REGISTRY_SLOW_QUERY_MS, REGISTRY_RBAC_DB, REGISTRY_RBAC_REFRESH,
+    spirit_creations_total, spirit_creation_seconds, spirit_batch_seconds, spirit_batch_items,
+    solace_http_exception_handler, get_request_id, solace_response,
+    rbac_check_items, rbac_policy_version, load_rbac_policy,
+    idempotency_key, replayed_response,
+    created_changes, state_changes, MemoryMode,
+    row_etag, if_none_match, not_modified, spirits_page_etag, registry_page_etag,
+    json_filters, SPIRIT_META_PATHS, REGISTRY_CONFIG_PATHS,
+    SPIRIT_JSON_COLS, EXPORT_CHUNK_ROWS, export_rows_total,
+    spirits_export_sql, events_export_sql, ndjson_chunk, ndjson_response, query_events,
+    ping_db, fetch_spirit, fetch_registry,
+    insert_spirit, validate_create_items, insert_spirits_batch,
+    validate_state_items, transition_spirits_batch, transition_spirit,
+    update_spirit_fields, query_spirits, search_spirits, read_stats,
+    insert_registry, update_registry, remove_registry, query_registry,
+)
+
+# -----------------------------
+# Config
+# -----------------------------
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PW}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+
+# Total connections this service may hold against MySQL, split across the
+# uvicorn worker processes (WEB_CONCURRENCY is what `uvicorn --workers` reads).
+REGISTRY_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+REGISTRY_DB_MAX_CONNECTIONS = int(os.getenv("REGISTRY_DB_MAX_CONNECTIONS", "60"))
+
+def pool_sizing(max_connections: int, workers: int) -> tuple[int, int]:
+    """(pool_size, max_overflow) per worker: ~2/3 steady, the rest burst."""
+    per_worker = max(2, max_connections // workers)
+    pool_size = max(1, per_worker * 2 // 3)
+    return pool_size, per_worker - pool_size
+
+POOL_SIZE, MAX_OVERFLOW = pool_sizing(REGISTRY_DB_MAX_CONNECTIONS, REGISTRY_WORKERS)
+
+# -----------------------------
+# DB engine
+# -----------------------------
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=float(os.getenv("REGISTRY_DB_POOL_TIMEOUT", "10")),
+)
+instrument_engine(async_engine.sync_engine, "async", REGISTRY_SLOW_QUERY_MS)
+
+# -----------------------------
+# Redis + read-through caches, change feed, search, idempotency, RBAC
+# -----------------------------
+services = RegistryServices()
+spirit_cache, registry_cache = services.spirit_cache, services.registry_cache
+change_feed = services.change_feed
+memory_search = services.memory_search
+idempotency = services.idempotency
+rbac = services.rbac
+
+# Longest a policy read may take before the refresher gives up on it.
+RBAC_LOAD_TIMEOUT = 30.0
+
+async def start_rbac():
+    """
+    rbac's refresher is a plain thread; it hands each policy read to the
+    event loop (async_engine belongs to it) and waits for the result.
+    """
+    if not REGISTRY_RBAC_DB:
+        return
+    loop = asyncio.get_running_loop()
+
+    def on_loop(fn):
+        async def read():
+            async with async_engine.connect() as conn:
+                return await conn.run_sync(fn)
+        return lambda: asyncio.run_coroutine_threadsafe(read(), loop).result(RBAC_LOAD_TIMEOUT)
+
+    # start() runs the first refresh inline, so keep it off the loop thread
+    await anyio.to_thread.run_sync(rbac.start, on_loop(rbac_policy_version), on_loop(load_rbac_policy),
+                                   REGISTRY_RBAC_REFRESH)
+
+# -----------------------------
+# App + CORS
+# -----------------------------
+app = FastAPI(title="Solace Registry API (async)", version="0.4.0")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],       # Set to UI origins in prod!
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+app.add_middleware(RequestMetrics)
+
+app.add_exception_handler(HTTPException, solace_http_exception_handler)
+app.add_event_handler("startup", services.start_cache_listener)
+app.add_event_handler("startup", change_feed.start)
+app.add_event_handler("shutdown", change_feed.stop)
+app.add_event_handler("startup", start_rbac)
+app.add_event_handler("shutdown", rbac.stop)
+
+@app.on_event("shutdown")
+async def dispose_engine():
+    await async_engine.dispose()
+
+async def stream_ndjson(sql: str, params: dict, json_cols, table: str):
+    """Async twin of app.stream_ndjson: AsyncConnection.stream uses an unbuffered cursor."""
+    async with async_engine.connect() as conn:
+        result = await conn.stream(text(sql), params, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+        async for part in result.mappings().partitions():
+            export_rows_total.labels(table=table).inc(len(part))
+            yield ndjson_chunk(part, json_cols)
+
+async def idempotent(request: Request, scope: str, body, fn):
+    """Async twin of app.idempotent; fn is a coroutine function."""
+    key = idempotency_key(request)
+    if key is None:
+        return await fn(), False
+    try:
+        return await idempotency.arun(scope, key, Idempotency.fingerprint(body), fn)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+# -----------------------------
+# Health & meta endpoints
+# -----------------------------
+@app.get("/health", response_class=PlainTextResponse, tags=["meta"])
+async def health():
+    try:
+        async with async_engine.connect() as conn:
+            await conn.run_sync(ping_db)
+        return "ok"
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
+
+@app.get("/v1/healthz", tags=["meta"])
+async def healthz(request: Request):
+    request_id = get_request_id(request)
+    try:
+        async with async_engine.connect() as conn:
+            await conn.run_sync(ping_db)
+        return solace_response(True, data={"status":"ok"}, request_id=request_id)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
+
+@app.get("/v1/version", tags=["meta"])
+async def version(request: Request):
+    request_id = get_request_id(request)
+    return solace_response(True, data={"version": app.version}, request_id=request_id)
+
+@app.get("/v1/readyz", tags=["meta"])
+async def readyz(request: Request):
+    request_id = get_request_id(request)
+    try:
+        async with async_engine.connect() as conn:
+            await conn.run_sync(ping_db)
+        return solace_response(True, data={"ready": True}, request_id=request_id)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"db_error: {e}") from e
+
+# -----------------------------
+# RBAC endpoints
+# -----------------------------
+@app.get("/v1/rbac/roles", tags=["rbac"])
+async def rbac_roles(request: Request):
+    request_id = get_request_id(request)
+    policy = rbac.policy
+    roles = [r["name"] for r in policy.role_info]
+    return solace_response(True, data={"roles": roles, "details": policy.role_info, "version": policy.version},
+                           request_id=request_id)
+
+# Decisions are in-memory lookups, so these run on the event loop.
+@app.post("/v1/rbac/check", tags=["rbac"])
+async def rbac_check(request: Request, subject: str = Body(...), action: str = Body(...), resource: str = Body(...)):
+    request_id = get_request_id(request)
+    decision = rbac.check(subject, action, resource)
+    result = { "allowed": decision.allowed, "role": decision.role }
+    return solace_response(True, data=result, request_id=request_id)
+
+@app.post("/v1/rbac/check:batch", tags=["rbac"])
+async def rbac_check_batch(request: Request, subject: Optional[str] = Body(None), checks: list[dict] = Body(...)):
+    request_id = get_request_id(request)
+    triples = rbac_check_items(subject, checks)
+    policy = rbac.policy
+    results = [{"subject": who, "action": action, "resource": resource, "allowed": d.allowed, "role": d.role}
+               for (who, action, resource), d in zip(triples, rbac.check_many(triples, policy))]
+    return solace_response(True, data={"results": results}, request_id=request_id,
+                           meta={"policyVersion": policy.version})
+
+# -----------------------------
+# Memory search
+# -----------------------------
+@app.get("/v1/memory/search", tags=["memory"])
+async def search_memory(request: Request,
+                        q: str = Query(..., min_length=1, max_length=1000),
+                        k: int = Query(8, ge=1, le=50),
+                        mode: MemoryMode = Query("hybrid"),
+                        alpha: float = Query(0.75, ge=0.0, le=1.0),
+                        per_page: int = Query(2, ge=1, le=50)):
+    request_id = get_request_id(request)
+    try:
+        # embedding and the Weaviate call block; keep them off the event loop
+        hits, meta = await anyio.to_thread.run_sync(
+            lambda: memory_search.search(q, k=k, mode=mode, alpha=alpha, per_page=per_page))
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return solace_response(True, data=hits, request_id=request_id, meta=meta)
+
+# -----------------------------
+# Spirits endpoints
+# -----------------------------
+@app.post("/spirits:batch", tags=["spirits"])
+async def create_spirits_batch(request: Request, items: list[dict] = Body(..., embed=True)):
+    t0 = time.time()
+    request_id = get_request_id(request)
+    if not items or len(items) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"items must contain 1..{MAX_BATCH} entries")
+
+    async def create():
+        results: list[Optional[dict]] = [None] * len(items)
+        valid = validate_create_items(items, results)
+        if valid:
+            async with async_engine.begin() as conn:
+                ids = await conn.run_sync(insert_spirits_batch, valid)
+            await change_feed.apublish_many(created_changes(ids, valid))
+            for sid, (i, name, role, _) in zip(ids, valid):
+                spirit_creations_total.labels(role=role).inc()
+                results[i] = {"index": i, "ok": True,
+                              "data": {"id": sid, "name": name, "role": role, "state": "created"}}
+        return results
+
+    try:
+        results, replayed = await idempotent(request, "spirits:batch", items, create)
+        return replayed_response(results, request_id, replayed)
+    finally:
+        spirit_batch_items.labels(op="create").observe(len(items))
+        spirit_batch_seconds.labels(op="create").observe(time.time() - t0)
+
+@app.put("/spirits/state:batch", tags=["spirits"])
+async def update_spirit_state_batch(request: Request, items: list[dict] = Body(..., embed=True)):
+    t0 = time.time()
+    request_id = get_request_id(request)
+    if not items or len(items) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"items must contain 1..{MAX_BATCH} entries")
+    results: list[Optional[dict]] = [None] * len(items)
+    wanted = validate_state_items(items, results)
+    try:
+        if wanted:
+            async with async_engine.begin() as conn:
+                spirits = await conn.run_sync(transition_spirits_batch, wanted, results)
+            for sid in {r["data"]["id"] for r in results if r and r["ok"]}:
+                await spirit_cache.ainvalidate(sid)
+            await change_feed.apublish_many(state_changes(results, spirits))
+        return solace_response(True, data=results, request_id=request_id)
+    finally:
+        spirit_batch_items.labels(op="state").observe(len(items))
+        spirit_batch_seconds.labels(op="state").observe(time.time() - t0)
+
+@app.post("/spirits", tags=["spirits"])
+async def create_spirit(request: Request,
+    name: str = Body(..., embed=True),
+    role: str = Body(..., embed=True),
+    meta: dict | None = Body(None, embed=True),
+):
+    t0 = time.time()
+    request_id = get_request_id(request)
+
+    async def create():
+        spirit_creations_total.labels(role=role).inc()
+        async with async_engine.begin() as conn:
+            spirit_id = await conn.run_sync(insert_spirit, name, role, meta)
+        await spirit_cache.ainvalidate(spirit_id)
+        data = {"id": spirit_id, "name": name, "role": role, "state": "created"}
+        await change_feed.apublish_many([spirit_change("created", data, "pending")])
+        return data
+
+    try:
+        data, replayed = await idempotent(request, "spirits", {"name": name, "role": role, "meta": meta}, create)
+        return replayed_response(data, request_id, replayed)
+    finally:
+        spirit_creation_seconds.observe(time.time() - t0)
+
+@app.get("/spirits/export", tags=["spirits"])
+async def export_spirits(
+    state: Optional[State] = Query(None),
+    role: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="updated_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="updated_at < until"),
+):
+    sql, params = spirits_export_sql(state, role, since, until)
+    return ndjson_response(stream_ndjson(sql, params, SPIRIT_JSON_COLS, "spirits"), "spirits.ndjson")
+
+@app.get("/spirits/events/export", tags=["spirits"])
+async def export_spirit_events(
+    spirit_id: Optional[int] = Query(None),
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+):
+    sql, params = events_export_sql(spirit_id, event_type, since, until)
+    return ndjson_response(stream_ndjson(sql, params, SPIRIT_JSON_COLS, "spirit_events"), "spirit_events.ndjson")
+
+@app.get("/spirits/stats", tags=["spirits"])
+async def spirit_stats(request: Request):
+    request_id = get_request_id(request)
+    async with async_engine.connect() as conn:
+        stats, source = await conn.run_sync(read_stats)
+    return solace_response(True, data=stats, request_id=request_id, meta={"source": source})
+
+@app.get("/spirits/search", tags=["spirits"])
+async def search_spirits_route(request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    state: Optional[State] = Query(None),
+    role: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+):
+    request_id = get_request_id(request)
+    async with async_engine.connect() as conn:
+        data, page = await conn.run_sync(search_spirits, q, state, role, limit, cursor)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
+@app.get("/spirits/stream", tags=["spirits"])
+async def stream_spirits(request: Request,
+    role: Optional[str] = Query(None),
+    state: Optional[State] = Query(None),
+    last_event_id: Optional[str] = Query(None, description="resume point for clients that cannot send Last-Event-ID"),
+):
+    last_id = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(
+        change_feed.stream(request, role, state, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/spirits/events", tags=["spirits"])
+async def list_events(request: Request,
+    spirit_id: Optional[int] = Query(None),
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+    sort: str = Query("created_at:desc"),
+):
+    request_id = get_request_id(request)
+    async with async_engine.connect() as conn:
+        data, page = await conn.run_sync(query_events, spirit_id, event_type, since, until, limit, cursor, sort)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
+@app.get("/spirits/{spirit_id}/events", tags=["spirits"])
+async def list_spirit_events(request: Request, spirit_id: int,
+    event_type: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime.datetime] = Query(None, description="created_at < until"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page"),
+    sort: str = Query("created_at:desc"),
+):
+    request_id = get_request_id(request)
+    async with async_engine.connect() as conn:
+        data, page = await conn.run_sync(query_events, spirit_id, event_type, since, until, limit, cursor, sort)
+    return solace_response(True, data=data, request_id=request_id, meta=page)
+
+@app.get("/spirits/{spirit_id}", tags=["spirits"])
+async def get_spirit(request: Request, spirit_id: int):
+    request_id = get_request_id(request)
+    row = await spirit_cache.aget(spirit_id)
+    if is_miss(row):
+        spirit_cache.record_miss()
+        generation = await spirit_cache.ageneration(spirit_id)
+        async with async_engine.connect() as conn:
+            row = await conn.run_sync(fetch_spirit, spirit_id)
+        if row:
+            await spirit_cache.aset(spirit_id, row, generation)
+    if not row:
+        raise HTTPException(status_code=404, detail="not found")
+    etag = row_etag(row)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    return solace_response(True, data=row, request_id=request_id, headers={"ETag": etag})
+
+@app.put("/spirits/{spirit_id}/state", tags=["spirits"])
+async def update_spirit_state(request: Request, spirit_id: int,
+                              new_state: State = Body(..., embed=True),
+                              note: str | None = Body(None, embed=True)):
+    request_id = get_request_id(request)
+    async with async_engine.begin() as conn:
+        prev, row = await conn.run_sync(transition_spirit, spirit_id, new_state, note)
+    await spirit_cache.ainvalidate(spirit_id)
+    await change_feed.apublish_many([spirit_change("state_change", row, prev)])
+    return solace_response(True, data=row, request_id=request_id)
+
+@app.patch("/spirits/{spirit_id}", tags=["spirits"])
+async def patch_spirit(request: Request, spirit_id: int,
+                       name: str | None = Body(None, embed=True),
+                       meta: dict | None = Body(None, embed=True),
+                       note: str | None = Body(None, embed=True)):
+    request_id = get_request_id(request)
+    if name is None and meta is None:
+        raise HTTPException(status_code=400, detail="no changes provided")
+    async with async_engine.begin() as conn:
+        row = await conn.run_sync(update_spirit_fields, spirit_id, name, meta, note)
+    await spirit_cache.ainvalidate(spirit_id)
+    await change_feed.apublish_many([spirit_change("updated", row)])
+    return solace_response(True, data=row, request_id=request_id)
+
+@app.get("/spirits", tags=["spirits"])
+async def list_spirits(request: Request,
+    state: Optional[State] = Query(None),
+    role: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, description="substring match on name (ranked search: /spirits/search)"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page; replaces offset"),
+    sort: str = Query("updated_at:desc"),
+):
+    request_id = get_request_id(request)
+    meta = json_filters(request, "meta", SPIRIT_META_PATHS)
+    async with async_engine.connect() as conn:
+        etag = await conn.run_sync(spirits_page_etag, state, role, q, limit, offset, cursor, sort, meta)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        data, page = await conn.run_sync(query_spirits, state, role, q, limit, offset, cursor, sort, meta)
+    return solace_response(True, data=data, request_id=request_id, meta=page, headers={"ETag": etag})
+
+# -----------------------------
+# Registry endpoints
+# -----------------------------
+@app.post("/registry", tags=["registry"])
+async def create_registry(request: Request,
+    name: str = Body(..., embed=True),
+    type: str = Body(..., embed=True),
+    config: dict | None = Body(None, embed=True),
+    auth_mode: str = Body("none", embed=True),
+    status_: str = Body("active", embed=True)
+):
+    request_id = get_request_id(request)
+    try:
+        async with async_engine.begin() as conn:
+            data = await conn.run_sync(insert_registry, name, type, config, auth_mode, status_)
+        return solace_response(True, data=data, request_id=request_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+@app.get("/registry/{reg_id}", tags=["registry"])
+async def get_registry(request: Request, reg_id: str):
+    request_id = get_request_id(request)
+    row = await registry_cache.aget(reg_id)
+    if is_miss(row):
+        registry_cache.record_miss()
+        generation = await registry_cache.ageneration(reg_id)
+        async with async_engine.connect() as conn:
+            row = await conn.run_sync(fetch_registry, reg_id)
+        if row:
+            await registry_cache.aset(reg_id, row, generation)
+    if not row:
+        raise HTTPException(status_code=404, detail="not found")
+    etag = row_etag(row)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    return solace_response(True, data=row, request_id=request_id, headers={"ETag": etag})
+
+@app.patch("/registry/{reg_id}", tags=["registry"])
+async def patch_registry(request: Request, reg_id: str,
+                         name: str | None = Body(None, embed=True),
+                         config: dict | None = Body(None, embed=True),
+                         auth_mode: str | None = Body(None, embed=True),
+                         status_: str | None = Body(None, embed=True)):
+    request_id = get_request_id(request)
+    if not any([name, config, auth_mode, status_]):
+        raise HTTPException(status_code=400, detail="no changes provided")
+    async with async_engine.begin() as conn:
+        row = await conn.run_sync(update_registry, reg_id, name, config, auth_mode, status_)
+    await registry_cache.ainvalidate(reg_id)
+    return solace_response(True, data=row, request_id=request_id)
+
+@app.delete("/registry/{reg_id}", tags=["registry"])
+async def delete_registry(request: Request, reg_id: str):
+    request_id = get_request_id(request)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(remove_registry, reg_id)
+    await registry_cache.ainvalidate(reg_id)
+    return solace_response(True, data={"id": reg_id, "deleted": True}, request_id=request_id)
+
+@app.get("/registry", tags=["registry"])
+async def list_registry(request: Request,
+    type_: Optional[str] = Query(None, alias="type"),
+    status_: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="opaque nextCursor from a previous page; replaces offset"),
+    sort: str = Query("updated_at:desc"),
+):
+    request_id = get_request_id(request)
+    config = json_filters(request, "config", REGISTRY_CONFIG_PATHS)
+    async with async_engine.connect() as conn:
+        etag = await conn.run_sync(registry_page_etag, type_, status_, limit, offset, cursor, sort, config)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        data, page = await conn.run_sync(query_registry, type_, status_, limit, offset, cursor, sort, config)
+    return solace_response(True, data=data, request_id=request_id, meta=page, headers={"ETag": etag})
+
+# -----------------------------
+# Metrics endpoint
+# -----------------------------
+@app.get("/metrics", tags=["meta"])
+async def metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
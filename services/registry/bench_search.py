@@ -0,0 +1,104 @@
+# /home/melynxis/solace/services/registry/bench_search.py
+"""
+Spirit name search at scale: LIKE '%q%' (the old list filter) vs the ngram
+FULLTEXT paths (list_spirits q, GET /spirits/search).
+
+Seeds a copy of the spirits table (CREATE TABLE ... LIKE spirits, so run
+tools/registry_db_migrate_v4_spirit_search.sh first to carry the generated
+column and FULLTEXT indexes over) with synthetic names and descriptions,
+then times four query shapes: exact name, 4-letter prefix, 3-letter
+infix and a one-letter typo. For the typo shape it also reports how often
+the intended spirit is in the top 10.
+
+    python bench_search.py --rows 1000000 --queries 200
+    python bench_search.py --skip-seed            # reuse the seeded table
+"""
+
+from sqlalchemy import create_engine, text
+import argparse, json, random, statistics, time
+
+import registry_core
+
+TABLE = "spirits_search_bench"
+SYLLABLES = ("ka", "ri", "mo", "sel", "vyn", "tha", "or", "el", "quin", "dra", "lu", "shi", "ren", "ash",
+             "fen", "gal", "mir", "os", "tor", "wyn", "ae", "bri", "cae", "dun", "is", "ny", "pell", "zor")
+ROLES = ("archivist", "scout", "steward", "dreamer", "warden", "courier")
+WORDS = ("memory", "river", "archive", "lantern", "signal", "harvest", "ember", "circuit", "feather", "tide")
+
+def spirit_name(rng: random.Random) -> str:
+    parts = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+             for _ in range(rng.randint(1, 2))]
+    return " ".join(parts)
+
+def seed(conn, rows: int, batch: int = 5000):
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"CREATE TABLE {TABLE} LIKE spirits"))
+    rng = random.Random(7)
+    sql = f"INSERT INTO {TABLE} (name, role, state, meta) VALUES (%s, %s, 'created', %s)"
+    t0 = time.perf_counter()
+    for start in range(0, rows, batch):
+        values = []
+        for _ in range(min(batch, rows - start)):
+            desc = " ".join(rng.choice(WORDS) for _ in range(6))
+            values.append((spirit_name(rng), rng.choice(ROLES), json.dumps({"description": desc})))
+        conn.exec_driver_sql(sql, values)
+        conn.commit()
+    conn.execute(text(f"ANALYZE TABLE {TABLE}"))
+    print(f"seeded {rows} rows in {time.perf_counter() - t0:.0f}s")
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(name))
+    return name[:i] + rng.choice("aeiourstln") + name[i + 1:]
+
+def query_set(conn, n: int) -> dict[str, list[tuple[str, str]]]:
+    rng = random.Random(11)
+    names = [r[0] for r in conn.execute(text(f"SELECT name FROM {TABLE} ORDER BY RAND(11) LIMIT :n"), {"n": n})]
+    return {
+        "exact": [(nm, nm) for nm in names],
+        "prefix": [(nm[:4], nm) for nm in names],
+        "infix": [(nm[1:4], nm) for nm in names],
+        "typo": [(typo(nm, rng), nm) for nm in names],
+    }
+
+def timed(conn, sql: str, params: dict) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    rows = conn.execute(text(sql), params).all()
+    return time.perf_counter() - t0, rows
+
+def ms(samples: list[float]) -> str:
+    q = statistics.quantiles(samples, n=100)
+    return f"p50={q[49] * 1000:8.2f}ms p95={q[94] * 1000:8.2f}ms"
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--skip-seed", action="store_true")
+    args = ap.parse_args()
+    registry_core.REGISTRY_SPIRIT_FULLTEXT = True
+
+    with create_engine(registry_core.DATABASE_URL, future=True).connect() as conn:
+        if not args.skip_seed:
+            seed(conn, args.rows)
+        shapes = query_set(conn, args.queries)
+        for shape, queries in shapes.items():
+            like, listed, ranked, hits = [], [], [], 0
+            for q, want in queries:
+                dt, _ = timed(conn, f"SELECT id FROM {TABLE} WHERE name LIKE :q "
+                                    f"ORDER BY updated_at DESC, id DESC LIMIT 50", {"q": f"%{q}%"})
+                like.append(dt)
+                params = {}
+                where = registry_core.name_contains_sql(q, params)
+                dt, _ = timed(conn, f"SELECT id FROM {TABLE} WHERE {where} "
+                                    f"ORDER BY updated_at DESC, id DESC LIMIT 50", params)
+                listed.append(dt)
+                sql, params = registry_core.spirit_search_sql(q, None, None, 10, 0, table=TABLE)
+                dt, rows = timed(conn, sql, params)
+                ranked.append(dt)
+                hits += any(r.name == want for r in rows)
+            print(f"{shape:<7} like     {ms(like)}")
+            print(f"{shape:<7} list q   {ms(listed)}")
+            print(f"{shape:<7} search   {ms(ranked)}  intended@10={hits / len(queries):.2f}")
+
+if __name__ == "__main__":
+    main()
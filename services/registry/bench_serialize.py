@@ -0,0 +1,111 @@
+# /home/melynxis/solace/services/registry/bench_serialize.py
+"""
+Micro-benchmark: list endpoint response building, before vs after fastjson.
+
+Feeds rows shaped like PyMySQL returns them for GET /spirits and GET /registry
+(datetimes as datetime, JSON columns as text) through:
+  before: the previous _coerce_meta + serialize_row copies and stock JSONResponse
+  after:  fastjson.encode_row + SolaceJSONResponse (current solace_response)
+
+    python bench_serialize.py --rows 500 --repeat 200
+"""
+
+from fastapi.responses import JSONResponse
+import argparse, datetime, json, random, statistics, time, uuid
+
+import fastjson
+
+# --- previous implementation, kept verbatim for comparison ---
+def _coerce_meta(row: dict) -> dict:
+    r = dict(row)
+    m = r.get("meta")
+    if m is not None and isinstance(m, str) and m != "":
+        try:
+            r["meta"] = json.loads(m)
+        except Exception:
+            pass
+    return r
+
+def serialize_row(row: dict) -> dict:
+    r = dict(row)
+    for k, v in r.items():
+        if isinstance(v, (datetime.datetime, datetime.date)):
+            r[k] = v.isoformat()
+    return r
+
+def registry_rowmap(r):
+    rr = dict(r)
+    if rr.get("config") is not None and isinstance(rr["config"], str):
+        try: rr["config"] = json.loads(rr["config"])
+        except Exception: pass
+    return serialize_row(rr)
+
+def envelope(data):
+    return {"ok": True, "data": data, "meta": {"requestId": str(uuid.uuid4()), "nextCursor": None}}
+
+def before_spirits(rows):
+    return JSONResponse(envelope([serialize_row(_coerce_meta(r)) for r in rows])).body
+
+def after_spirits(rows):
+    return fastjson.SolaceJSONResponse(envelope([fastjson.encode_row(r, ("meta",)) for r in rows])).body
+
+def before_registry(rows):
+    return JSONResponse(envelope([registry_rowmap(r) for r in rows])).body
+
+def after_registry(rows):
+    return fastjson.SolaceJSONResponse(envelope([fastjson.encode_row(r, ("config",)) for r in rows])).body
+
+# --- fixtures ---
+def make_meta(rng):
+    return json.dumps({
+        "host": f"solace-{rng.randint(1, 8)}",
+        "tags": [f"t{rng.randint(0, 50)}" for _ in range(5)],
+        "traits": {k: rng.random() for k in ("warmth", "curiosity", "caution", "wit")},
+        "note": "x" * rng.randint(20, 120),
+    })
+
+def spirit_rows(n, rng):
+    now = datetime.datetime(2025, 9, 1, 12, 0, 0)
+    return [{
+        "id": i, "name": f"spirit-{i}", "role": rng.choice(["builder", "memory", "guide"]),
+        "state": rng.choice(["pending", "created", "ready", "error"]), "meta": make_meta(rng),
+        "created_at": now - datetime.timedelta(days=i), "updated_at": now - datetime.timedelta(seconds=i),
+    } for i in range(n)]
+
+def registry_rows(n, rng):
+    now = datetime.datetime(2025, 9, 1, 12, 0, 0)
+    return [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"svc-{i}", "type": "tool",
+        "config": make_meta(rng), "auth_mode": "none", "status": "active",
+        "created_at": now, "updated_at": now - datetime.timedelta(seconds=i),
+    } for i in range(n)]
+
+def timeit(fn, rows, repeat):
+    fn(rows)  # warm
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(rows)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000, min(samples) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    rng = random.Random(7)
+
+    print(f"backend={fastjson.BACKEND} passthrough={fastjson.PASSTHROUGH} rows={args.rows}")
+    for label, rows, before, after in (
+        ("GET /spirits", spirit_rows(args.rows, rng), before_spirits, after_spirits),
+        ("GET /registry", registry_rows(args.rows, rng), before_registry, after_registry),
+    ):
+        assert json.loads(before(rows))["data"] == json.loads(after(rows))["data"]
+        b_med, b_min = timeit(before, rows, args.repeat)
+        a_med, a_min = timeit(after, rows, args.repeat)
+        print(f"{label:<14} before {b_med:7.2f} ms (min {b_min:6.2f})  "
+              f"after {a_med:7.2f} ms (min {a_min:6.2f})  speedup x{b_med / a_med:4.1f}")
+
+if __name__ == "__main__":
+    main()
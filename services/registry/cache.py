@@ -0,0 +1,271 @@
+# /home/melynxis/solace/services/registry/cache.py
+"""
+Read-through cache for hot registry lookups.
+
+Two tiers:
+  - local: per-process LRU with TTL (always on)
+  - redis: optional shared tier on solace_redis, so workers share warm entries
+
+Writers call invalidate() after commit. With the Redis tier enabled the
+invalidation is also published so every worker drops its local copy.
+
+Every invalidate() also bumps the key's generation (locally, and in Redis
+when the tier is on). A reader captures the generation before loading from
+MySQL and only stores what it loaded if the generation is unchanged, so a
+row read just before a concurrent update is never written back over it.
+"""
+
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+from typing import Any, Callable, Optional
+import itertools, json, threading, time, logging
+
+import anyio
+
+from fastjson import dumps, loads
+
+log = logging.getLogger("solace.registry.cache")
+
+INVALIDATE_CHANNEL = "solace:registry:cache:invalidate"
+
+cache_hits = Counter("registry_cache_hits_total", "Cache hits", ["cache", "tier"])
+cache_misses = Counter("registry_cache_misses_total", "Cache misses (loaded from MySQL)", ["cache"])
+cache_evictions = Counter("registry_cache_evictions_total", "Local cache evictions", ["cache", "reason"])
+cache_invalidations = Counter("registry_cache_invalidations_total", "Explicit invalidations", ["cache"])
+cache_raced_loads = Counter("registry_cache_raced_loads_total",
+                            "Loads not cached because the key was invalidated during the load", ["cache"])
+cache_entries = Gauge("registry_cache_entries", "Entries in the local tier", ["cache"])
+
+_MISS = object()
+
+# KEYS[1]=value KEYS[2]=generation ARGV[1]=payload ARGV[2]=ttl ARGV[3]=generation seen before the load
+_SET_IF_GENERATION = """
+local gen = redis.call('GET', KEYS[2]) or ''
+if gen ~= ARGV[3] then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+GENERATION_TTL = 3600  # must outlive any load; an expired generation reads as a fresh key
+
+class LRUTTLCache:
+    """Thread-safe LRU with a per-entry TTL. Expired entries are dropped on read."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISS
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                cache_evictions.labels(cache=self.name, reason="expired").inc()
+                cache_entries.labels(cache=self.name).set(len(self._data))
+                return _MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                cache_evictions.labels(cache=self.name, reason="capacity").inc()
+            cache_entries.labels(cache=self.name).set(len(self._data))
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            cache_entries.labels(cache=self.name).set(len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            cache_entries.labels(cache=self.name).set(0)
+
+class ReadThroughCache:
+    """
+    get_or_load(key, loader): local tier, then Redis, then loader().
+    None results (404s) are not cached so a later create is seen immediately.
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000, ttl: float = 5.0,
+                 redis_client=None, redis_ttl: int = 30):
+        self.name = name
+        self.local = LRUTTLCache(name, maxsize, ttl)
+        self.redis = redis_client
+        self.redis_ttl = redis_ttl
+        # Local generations: a unique stamp per invalidation, bounded like the
+        # LRU. Keys without a stamp read as the highest stamp evicted so far,
+        # so dropping a stamp can only make a pending load skip its set.
+        self._gens: OrderedDict[Any, int] = OrderedDict()
+        self._gen_floor = 0
+        self._gen_seq = itertools.count(1)
+        self._gen_max = maxsize
+        self._gen_lock = threading.Lock()
+        self._set_if_generation = redis_client.register_script(_SET_IF_GENERATION) if redis_client else None
+
+    def _rkey(self, key) -> str:
+        return f"solace:registry:{self.name}:{key}"
+
+    def _gkey(self, key) -> str:
+        return f"solace:registry:{self.name}:gen:{key}"
+
+    def _bump(self, key):
+        # caller holds _gen_lock
+        self._gens[key] = next(self._gen_seq)
+        self._gens.move_to_end(key)
+        while len(self._gens) > self._gen_max:
+            _, stamp = self._gens.popitem(last=False)
+            self._gen_floor = max(self._gen_floor, stamp)
+
+    def generation(self, key) -> tuple:
+        """Capture before loading; pass to set() so a load that raced an invalidate() is dropped."""
+        with self._gen_lock:
+            local = self._gens.get(key, self._gen_floor)
+        if self.redis is None:
+            return (local, None)
+        try:
+            raw = self.redis.get(self._gkey(key))
+        except Exception as e:
+            log.warning("redis generation read failed for %s: %s", self.name, e)
+            return (local, _MISS)  # unknown: the value is kept local only
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        return (local, raw or "")
+
+    def _redis_get(self, key):
+        try:
+            raw = self.redis.get(self._rkey(key))
+        except Exception as e:  # a sick Redis must not take reads down with it
+            log.warning("redis get failed for %s: %s", self.name, e)
+            return _MISS
+        return _MISS if raw is None else loads(raw)
+
+    def _redis_set(self, key, value, redis_gen=None):
+        try:
+            if redis_gen is None:
+                self.redis.set(self._rkey(key), dumps(value), ex=self.redis_ttl)
+            else:
+                self._set_if_generation(keys=[self._rkey(key), self._gkey(key)],
+                                        args=[dumps(value), self.redis_ttl, redis_gen])
+        except Exception as e:
+            log.warning("redis set failed for %s: %s", self.name, e)
+
+    def _redis_invalidate(self, key):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(self._rkey(key))
+            pipe.incr(self._gkey(key))
+            pipe.expire(self._gkey(key), GENERATION_TTL)
+            pipe.publish(INVALIDATE_CHANNEL, json.dumps([self.name, key]))
+            pipe.execute()
+        except Exception as e:
+            log.warning("redis invalidate failed for %s: %s", self.name, e)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not _MISS:
+            cache_hits.labels(cache=self.name, tier="local").inc()
+            return value
+        if self.redis is not None:
+            value = self._redis_get(key)
+            if value is not _MISS:
+                cache_hits.labels(cache=self.name, tier="redis").inc()
+                self.local.set(key, value)
+                return value
+        return _MISS
+
+    def set(self, key, value, generation: Optional[tuple] = None):
+        """Store value; with a generation from before the load, only if no invalidate() happened since."""
+        local_gen, redis_gen = generation if generation is not None else (None, None)
+        if local_gen is not None:
+            with self._gen_lock:
+                if self._gens.get(key, self._gen_floor) != local_gen:
+                    cache_raced_loads.labels(cache=self.name).inc()
+                    return
+                self.local.set(key, value)  # under the lock: an invalidate() can't slip in between
+        else:
+            self.local.set(key, value)
+        if self.redis is not None and redis_gen is not _MISS:
+            self._redis_set(key, value, redis_gen)
+
+    def record_miss(self):
+        cache_misses.labels(cache=self.name).inc()
+
+    def get_or_load(self, key, loader: Callable[[], Optional[Any]]):
+        value = self.get(key)
+        if value is not _MISS:
+            return value
+        self.record_miss()
+        generation = self.generation(key)
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    def invalidate_local(self, key):
+        with self._gen_lock:
+            self._bump(key)
+            self.local.pop(key)
+
+    def invalidate(self, key):
+        cache_invalidations.labels(cache=self.name).inc()
+        self.invalidate_local(key)
+        if self.redis is not None:
+            self._redis_invalidate(key)
+
+    # Async callers (app_async): the local tier never blocks, Redis round
+    # trips are pushed to a worker thread so the event loop stays free.
+    async def aget(self, key):
+        value = self.local.get(key)
+        if value is not _MISS:
+            cache_hits.labels(cache=self.name, tier="local").inc()
+            return value
+        if self.redis is None:
+            return _MISS
+        return await anyio.to_thread.run_sync(self.get, key)
+
+    async def ageneration(self, key) -> tuple:
+        if self.redis is None:
+            return self.generation(key)
+        return await anyio.to_thread.run_sync(self.generation, key)
+
+    async def aset(self, key, value, generation: Optional[tuple] = None):
+        if self.redis is None:
+            self.set(key, value, generation)
+        else:
+            await anyio.to_thread.run_sync(self.set, key, value, generation)
+
+    async def ainvalidate(self, key):
+        if self.redis is None:
+            self.invalidate(key)
+        else:
+            await anyio.to_thread.run_sync(self.invalidate, key)
+
+def is_miss(value) -> bool:
+    return value is _MISS
+
+def start_invalidation_listener(redis_client, caches: list[ReadThroughCache]):
+    """Drop local entries when any worker publishes an invalidation."""
+    by_name = {c.name: c for c in caches}
+
+    def handle(message):
+        try:
+            name, key = json.loads(message["data"])
+        except Exception:
+            return
+        cache = by_name.get(name)
+        if cache is not None:
+            cache.invalidate_local(key)
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{INVALIDATE_CHANNEL: handle})
+    return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
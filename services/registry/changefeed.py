@@ -0,0 +1,228 @@
+# /home/melynxis/solace/services/registry/changefeed.py
+"""
+Live change feed for spirits, served as Server-Sent Events.
+
+Writers call publish()/publish_many() after commit. With Redis configured,
+one Lua call per event appends it to a capped stream (the replay log for
+Last-Event-ID resumes) and PUBLISHes it; each worker holds a single pub/sub
+subscription and fans events out to its local SSE clients through bounded
+per-client queues. Without Redis the same hub runs in-process with a ring
+buffer for replay, which is only correct for a single worker.
+
+A client whose queue overflows is disconnected; EventSource reconnects with
+Last-Event-ID and catches up from the replay log. If its last id has already
+been trimmed it gets an `event: reset` and should resync via GET /spirits.
+"""
+
+from collections import deque
+from prometheus_client import Counter, Gauge
+from typing import Optional
+import asyncio, itertools, logging, threading
+
+import anyio
+
+from fastjson import dumps, iso, loads
+
+log = logging.getLogger("solace.registry.changefeed")
+
+feed_events_published = Counter("registry_feed_events_published_total", "Spirit change events published", ["type"])
+feed_clients = Gauge("registry_feed_clients", "Connected SSE clients on this worker")
+feed_clients_dropped = Counter("registry_feed_clients_dropped_total", "SSE clients dropped for falling behind")
+
+# KEYS[1]=stream KEYS[2]=channel ARGV[1]=payload ARGV[2]=maxlen
+_XADD_PUBLISH = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'data', ARGV[1])
+redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[1])
+return id
+"""
+
+def _sid(eid: str) -> tuple[int, int]:
+    ms, _, seq = eid.partition("-")
+    return int(ms), int(seq or 0)
+
+def _frame(eid: str, event: dict, data: str) -> str:
+    return f"id: {eid}\nevent: spirit.{event.get('type', 'change')}\ndata: {data}\n\n"
+
+class _Subscriber:
+    __slots__ = ("role", "state", "queue", "overflow")
+
+    def __init__(self, role: Optional[str], state: Optional[str], size: int):
+        self.role = role
+        self.state = state
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.overflow = False
+
+    def matches(self, event: dict) -> bool:
+        spirit = event.get("spirit") or {}
+        if self.role and spirit.get("role") != self.role:
+            return False
+        if self.state and spirit.get("state") != self.state:
+            return False
+        return True
+
+class ChangeFeed:
+    def __init__(self, redis_client=None, aredis_factory=None,
+                 stream_key: str = "solace:spirits:changes",
+                 channel: str = "solace:spirits:changes:live",
+                 maxlen: int = 10000, queue_size: int = 1000, heartbeat: float = 15.0):
+        self.redis = redis_client
+        self._aredis_factory = aredis_factory
+        self.stream_key = stream_key
+        self.channel = channel
+        self.maxlen = maxlen
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subs: set[_Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._local_log: deque = deque(maxlen=maxlen)
+        self._local_seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._script = redis_client.register_script(_XADD_PUBLISH) if redis_client is not None else None
+
+    # -- lifecycle --
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self.redis is not None and self._aredis_factory is not None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    # -- publishing (sync; called from route threads after commit) --
+    def publish(self, event: dict) -> Optional[str]:
+        ids = self.publish_many([event])
+        return ids[0] if ids else None
+
+    def publish_many(self, events: list[dict]) -> list[str]:
+        if not events:
+            return []
+        for ev in events:
+            feed_events_published.labels(type=ev.get("type", "change")).inc()
+        payloads = [dumps(ev).decode() for ev in events]
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for data in payloads:
+                    self._script(keys=[self.stream_key, self.channel], args=[data, self.maxlen], client=pipe)
+                return [i.decode() if isinstance(i, bytes) else i for i in pipe.execute()]
+            except Exception as e:  # the write already committed; never fail the request over the feed
+                log.warning("change feed publish failed: %s", e)
+                return []
+        ids = []
+        with self._lock:
+            for ev, data in zip(events, payloads):
+                eid = f"{next(self._local_seq)}-0"
+                self._local_log.append((eid, ev, data))
+                ids.append((eid, ev, data))
+        if self._loop is not None:
+            for item in ids:
+                self._loop.call_soon_threadsafe(self._dispatch, *item)
+        return [eid for eid, _, _ in ids]
+
+    async def apublish_many(self, events: list[dict]) -> list[str]:
+        if self.redis is None:
+            return self.publish_many(events)
+        return await anyio.to_thread.run_sync(self.publish_many, events)
+
+    # -- fan-out --
+    def _dispatch(self, eid: str, event: dict, data: str):
+        for sub in list(self._subs):
+            if sub.overflow or not sub.matches(event):
+                continue
+            try:
+                sub.queue.put_nowait((eid, event, data))
+            except asyncio.QueueFull:
+                sub.overflow = True
+                feed_clients_dropped.inc()
+
+    async def _listen(self):
+        while True:
+            try:
+                client = self._aredis_factory()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                async for msg in pubsub.listen():
+                    raw = msg["data"].decode() if isinstance(msg["data"], bytes) else msg["data"]
+                    eid, _, data = raw.partition(" ")
+                    self._dispatch(eid, loads(data), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("change feed listener error, reconnecting: %s", e)
+                await asyncio.sleep(1.0)
+
+    # -- replay --
+    def replay(self, last_id: str) -> tuple[list[tuple[str, dict, str]], bool]:
+        """Events after last_id, and whether last_id fell off the retained log."""
+        try:
+            last = _sid(last_id)
+        except ValueError:
+            return [], True
+        if self.redis is not None:
+            oldest = self.redis.xrange(self.stream_key, "-", "+", count=1)
+            entries = self.redis.xrange(self.stream_key, f"({last_id}", "+", count=self.maxlen)
+            out = []
+            for eid, fields in entries:
+                eid = eid.decode() if isinstance(eid, bytes) else eid
+                data = fields.get(b"data", fields.get("data"))
+                data = data.decode() if isinstance(data, bytes) else data
+                out.append((eid, loads(data), data))
+            oldest_id = oldest[0][0].decode() if oldest and isinstance(oldest[0][0], bytes) else (oldest[0][0] if oldest else None)
+            return out, bool(oldest_id) and _sid(oldest_id) > last
+        with self._lock:
+            retained = list(self._local_log)
+        # Local ids are a dense counter, so a gap is exact here.
+        gap = bool(retained) and _sid(retained[0][0])[0] > last[0] + 1
+        return [e for e in retained if _sid(e[0]) > last], gap
+
+    # -- SSE --
+    async def stream(self, request, role: Optional[str], state: Optional[str], last_id: Optional[str]):
+        sub = _Subscriber(role, state, self.queue_size)
+        # Register before replaying so nothing published in between is lost;
+        # anything already replayed is skipped by id below.
+        self._subs.add(sub)
+        feed_clients.inc()
+        try:
+            yield "retry: 3000\n\n"
+            seen: Optional[tuple[int, int]] = None
+            if last_id:
+                entries, gap = await anyio.to_thread.run_sync(self.replay, last_id) if self.redis is not None \
+                    else self.replay(last_id)
+                if gap:
+                    yield "event: reset\ndata: {}\n\n"
+                for eid, event, data in entries:
+                    seen = _sid(eid)
+                    if sub.matches(event):
+                        yield _frame(eid, event, data)
+            while not sub.overflow:
+                if await request.is_disconnected():
+                    break
+                try:
+                    eid, event, data = await asyncio.wait_for(sub.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if seen is not None and _sid(eid) <= seen:
+                    continue
+                yield _frame(eid, event, data)
+        finally:
+            self._subs.discard(sub)
+            feed_clients.dec()
+
+def spirit_change(type_: str, spirit: dict, prev_state: Optional[str] = None) -> dict:
+    """Compact event body; consumers fetch the full row (cached, ETagged) if needed."""
+    event = {
+        "type": type_,
+        "spirit": {
+            "id": spirit["id"],
+            "name": spirit.get("name"),
+            "role": spirit.get("role"),
+            "state": spirit.get("state"),
+            "updated_at": iso(spirit.get("updated_at")),
+        },
+    }
+    if prev_state is not None:
+        event["prev_state"] = prev_state
+    return event
@@ -18,5 +18,9 @@ source .venv/bin/activate
 pip install --upgrade pip >/dev/null
 pip install -r requirements.txt
 
+# memory_search imports the embedders and the local vector index from the ingest
+export PYTHONPATH="$BASE/../ingest${PYTHONPATH:+:$PYTHONPATH}"
+
 # Run on 0.0.0.0 so LAN can reach it (UFW will gate)
-exec uvicorn app:app --host 0.0.0.0 --port "${REGISTRY_PORT:-8081}" --reload
+# REGISTRY_APP=app_async selects the async variant
+exec uvicorn "${REGISTRY_APP:-app}:app" --host 0.0.0.0 --port "${REGISTRY_PORT:-8081}" --reload
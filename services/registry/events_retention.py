@@ -0,0 +1,127 @@
+# /home/melynxis/solace/services/registry/events_retention.py
+"""
+Partition upkeep and retention for spirit_events.
+
+spirit_events is RANGE-partitioned by month (p<YYYYMM> + pmax, see
+tools/registry_db_migrate_v3_events_partitions.sh). This job:
+  - splits pmax so there are always --ahead months of empty partitions
+  - removes whole months older than --keep-months, either with
+    DROP PARTITION or, with --archive, by EXCHANGE PARTITION into a
+    standalone spirit_events_archive_<YYYYMM> table first
+
+Both are metadata operations: no row-by-row DELETE, no undo log growth.
+
+    python events_retention.py --keep-months 12 --ahead 3 --archive --dry-run
+"""
+
+from sqlalchemy import create_engine, text
+import argparse, datetime, logging
+
+from registry_core import DATABASE_URL
+
+log = logging.getLogger("solace.registry.events_retention")
+
+TABLE = "spirit_events"
+
+def month_start(d: datetime.date) -> datetime.date:
+    return d.replace(day=1)
+
+def add_months(d: datetime.date, n: int) -> datetime.date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return datetime.date(d.year + y, m + 1, 1)
+
+def partition_name(month: datetime.date) -> str:
+    return f"p{month:%Y%m}"
+
+def list_partitions(conn) -> list[str]:
+    rows = conn.execute(
+        text(
+            "SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"t": TABLE},
+    ).scalars().all()
+    if not rows:
+        raise SystemExit(f"{TABLE} is not partitioned; run tools/registry_db_migrate_v3_events_partitions.sh first")
+    return list(rows)
+
+def plan_ahead(parts: list[str], today: datetime.date, ahead: int) -> list[datetime.date]:
+    """Months that need a partition split out of pmax."""
+    have = {p for p in parts if p != "pmax"}
+    target = add_months(month_start(today), ahead)
+    latest = max((datetime.datetime.strptime(p[1:], "%Y%m").date() for p in have), default=add_months(month_start(today), -1))
+    months, m = [], add_months(latest, 1)
+    while m <= target:
+        months.append(m)
+        m = add_months(m, 1)
+    return months
+
+def plan_expired(parts: list[str], today: datetime.date, keep_months: int) -> list[str]:
+    cutoff = partition_name(add_months(month_start(today), -(keep_months - 1)))
+    return [p for p in parts if p != "pmax" and p < cutoff]
+
+def split_pmax(conn, months: list[datetime.date], dry_run: bool):
+    if not months:
+        return
+    defs = ", ".join(
+        f"PARTITION {partition_name(m)} VALUES LESS THAN (UNIX_TIMESTAMP('{add_months(m, 1):%Y-%m-%d} 00:00:00'))"
+        for m in months
+    )
+    sql = f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO ({defs}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    log.info("add partitions: %s", ", ".join(partition_name(m) for m in months))
+    if not dry_run:
+        conn.execute(text(sql))
+
+def archive_partition(conn, part: str, dry_run: bool):
+    archive = f"{TABLE}_archive_{part[1:]}"
+    exists = conn.execute(
+        text("SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"),
+        {"t": archive},
+    ).scalar()
+    stmts = [] if exists else [
+        f"CREATE TABLE {archive} LIKE {TABLE}",
+        f"ALTER TABLE {archive} REMOVE PARTITIONING",
+    ]
+    # An archive left with rows by an interrupted run already took this
+    # partition; exchanging again would swap the rows back in.
+    if not exists or not conn.execute(text(f"SELECT EXISTS(SELECT 1 FROM {archive})")).scalar():
+        stmts.append(f"ALTER TABLE {TABLE} EXCHANGE PARTITION {part} WITH TABLE {archive} WITHOUT VALIDATION")
+    log.info("archive %s -> %s", part, archive)
+    if not dry_run:
+        for sql in stmts:
+            conn.execute(text(sql))
+
+def drop_partitions(conn, parts: list[str], dry_run: bool):
+    if not parts:
+        return
+    log.info("drop partitions: %s", ", ".join(parts))
+    if not dry_run:
+        conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(parts)}"))
+
+def run(keep_months: int, ahead: int, archive: bool, dry_run: bool, today: datetime.date | None = None):
+    today = today or datetime.datetime.utcnow().date()
+    with create_engine(DATABASE_URL, future=True).connect() as conn:
+        parts = list_partitions(conn)
+        split_pmax(conn, plan_ahead(parts, today, ahead), dry_run)
+        expired = plan_expired(parts, today, keep_months)
+        if archive:
+            for part in expired:
+                archive_partition(conn, part, dry_run)
+        drop_partitions(conn, expired, dry_run)
+        conn.commit()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--keep-months", type=int, default=12, help="months of events to keep, current month included")
+    ap.add_argument("--ahead", type=int, default=3, help="future monthly partitions to keep ready")
+    ap.add_argument("--archive", action="store_true", help="exchange expired partitions into archive tables before dropping")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.keep_months < 1:
+        raise SystemExit("--keep-months must be >= 1")
+    run(args.keep_months, args.ahead, args.archive, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# /home/melynxis/solace/services/registry/fastjson.py
+"""
+Pluggable JSON encoding for registry responses.
+
+REGISTRY_JSON=orjson (default when installed) renders responses with orjson:
+datetimes are encoded natively and MySQL JSON columns, which PyMySQL hands
+back as already-valid JSON text, are embedded verbatim via orjson.Fragment
+instead of a json.loads/json.dumps round trip. REGISTRY_JSON=std keeps the
+stdlib path (decode JSON columns, ISO-format datetimes) for environments
+without orjson.
+"""
+
+from fastapi.responses import JSONResponse
+from typing import Any, Iterable
+import datetime, json, os
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback below
+    orjson = None
+
+BACKEND = os.getenv("REGISTRY_JSON", "orjson" if orjson is not None else "std")
+if BACKEND == "orjson" and orjson is None:
+    BACKEND = "std"
+# Fragment (orjson >= 3.9) is what lets JSON columns skip decoding entirely.
+PASSTHROUGH = BACKEND == "orjson" and hasattr(orjson, "Fragment")
+
+def _is_fragment(value: Any) -> bool:
+    return orjson is not None and hasattr(orjson, "Fragment") and isinstance(value, orjson.Fragment)
+
+def plain(value: Any) -> Any:
+    """Decode a Fragment back to Python when a caller needs the value itself."""
+    if _is_fragment(value):
+        return orjson.loads(orjson.dumps(value))  # a Fragment exposes nothing but its serialization
+    return value
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if _is_fragment(obj):
+        return plain(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+if BACKEND == "orjson":
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+class SolaceJSONResponse(JSONResponse):
+    """JSONResponse rendered through the configured backend."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def encode_row(row, json_cols: Iterable[str] = ()) -> dict:
+    """
+    One pass from a DB row mapping to a response dict. With orjson, JSON
+    columns become Fragments and datetimes pass through untouched; with the
+    stdlib backend JSON columns are decoded and datetimes ISO-formatted.
+    """
+    out = {}
+    for k, v in row.items():
+        if v is None:
+            out[k] = None
+        elif k in json_cols and isinstance(v, (str, bytes)):
+            if PASSTHROUGH:
+                out[k] = orjson.Fragment(v) if v else None
+            else:
+                try:
+                    out[k] = json.loads(v)
+                except ValueError:
+                    out[k] = v
+        elif not PASSTHROUGH and isinstance(v, (datetime.datetime, datetime.date)):
+            out[k] = v.isoformat()
+        else:
+            out[k] = v
+    return out
+
+def iso(value: Any) -> Any:
+    """Normalise a datetime or its ISO string so validators agree across tiers."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,202 @@
+# /home/melynxis/solace/services/registry/idempotency.py
+"""
+Idempotency-Key support for spirit creation.
+
+A client that retries a create after a timeout sends the same
+Idempotency-Key header and gets the first attempt's response back instead
+of a second spirit (and a second spirit_events row). Each key is stored with
+a fingerprint of the request body:
+
+  - SET NX claims the key as "pending" for lock_ttl seconds; only the
+    claimant runs the write
+  - on success the response snapshot replaces the claim for ttl seconds,
+    and replays are served from it without touching MySQL
+  - on failure the claim is deleted so the retry can run
+
+Concurrent requests with the same key on one worker wait for the leader's
+result in process; across workers they poll the pending claim until the
+snapshot lands. Reusing a key with a different body, or a claim that is
+still pending after lock_ttl, is an IdempotencyConflict (409).
+
+Without Redis (or while it is failing) the same flow runs on a per-process
+LRU, which is only correct for a single worker.
+"""
+
+from prometheus_client import Counter
+from typing import Any, Awaitable, Callable, Optional
+import asyncio, hashlib, json, threading, time, logging
+
+import anyio
+
+from cache import LRUTTLCache, is_miss
+from fastjson import dumps, loads
+
+log = logging.getLogger("solace.registry.idempotency")
+
+idempotency_requests = Counter("registry_idempotency_requests_total",
+                               "Requests carrying an Idempotency-Key", ["scope", "outcome"])
+
+class IdempotencyConflict(Exception):
+    pass
+
+class _Flight:
+    """One in-process execution that same-key requests wait on."""
+    __slots__ = ("fp", "done", "result", "error")
+
+    def __init__(self, fp: str, done):
+        self.fp = fp
+        self.done = done
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class Idempotency:
+    def __init__(self, redis_client=None, ttl: int = 86400, lock_ttl: int = 30,
+                 poll: float = 0.05, maxsize: int = 10000):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.poll = poll
+        self._local = LRUTTLCache("idempotency", maxsize, ttl)
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._aflights: dict[str, _Flight] = {}
+
+    @staticmethod
+    def fingerprint(body: Any) -> str:
+        raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _rkey(self, scope: str, key: str) -> str:
+        return f"solace:registry:idempotency:{scope}:{key}"
+
+    # -- store: Redis, else the local LRU --
+    def _claim(self, name: str, fp: str) -> Optional[dict]:
+        """None when this caller now owns the key, else the existing record."""
+        pending = {"state": "pending", "fp": fp}
+        if self.redis is not None:
+            try:
+                while True:
+                    if self.redis.set(name, dumps(pending), nx=True, ex=self.lock_ttl):
+                        return None
+                    raw = self.redis.get(name)
+                    if raw is not None:  # else it expired between SET and GET
+                        return loads(raw)
+            except Exception as e:  # a sick Redis must not take creates down with it
+                log.warning("redis claim failed for %s: %s", name, e)
+        with self._lock:
+            rec = self._local.get(name)
+            if is_miss(rec) or (rec["state"] == "pending" and rec["until"] < time.monotonic()):
+                self._local.set(name, {**pending, "until": time.monotonic() + self.lock_ttl})
+                return None
+            return rec
+
+    def _store(self, name: str, fp: str, response):
+        rec = {"state": "done", "fp": fp, "response": response}
+        if self.redis is not None:
+            try:
+                self.redis.set(name, dumps(rec), ex=self.ttl)
+                return
+            except Exception as e:
+                log.warning("redis store failed for %s: %s", name, e)
+        self._local.set(name, rec)
+
+    def _release(self, name: str):
+        self._local.pop(name)
+        if self.redis is not None:
+            try:
+                self.redis.delete(name)
+            except Exception as e:
+                log.warning("redis release failed for %s: %s", name, e)
+
+    def _check(self, rec: dict, fp: str, deadline: float) -> bool:
+        """True when rec is a finished snapshot; raises on misuse or timeout."""
+        if rec["fp"] != fp:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+        if rec["state"] == "done":
+            return True
+        if time.monotonic() > deadline:
+            raise IdempotencyConflict("a request with this Idempotency-Key is still in progress")
+        return False
+
+    # -- sync (app.py) --
+    def run(self, scope: str, key: str, fp: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """(response, replayed): fn() runs at most once per key within ttl."""
+        name = self._rkey(scope, key)
+        with self._lock:
+            flight = self._flights.get(name)
+            leader = flight is None
+            if leader:
+                flight = self._flights[name] = _Flight(fp, threading.Event())
+        if not leader:
+            if flight.fp != fp:
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            idempotency_requests.labels(scope=scope, outcome="coalesced").inc()
+            return flight.result[0], True
+        try:
+            flight.result = self._execute(scope, name, fp, fn)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(name, None)
+            flight.done.set()
+
+    def _execute(self, scope: str, name: str, fp: str, fn) -> tuple[Any, bool]:
+        deadline = time.monotonic() + self.lock_ttl
+        while (rec := self._claim(name, fp)) is not None:
+            if self._check(rec, fp, deadline):
+                idempotency_requests.labels(scope=scope, outcome="replayed").inc()
+                return rec["response"], True
+            time.sleep(self.poll)
+        try:
+            response = fn()
+        except BaseException:
+            self._release(name)
+            raise
+        self._store(name, fp, response)
+        idempotency_requests.labels(scope=scope, outcome="executed").inc()
+        return response, False
+
+    # -- async (app_async.py): Redis round trips go to a worker thread --
+    async def arun(self, scope: str, key: str, fp: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        name = self._rkey(scope, key)
+        flight = self._aflights.get(name)
+        if flight is not None:
+            if flight.fp != fp:
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+            await flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            idempotency_requests.labels(scope=scope, outcome="coalesced").inc()
+            return flight.result[0], True
+        flight = self._aflights[name] = _Flight(fp, asyncio.Event())
+        try:
+            flight.result = await self._aexecute(scope, name, fp, fn)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._aflights.pop(name, None)
+            flight.done.set()
+
+    async def _aexecute(self, scope: str, name: str, fp: str, fn) -> tuple[Any, bool]:
+        deadline = time.monotonic() + self.lock_ttl
+        while (rec := await anyio.to_thread.run_sync(self._claim, name, fp)) is not None:
+            if self._check(rec, fp, deadline):
+                idempotency_requests.labels(scope=scope, outcome="replayed").inc()
+                return rec["response"], True
+            await anyio.sleep(self.poll)
+        try:
+            response = await fn()
+        except BaseException:
+            await anyio.to_thread.run_sync(self._release, name)
+            raise
+        await anyio.to_thread.run_sync(self._store, name, fp, response)
+        idempotency_requests.labels(scope=scope, outcome="executed").inc()
+        return response, False
@@ -0,0 +1,190 @@
+# /home/melynxis/solace/services/registry/instrumentation.py
+"""
+Request and database instrumentation for the registry.
+
+RequestMetrics is a plain ASGI middleware (no BaseHTTPMiddleware, so
+streamed responses are not buffered). Every request is labelled with its
+route template ("/spirits/{spirit_id}", not the raw path) and recorded as:
+  - solace_requests_total{route, method, status}
+  - solace_request_duration_seconds{route, method}
+  - solace_requests_in_progress{route, method}
+The status is the Solace error code's HTTP status when the exception
+handler set one (error envelopes are sent as 200), else the response's.
+
+instrument_engine() hooks a SQLAlchemy engine:
+  - solace_db_statement_seconds{engine, op, table} per cursor execute,
+    and a WARNING log line plus solace_db_slow_statements_total above
+    slow_ms
+  - solace_db_pool_wait_seconds{engine}: time spent waiting for a pooled
+    connection (pool._do_get, the documented Pool override point, is
+    wrapped on the instance), plus solace_db_pool_timeouts_total
+  - solace_db_pool_checked_out / solace_db_pool_capacity{engine}, so
+    saturation is checked_out / capacity
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from starlette.routing import Match
+from typing import Optional
+import re, time, logging
+
+log = logging.getLogger("solace.registry.db")
+
+request_counter = Counter("solace_requests_total", "Total requests", ["route", "method", "status"])
+request_seconds = Histogram(
+    "solace_request_duration_seconds", "Request latency by route template", ["route", "method"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+requests_in_progress = Gauge("solace_requests_in_progress", "Requests being served", ["route", "method"])
+
+db_statement_seconds = Histogram(
+    "solace_db_statement_seconds", "Cursor execute time", ["engine", "op", "table"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+db_slow_statements = Counter("solace_db_slow_statements_total", "Statements over the slow threshold",
+                             ["engine", "op", "table"])
+db_errors = Counter("solace_db_errors_total", "Statements that raised", ["engine", "op", "table"])
+db_pool_wait_seconds = Histogram(
+    "solace_db_pool_wait_seconds", "Time waiting for a pooled connection", ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+db_pool_timeouts = Counter("solace_db_pool_timeouts_total", "Pool checkouts that timed out", ["engine"])
+db_pool_checked_out = Gauge("solace_db_pool_checked_out", "Connections checked out", ["engine"])
+db_pool_capacity = Gauge("solace_db_pool_capacity", "pool_size + max_overflow", ["engine"])
+
+UNMATCHED = "<unmatched>"
+
+# -----------------------------
+# Requests
+# -----------------------------
+class RequestMetrics:
+    def __init__(self, app, untimed: tuple = ("/spirits/stream",)):
+        self.app = app
+        self.untimed = set(untimed)  # long-lived streams: counted, not timed
+        self._static: Optional[dict] = None
+        self._dynamic: list = []
+
+    def _index(self, routes):
+        """Exact-path routes go in a dict; only templated ones are regex-matched."""
+        self._static = {}
+        for route in routes:
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            if "{" in path:
+                self._dynamic.append(route)
+            else:
+                self._static.setdefault(path, []).append(route)
+
+    def route_of(self, scope) -> str:
+        if self._static is None:
+            self._index(scope["app"].router.routes)
+        partial = None
+        for routes in (self._static.get(scope["path"], ()), self._dynamic):
+            for route in routes:
+                match, _ = route.matches(scope)
+                if match is Match.FULL:
+                    return route.path
+                if match is Match.PARTIAL and partial is None:
+                    partial = route.path  # right path, wrong method (405)
+        return partial or UNMATCHED
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route, method = self.route_of(scope), scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        gauge = requests_in_progress.labels(route=route, method=method)
+        gauge.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            gauge.dec()
+            if route not in self.untimed:
+                request_seconds.labels(route=route, method=method).observe(time.perf_counter() - t0)
+            code = scope.get("state", {}).get("solace_status") or status["code"]
+            request_counter.labels(route=route, method=method, status=str(code)).inc()
+
+# -----------------------------
+# Database
+# -----------------------------
+_OP = re.compile(r"^\s*(?:/\*.*?\*/\s*)?(\w+)", re.S)
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.I)
+
+def statement_labels(statement: str) -> tuple[str, str]:
+    """(op, table) from the leading keyword and the first FROM/INTO/UPDATE/JOIN target."""
+    m = _OP.match(statement)
+    op = m.group(1).upper() if m else "OTHER"
+    t = _TABLE.search(statement)
+    return op, (t.group(1) if t else "-")
+
+def instrument_engine(engine, name: str, slow_ms: float = 200.0):
+    """engine: a sync Engine (for AsyncEngine pass .sync_engine)."""
+    slow = slow_ms / 1000.0
+    labels_cache: dict[str, tuple[str, str]] = {}
+
+    def labels(statement: str) -> tuple[str, str]:
+        found = labels_cache.get(statement)
+        if found is None:
+            found = statement_labels(statement)
+            if len(labels_cache) < 4096:  # statements are parameterized, so this set is small
+                labels_cache[statement] = found
+        return found
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("solace_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        dt = time.perf_counter() - conn.info["solace_t0"].pop()
+        op, table = labels(statement)
+        db_statement_seconds.labels(engine=name, op=op, table=table).observe(dt)
+        if dt >= slow:
+            db_slow_statements.labels(engine=name, op=op, table=table).inc()
+            rows = len(parameters) if executemany else 1
+            log.warning("slow %s statement on %s (%.0f ms, %d param set%s): %s", name, table, dt * 1000,
+                        rows, "" if rows == 1 else "s", " ".join(statement.split())[:500])
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        if ctx.connection is not None and ctx.connection.info.get("solace_t0"):
+            ctx.connection.info["solace_t0"].pop()
+        op, table = labels(ctx.statement or "")
+        db_errors.labels(engine=name, op=op, table=table).inc()
+
+    pool = engine.pool
+    checked_out = db_pool_checked_out.labels(engine=name)
+    db_pool_capacity.labels(engine=name).set(pool.size() + max(getattr(pool, "_max_overflow", 0), 0))
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        checked_out.set(pool.checkedout())
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_conn, record):
+        checked_out.set(pool.checkedout())
+
+    do_get = pool._do_get
+    wait = db_pool_wait_seconds.labels(engine=name)
+
+    def timed_do_get():
+        t0 = time.perf_counter()
+        try:
+            return do_get()
+        except PoolTimeout:
+            db_pool_timeouts.labels(engine=name).inc()
+            raise
+        finally:
+            wait.observe(time.perf_counter() - t0)
+
+    pool._do_get = timed_do_get
+    return engine
@@ -0,0 +1,102 @@
+# /home/melynxis/solace/services/registry/loadtest.py
+"""
+Closed-loop load generator for the Solace Registry API.
+
+Drives a fixed number of concurrent clients against one registry instance for
+a fixed duration and reports requests/second plus p50/p95/p99 latency per
+scenario. Used to compare app.py (sync) with app_async.py; see
+docs/registry_async_loadtest.md for the procedure.
+
+    pip install httpx
+    python loadtest.py --base http://127.0.0.1:8081 --concurrency 64 --duration 30
+"""
+
+import argparse, asyncio, random, statistics, time
+
+import httpx
+
+SCENARIOS = ("get", "list", "mixed")
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+async def seed_ids(client: httpx.AsyncClient, want: int) -> list[int]:
+    r = await client.get("/spirits", params={"limit": min(want, 500)})
+    r.raise_for_status()
+    ids = [s["id"] for s in r.json().get("data", [])]
+    if not ids:
+        raise SystemExit("no spirits to read; create some first (POST /spirits:batch)")
+    return ids
+
+async def one_request(client: httpx.AsyncClient, scenario: str, ids: list[int]) -> int:
+    if scenario == "get" or (scenario == "mixed" and random.random() < 0.8):
+        r = await client.get(f"/spirits/{random.choice(ids)}")
+    else:
+        r = await client.get("/spirits", params={"limit": 50})
+    return r.status_code
+
+async def worker(client, scenario, ids, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status = await one_request(client, scenario, ids)
+            if status >= 400:
+                errors.append(status)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - t0)
+
+async def run(base: str, scenario: str, concurrency: int, duration: float, warmup: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30.0) as client:
+        ids = await seed_ids(client, 500)
+        if warmup > 0:
+            await asyncio.gather(*[
+                worker(client, scenario, ids, time.perf_counter() + warmup, [], [])
+                for _ in range(concurrency)
+            ])
+        latencies: list[float] = []
+        errors: list = []
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            worker(client, scenario, ids, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": (statistics.fmean(latencies) * 1000) if latencies else 0.0,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", default="http://127.0.0.1:8081")
+    ap.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--warmup", type=float, default=5.0)
+    args = ap.parse_args()
+
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    print(f"target={args.base}")
+    print(f"{'scenario':<8} {'conc':>5} {'reqs':>8} {'err':>5} {'rps':>9} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}")
+    for scenario in scenarios:
+        for conc in args.concurrency:
+            r = asyncio.run(run(args.base, scenario, conc, args.duration, args.warmup))
+            print(f"{r['scenario']:<8} {r['concurrency']:>5} {r['requests']:>8} {r['errors']:>5} "
+                  f"{r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# /home/melynxis/solace/services/registry/memory_search.py
+"""
+Semantic search over the Weaviate `Memory` class (chunks written by the
+wiki ingest), served as GET /v1/memory/search.
+
+Three stages, each timed in memory_search_stage_seconds{stage}:
+  embed   the query through the same embedder spec the ingest used
+          (EMBEDDER, services/ingest/embedding.py), memoised in an LRU so a
+          repeated query never reloads or re-runs the model
+  search  one GraphQL Get.Memory call: nearVector, or hybrid (BM25 over the
+          chunk text fused with the query vector, weighted by alpha)
+  rerank  optional cross-encoder (MEMORY_RERANKER=ce:<model>), then at most
+          `per_page` chunks per page so overlapping neighbours of one
+          article do not crowd out the rest, cut to k
+
+Whole Weaviate responses sit in a short-TTL result cache (shared through
+Redis when REGISTRY_CACHE_REDIS=1), so a conversation re-asking the same
+thing costs a dict lookup.
+
+When Weaviate fails and MEMORY_LOCAL_INDEX points at the local vector index
+the ingest writes alongside it (services/ingest/vector_index.py), the
+search stage runs there instead (vector only, exact or IVF with
+MEMORY_LOCAL_NPROBE) and Weaviate is left alone for MEMORY_WEAVIATE_RETRY
+seconds, so a dead container costs one timeout, not one per query.
+Those degraded answers are never put in the result cache: they would be
+served under the Weaviate key for the whole TTL after it recovers.
+
+embedding and vector_index are imported from services/ingest, which the
+service entrypoint (dev.sh) puts on PYTHONPATH.
+"""
+
+from prometheus_client import Counter, Histogram
+from typing import Optional
+import json, logging, os, re, threading, time
+
+import requests
+
+from cache import ReadThroughCache, is_miss
+
+log = logging.getLogger("solace.registry.memory")
+
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080").rstrip("/")
+WEAVIATE_APIKEY = os.getenv("WEAVIATE_APIKEY") or None
+MEMORY_CLASS = os.getenv("MEMORY_CLASS", "Memory")
+MEMORY_RERANKER = os.getenv("MEMORY_RERANKER", "")
+MEMORY_SEARCH_TIMEOUT = float(os.getenv("MEMORY_SEARCH_TIMEOUT", "5"))
+MEMORY_SEARCH_OVERSAMPLE = int(os.getenv("MEMORY_SEARCH_OVERSAMPLE", "3"))
+MEMORY_QUERY_CACHE_SIZE = int(os.getenv("MEMORY_QUERY_CACHE_SIZE", "4096"))
+MEMORY_RESULT_CACHE_SIZE = int(os.getenv("MEMORY_RESULT_CACHE_SIZE", "2048"))
+MEMORY_RESULT_CACHE_TTL = float(os.getenv("MEMORY_RESULT_CACHE_TTL", "30"))
+MEMORY_LOCAL_INDEX = os.getenv("MEMORY_LOCAL_INDEX", "")
+MEMORY_LOCAL_NPROBE = int(os.getenv("MEMORY_LOCAL_NPROBE", "0"))  # 0 = exact scan
+MEMORY_WEAVIATE_RETRY = float(os.getenv("MEMORY_WEAVIATE_RETRY", "10"))
+
+MAX_CANDIDATES = 100
+
+stage_seconds = Histogram(
+    "memory_search_stage_seconds", "Memory search latency per stage", ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+searches_total = Counter("memory_search_requests_total", "Memory searches", ["mode", "backend"])  # backend: cache|weaviate|local
+search_errors = Counter("memory_search_errors_total", "Failed Weaviate searches", ["mode"])
+
+class SearchUnavailable(RuntimeError):
+    """Weaviate (or the embedder) could not answer."""
+
+def normalize_query(q: str) -> str:
+    return re.sub(r"\s+", " ", q).strip()
+
+def _graphql_fields(mode: str) -> str:
+    ranking = "score" if mode == "hybrid" else "distance"
+    return f"title text metadata {{ source pageid revid chunk chunks }} _additional {{ id {ranking} }}"
+
+def _hit(obj: dict) -> dict:
+    extra = obj.get("_additional") or {}
+    if extra.get("distance") is not None:
+        score = 1.0 - float(extra["distance"])  # cosine distance -> similarity
+    else:
+        score = float(extra.get("score") or 0.0)  # hybrid: fused score, sent as a string
+    return _as_hit(extra.get("id"), obj, score)
+
+def _as_hit(oid: Optional[str], obj: dict, score: float) -> dict:
+    meta = obj.get("metadata") or {}
+    return {
+        "id": oid,
+        "title": obj.get("title"),
+        "text": obj.get("text"),
+        "score": round(score, 6),
+        "source": meta.get("source"),
+        "pageid": meta.get("pageid"),
+        "revid": meta.get("revid"),
+        "chunk": meta.get("chunk"),
+        "chunks": meta.get("chunks"),
+    }
+
+class MemorySearch:
+    def __init__(self, weaviate_url: str = WEAVIATE_URL, apikey: Optional[str] = WEAVIATE_APIKEY,
+                 embedder_spec: Optional[str] = None, reranker: str = MEMORY_RERANKER,
+                 result_redis=None, local_index: str = MEMORY_LOCAL_INDEX, nprobe: int = MEMORY_LOCAL_NPROBE):
+        self.url = weaviate_url.rstrip("/")
+        self.embedder_spec = embedder_spec
+        self.reranker_spec = reranker
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+        if apikey:
+            self.session.headers["Authorization"] = f"Bearer {apikey}"
+        self.query_vectors = ReadThroughCache("memory_query_vector", MEMORY_QUERY_CACHE_SIZE, float("inf"))
+        self.results = ReadThroughCache("memory_search", MEMORY_RESULT_CACHE_SIZE, MEMORY_RESULT_CACHE_TTL,
+                                        result_redis, max(1, int(MEMORY_RESULT_CACHE_TTL)))
+        self.local_index_dir = local_index
+        self.nprobe = nprobe
+        self._embedder = None
+        self._reranker = None
+        self._index = None
+        self._weaviate_down_until = 0.0
+        self._lock = threading.Lock()
+
+    # -- lazily built: loading a model must not slow registry startup --
+    def embedder(self):
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    import embedding  # services/ingest, so queries and chunks are embedded alike
+                    self._embedder = embedding.make_embedder(self.embedder_spec or embedding.EMBEDDER)
+                    log.info("memory search embedder: %s (dim %d)", self._embedder.name, self._embedder.dim)
+        return self._embedder
+
+    def local_index(self):
+        if self._index is None and self.local_index_dir and os.path.exists(self.local_index_dir):
+            with self._lock:
+                if self._index is None:
+                    from vector_index import LocalVectorIndex
+                    self._index = LocalVectorIndex(self.local_index_dir)
+        return self._index
+
+    def reranker(self):
+        if self._reranker is None and self.reranker_spec:
+            with self._lock:
+                if self._reranker is None:
+                    kind, _, model = self.reranker_spec.partition(":")
+                    if kind != "ce":
+                        raise ValueError(f"unknown reranker {self.reranker_spec!r} (ce:<model>)")
+                    from sentence_transformers import CrossEncoder
+                    self._reranker = CrossEncoder(model, device="cpu")
+        return self._reranker
+
+    # -- stages --
+    def embed(self, query: str) -> list[float]:
+        t0 = time.perf_counter()
+        try:
+            vec = self.query_vectors.get_or_load(query, lambda: self.embedder().embed([query])[0].tolist())
+        except (ImportError, RuntimeError, ValueError, requests.RequestException) as e:
+            raise SearchUnavailable(f"embedder: {e}") from e
+        finally:
+            stage_seconds.labels(stage="embed").observe(time.perf_counter() - t0)
+        return vec
+
+    def _graphql(self, query: str, vector: list[float], mode: str, alpha: float, limit: int) -> list[dict]:
+        vec = ",".join(f"{x:.7g}" for x in vector)
+        if mode == "hybrid":
+            # json.dumps yields a valid GraphQL string literal
+            args = f"hybrid: {{query: {json.dumps(query)}, vector: [{vec}], alpha: {alpha}}}"
+        else:
+            args = f"nearVector: {{vector: [{vec}]}}"
+        gql = f"{{ Get {{ {MEMORY_CLASS}({args}, limit: {limit}) {{ {_graphql_fields(mode)} }} }} }}"
+        t0 = time.perf_counter()
+        try:
+            r = self.session.post(f"{self.url}/v1/graphql", json={"query": gql}, timeout=MEMORY_SEARCH_TIMEOUT)
+            r.raise_for_status()
+            body = r.json()
+        except (requests.RequestException, ValueError) as e:
+            search_errors.labels(mode=mode).inc()
+            raise SearchUnavailable(f"weaviate: {e}") from e
+        finally:
+            stage_seconds.labels(stage="search").observe(time.perf_counter() - t0)
+        if body.get("errors"):
+            search_errors.labels(mode=mode).inc()
+            raise SearchUnavailable(f"weaviate: {body['errors'][0].get('message')}")
+        return [_hit(o) for o in ((body.get("data") or {}).get("Get") or {}).get(MEMORY_CLASS) or []]
+
+    def _local(self, index, vector: list[float], limit: int) -> list[dict]:
+        t0 = time.perf_counter()
+        try:
+            hits = []
+            for score, row in index.search(vector, limit, nprobe=self.nprobe):
+                doc = index.doc(row)
+                hits.append(_as_hit(doc.pop("id"), doc, score))
+            return hits
+        finally:
+            stage_seconds.labels(stage="search").observe(time.perf_counter() - t0)
+
+    def _search(self, query: str, vector: list[float], mode: str, alpha: float, limit: int) -> tuple[list[dict], str]:
+        index = self.local_index()
+        if index is not None and time.monotonic() < self._weaviate_down_until:
+            return self._local(index, vector, limit), "local"
+        try:
+            return self._graphql(query, vector, mode, alpha, limit), "weaviate"
+        except SearchUnavailable as e:
+            if index is None:
+                raise
+            log.warning("weaviate search failed, using the local index for %.0fs: %s", MEMORY_WEAVIATE_RETRY, e)
+            self._weaviate_down_until = time.monotonic() + MEMORY_WEAVIATE_RETRY
+            return self._local(index, vector, limit), "local"
+
+    def rerank(self, query: str, hits: list[dict], k: int, per_page: int) -> list[dict]:
+        t0 = time.perf_counter()
+        try:
+            ce = self.reranker()
+        except (ImportError, ValueError) as e:
+            raise SearchUnavailable(f"reranker: {e}") from e
+        if ce is not None and hits:
+            scores = ce.predict([(query, h["text"] or "") for h in hits])
+            for h, s in zip(hits, scores):
+                h["score"] = round(float(s), 6)
+            hits = sorted(hits, key=lambda h: h["score"], reverse=True)
+        out, per = [], {}
+        for h in hits:
+            page = h["pageid"] if h["pageid"] is not None else h["title"]
+            if per.get(page, 0) >= per_page:
+                continue
+            per[page] = per.get(page, 0) + 1
+            out.append(h)
+            if len(out) == k:
+                break
+        stage_seconds.labels(stage="rerank").observe(time.perf_counter() - t0)
+        return out
+
+    def search(self, q: str, k: int = 8, mode: str = "hybrid", alpha: float = 0.75,
+               per_page: int = 2) -> tuple[list[dict], dict]:
+        """(hits, meta); meta says whether the result cache answered and the stage timings."""
+        query = normalize_query(q)
+        key = f"{mode}|{alpha}|{k}|{per_page}|{query}"
+        cached = self.results.get(key)
+        if not is_miss(cached):
+            searches_total.labels(mode=mode, backend="cache").inc()
+            return cached, {"cached": True}
+        self.results.record_miss()
+        timings = {}
+        t = time.perf_counter()
+        vector = self.embed(query)
+        timings["embed_ms"] = round((time.perf_counter() - t) * 1000, 3)
+        t = time.perf_counter()
+        limit = min(MAX_CANDIDATES, k * max(1, MEMORY_SEARCH_OVERSAMPLE))
+        hits, backend = self._search(query, vector, mode, alpha, limit)
+        timings["search_ms"] = round((time.perf_counter() - t) * 1000, 3)
+        t = time.perf_counter()
+        hits = self.rerank(query, hits, k, per_page)
+        timings["rerank_ms"] = round((time.perf_counter() - t) * 1000, 3)
+        if backend == "weaviate":
+            self.results.set(key, hits)
+        searches_total.labels(mode=mode, backend=backend).inc()
+        return hits, {"cached": False, "backend": backend, **timings}
@@ -0,0 +1,263 @@
+# /home/melynxis/solace/services/registry/rbac.py
+"""
+Policy-driven RBAC for the registry (docs/ghostpaw_user_roles.md).
+
+A policy is roles (with inheritance), rules (role, action, resource, effect)
+and subject -> role assignments. compile_policy() flattens inheritance and
+turns the rules of each role into dict lookups:
+  - resource "spirit:1" matches exactly
+  - resource "spirit:*" matches every resource starting with "spirit:",
+    and "spirit" itself; "*" matches everything
+  - action "*" matches every action
+A check is one exact lookup plus one lookup per distinct prefix length, per
+role. Any matching deny wins over allows; nothing matching is a deny.
+
+Subjects get their assigned roles only; a subject without an assignment
+gets `default_role`, whatever its name (the subject "owner" is not the
+owner role). Decisions are kept in an LRU keyed by policy version, so a new
+policy never serves an old decision; the cache is also cleared on every swap.
+
+The policy is loaded from MySQL (tools/registry_db_migrate_v7_rbac.sh) when
+enabled; a refresher thread polls rbac_policy.version, which triggers bump
+on every change to the rbac tables. Otherwise DEFAULT_POLICY is used.
+"""
+
+from prometheus_client import Counter, Gauge
+from typing import Callable, Iterable, NamedTuple, Optional
+import logging, threading
+
+from cache import LRUTTLCache, is_miss
+
+log = logging.getLogger("solace.registry.rbac")
+
+rbac_decisions = Counter("registry_rbac_decisions_total", "RBAC decisions", ["allowed", "cached"])
+rbac_reloads = Counter("registry_rbac_reloads_total", "RBAC policy loads", ["outcome"])
+rbac_policy_version = Gauge("registry_rbac_policy_version", "Version of the RBAC policy in use")
+
+# Seeded by tools/registry_db_migrate_v7_rbac.sh (keep both in sync).
+DEFAULT_POLICY = {
+    "version": 0,
+    "roles": [
+        {"name": "reader", "inherits": [], "description": "Guest: read-only public spirits, curated memory, registry"},
+        {"name": "user", "inherits": ["reader"], "description": "Contributor: draft spirits, submit memory"},
+        {"name": "maintainer", "inherits": ["user"], "description": "Sub-admin: edit and archive, restart spirits"},
+        {"name": "admin", "inherits": ["maintainer"], "description": "Everything but hard deletes"},
+        {"name": "owner", "inherits": ["admin"], "description": "Full control"},
+    ],
+    "rules": [
+        {"role": "reader", "action": "view", "resource": "spirit:public:*", "effect": "allow"},
+        {"role": "reader", "action": "view", "resource": "memory:curated:*", "effect": "allow"},
+        {"role": "reader", "action": "view", "resource": "registry:*", "effect": "allow"},
+        {"role": "reader", "action": "view", "resource": "health:*", "effect": "allow"},
+        {"role": "user", "action": "view", "resource": "spirit:*", "effect": "allow"},
+        {"role": "user", "action": "view", "resource": "memory:*", "effect": "allow"},
+        {"role": "user", "action": "view", "resource": "metrics:*", "effect": "allow"},
+        {"role": "user", "action": "create", "resource": "spirit:*", "effect": "allow"},
+        {"role": "user", "action": "create", "resource": "memory:*", "effect": "allow"},
+        {"role": "user", "action": "create", "resource": "registry:pending:*", "effect": "allow"},
+        {"role": "maintainer", "action": "update", "resource": "spirit:*", "effect": "allow"},
+        {"role": "maintainer", "action": "update", "resource": "memory:*", "effect": "allow"},
+        {"role": "maintainer", "action": "archive", "resource": "spirit:*", "effect": "allow"},
+        {"role": "maintainer", "action": "archive", "resource": "memory:*", "effect": "allow"},
+        {"role": "maintainer", "action": "restart", "resource": "spirit:*", "effect": "allow"},
+        {"role": "maintainer", "action": "create", "resource": "registry:*", "effect": "allow"},
+        {"role": "maintainer", "action": "update", "resource": "registry:*", "effect": "allow"},
+        {"role": "maintainer", "action": "view", "resource": "logs:*", "effect": "allow"},
+        {"role": "maintainer", "action": "assign", "resource": "role:user", "effect": "allow"},
+        {"role": "admin", "action": "view", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "create", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "update", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "archive", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "restart", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "assign", "resource": "*", "effect": "allow"},
+        {"role": "admin", "action": "configure", "resource": "*", "effect": "allow"},
+        {"role": "owner", "action": "*", "resource": "*", "effect": "allow"},
+    ],
+    "assignments": [],
+}
+
+class PolicyError(ValueError):
+    pass
+
+class Decision(NamedTuple):
+    allowed: bool
+    role: Optional[str]  # role whose rule decided it; None when nothing matched
+
+# -----------------------------
+# Compiled policy
+# -----------------------------
+class _RoleTable:
+    """Rules of one role (inherited ones included) as dict lookups; True = allow, False = deny."""
+    __slots__ = ("exact", "prefix", "lengths")
+
+    def __init__(self, rules: Iterable[dict]):
+        self.exact: dict[tuple[str, str], bool] = {}
+        self.prefix: dict[tuple[str, str], bool] = {}
+        for r in rules:
+            allow = r.get("effect", "allow") == "allow"
+            action, resource = r["action"], r["resource"]
+            if resource.endswith("*"):
+                self._put(self.prefix, (action, resource[:-1]), allow)
+                if resource.endswith(":*"):
+                    self._put(self.exact, (action, resource[:-2]), allow)
+            else:
+                self._put(self.exact, (action, resource), allow)
+        self.lengths = tuple(sorted({len(p) for _, p in self.prefix}))
+
+    @staticmethod
+    def _put(table: dict, key: tuple, allow: bool):
+        table[key] = table.get(key, True) and allow  # deny wins within a role
+
+    def match(self, action: str, resource: str) -> Optional[bool]:
+        found = None
+        for act in (action, "*"):
+            hit = self.exact.get((act, resource))
+            if hit is False:
+                return False
+            found = found or hit
+            for n in self.lengths:
+                if n <= len(resource):
+                    hit = self.prefix.get((act, resource[:n]))
+                    if hit is False:
+                        return False
+                    found = found or hit
+        return found
+
+class CompiledPolicy:
+    def __init__(self, version, roles: dict[str, _RoleTable], role_info: list[dict],
+                 assignments: dict[str, tuple[str, ...]], default_role: Optional[str]):
+        self.version = version
+        self.roles = roles
+        self.role_info = role_info
+        self.assignments = assignments
+        self.default_roles = (default_role,) if default_role in roles else ()
+
+    def roles_of(self, subject: str) -> tuple[str, ...]:
+        return self.assignments.get(subject, self.default_roles)
+
+    def decide(self, subject: str, action: str, resource: str) -> Decision:
+        granted = None
+        for role in self.roles_of(subject):
+            hit = self.roles[role].match(action, resource)
+            if hit is False:
+                return Decision(False, role)
+            if hit and granted is None:
+                granted = role
+        return Decision(granted is not None, granted)
+
+def _flatten(roles: dict[str, list[str]]) -> dict[str, list[str]]:
+    """role -> itself plus every role it inherits from, transitively."""
+    out: dict[str, list[str]] = {}
+
+    def visit(name: str, path: tuple):
+        if name in out:
+            return out[name]
+        if name in path:
+            raise PolicyError(f"role inheritance cycle: {' -> '.join(path + (name,))}")
+        if name not in roles:
+            raise PolicyError(f"unknown role {name!r} in {path[-1]!r} inherits")
+        seen = [name]
+        for parent in roles[name]:
+            seen += [r for r in visit(parent, path + (name,)) if r not in seen]
+        out[name] = seen
+        return seen
+
+    for name in roles:
+        visit(name, ())
+    return out
+
+def compile_policy(policy: dict, default_role: Optional[str] = None) -> CompiledPolicy:
+    """policy: {"version", "roles": [{name, inherits}], "rules": [...], "assignments": [{subject, role}]}."""
+    roles = {r["name"]: list(r.get("inherits") or []) for r in policy["roles"]}
+    rules_by_role: dict[str, list[dict]] = {name: [] for name in roles}
+    for rule in policy["rules"]:
+        if rule["role"] not in roles:
+            raise PolicyError(f"rule for unknown role {rule['role']!r}")
+        if rule.get("effect", "allow") not in ("allow", "deny"):
+            raise PolicyError(f"rule effect must be allow or deny, got {rule['effect']!r}")
+        rules_by_role[rule["role"]].append(rule)
+    tables = {name: _RoleTable(r for role in chain for r in rules_by_role[role])
+              for name, chain in _flatten(roles).items()}
+    assignments: dict[str, tuple[str, ...]] = {}
+    for a in policy.get("assignments", []):
+        if a["role"] in roles:
+            assignments[a["subject"]] = assignments.get(a["subject"], ()) + (a["role"],)
+        else:
+            log.warning("ignoring assignment of %s to unknown role %s", a["subject"], a["role"])
+    info = [{"name": r["name"], "inherits": roles[r["name"]], "description": r.get("description")}
+            for r in policy["roles"]]
+    return CompiledPolicy(policy.get("version"), tables, info, assignments, default_role)
+
+# -----------------------------
+# Engine
+# -----------------------------
+class RBAC:
+    def __init__(self, default_role: Optional[str] = "user", cache_size: int = 50000):
+        self.default_role = default_role
+        self.cache = LRUTTLCache("rbac", cache_size, float("inf"))
+        self.policy = compile_policy(DEFAULT_POLICY, default_role)
+        # labels() costs more than a decision; bind the four series once
+        self._counted = {(allowed, cached): rbac_decisions.labels(allowed=str(allowed).lower(), cached=cached)
+                         for allowed in (True, False) for cached in ("true", "false")}
+        rbac_policy_version.set(0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self, subject: str, action: str, resource: str,
+              policy: Optional[CompiledPolicy] = None) -> Decision:
+        policy = policy or self.policy
+        key = (policy.version, subject, action, resource)
+        decision = self.cache.get(key)
+        if not is_miss(decision):
+            self._counted[decision.allowed, "true"].inc()
+            return decision
+        decision = policy.decide(subject, action, resource)
+        self.cache.set(key, decision)
+        self._counted[decision.allowed, "false"].inc()
+        return decision
+
+    def check_many(self, checks: Iterable[tuple[str, str, str]],
+                   policy: Optional[CompiledPolicy] = None) -> list[Decision]:
+        """Every check against the same policy, even if a reload lands mid-batch."""
+        policy = policy or self.policy
+        return [self.check(subject, action, resource, policy) for subject, action, resource in checks]
+
+    def swap(self, policy: dict):
+        """Compile and install a policy; raises PolicyError and keeps the current one if it is invalid."""
+        compiled = compile_policy(policy, self.default_role)
+        self.policy = compiled
+        self.cache.clear()
+        rbac_policy_version.set(compiled.version or 0)
+        log.info("RBAC policy version %s: %d roles, %d rules, %d assignments", compiled.version,
+                 len(compiled.roles), len(policy["rules"]), len(compiled.assignments))
+
+    def refresh(self, version_fn: Callable[[], Optional[int]], load_fn: Callable[[], dict]):
+        """Reload when the stored version differs from the one in use."""
+        try:
+            version = version_fn()
+            if version is None or version == self.policy.version:
+                return
+            self.swap(load_fn())
+            rbac_reloads.labels(outcome="ok").inc()
+        except Exception as e:  # keep serving the last good policy
+            rbac_reloads.labels(outcome="error").inc()
+            log.warning("RBAC policy reload failed: %s", e)
+
+    def start(self, version_fn: Callable[[], Optional[int]], load_fn: Callable[[], dict], interval: float = 5.0):
+        if self._thread is not None:
+            return
+        self.refresh(version_fn, load_fn)
+
+        def run():
+            while not self._stop.wait(interval):
+                self.refresh(version_fn, load_fn)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="rbac-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
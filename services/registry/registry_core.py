@@ -0,0 +1,1083 @@
+# /home/melynxis/solace/services/registry/registry_core.py
+"""
+Config, metrics and DB helpers shared by app.py and app_async.py.
+
+Importing this module has no side effects beyond reading the environment and
+registering metrics: no engine, Redis client, cache or FastAPI app is built.
+Each app builds those itself (RegistryServices for the shared pieces) and
+passes a connection into the helpers here.
+"""
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import Counter, Histogram
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Literal
+import os, re, json, uuid, base64, random, hashlib, logging, datetime
+
+from cache import ReadThroughCache, start_invalidation_listener
+from changefeed import ChangeFeed, spirit_change
+from fastjson import SolaceJSONResponse, encode_row, dumps, plain
+from idempotency import Idempotency
+from memory_search import MemorySearch
+from rbac import RBAC
+
+try:
+    import redis
+    import redis.asyncio as aredis
+except ImportError:  # optional: only needed for the shared Redis tiers
+    redis = aredis = None
+
+log = logging.getLogger("solace.registry")
+
+# -----------------------------
+# Config (env with sane defaults)
+# -----------------------------
+MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
+MYSQL_DB   = os.getenv("MYSQL_DB", "solace")
+MYSQL_USER = os.getenv("MYSQL_USER", "solace_app")
+MYSQL_PW   = os.getenv("MYSQL_PASSWORD", "solace_app_pwd")
+REGISTRY_PORT = int(os.getenv("REGISTRY_PORT", "8081"))
+
+DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PW}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+
+REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_PW   = os.getenv("REDIS_PASSWORD") or None
+
+EXPORT_CHUNK_ROWS = int(os.getenv("REGISTRY_EXPORT_CHUNK_ROWS", "1000"))
+
+REGISTRY_CACHE_SIZE = int(os.getenv("REGISTRY_CACHE_SIZE", "10000"))
+REGISTRY_CACHE_TTL = float(os.getenv("REGISTRY_CACHE_TTL", "5"))
+REGISTRY_CACHE_REDIS = os.getenv("REGISTRY_CACHE_REDIS", "0") == "1"
+REGISTRY_CACHE_REDIS_TTL = int(os.getenv("REGISTRY_CACHE_REDIS_TTL", "30"))
+
+# Change feed: Redis is required once there is more than one worker.
+REGISTRY_FEED_REDIS = os.getenv("REGISTRY_FEED_REDIS", "0") == "1"
+REGISTRY_FEED_MAXLEN = int(os.getenv("REGISTRY_FEED_MAXLEN", "10000"))
+REGISTRY_FEED_QUEUE = int(os.getenv("REGISTRY_FEED_QUEUE", "1000"))
+
+# Spirit name search: enable once tools/registry_db_migrate_v4_spirit_search.sh
+# has added the ngram FULLTEXT indexes; until then q/search fall back to LIKE.
+REGISTRY_SPIRIT_FULLTEXT = os.getenv("REGISTRY_SPIRIT_FULLTEXT", "0") == "1"
+SPIRIT_SEARCH_CANDIDATES = int(os.getenv("REGISTRY_SPIRIT_SEARCH_CANDIDATES", "1000"))
+
+# JSON paths promoted to indexed generated columns by
+# tools/registry_db_migrate_v5_json_paths.sh (keep both lists in sync);
+# only these can be filtered on with ?meta.<path>= / ?config.<path>=.
+SPIRIT_META_PATHS = [p for p in os.getenv("REGISTRY_SPIRIT_META_PATHS", "host,owner,node").split(",") if p]
+REGISTRY_CONFIG_PATHS = [p for p in os.getenv("REGISTRY_CONFIG_PATHS", "host,api_url").split(",") if p]
+
+# Incremental spirit counters (tools/registry_db_migrate_v6_spirit_counters.sh);
+# until enabled, GET /spirits/stats falls back to a GROUP BY.
+REGISTRY_SPIRIT_COUNTERS = os.getenv("REGISTRY_SPIRIT_COUNTERS", "0") == "1"
+
+# Idempotency-Key snapshots for spirit creation. Without Redis they are kept
+# per process, which is only correct for a single worker.
+REGISTRY_IDEMPOTENCY_REDIS = os.getenv("REGISTRY_IDEMPOTENCY_REDIS", "0") == "1"
+REGISTRY_IDEMPOTENCY_TTL = int(os.getenv("REGISTRY_IDEMPOTENCY_TTL", "86400"))
+REGISTRY_IDEMPOTENCY_LOCK_TTL = int(os.getenv("REGISTRY_IDEMPOTENCY_LOCK_TTL", "30"))
+
+# Statements slower than this are logged (logger solace.registry.db) and
+# counted in solace_db_slow_statements_total.
+REGISTRY_SLOW_QUERY_MS = float(os.getenv("REGISTRY_SLOW_QUERY_MS", "200"))
+
+# RBAC policy from the rbac_* tables (tools/registry_db_migrate_v7_rbac.sh),
+# re-read whenever rbac_policy.version moves; until enabled the built-in
+# rbac.DEFAULT_POLICY is used. Subjects with no assignment get the default role.
+REGISTRY_RBAC_DB = os.getenv("REGISTRY_RBAC_DB", "0") == "1"
+REGISTRY_RBAC_REFRESH = float(os.getenv("REGISTRY_RBAC_REFRESH", "5"))
+REGISTRY_RBAC_DEFAULT_ROLE = os.getenv("REGISTRY_RBAC_DEFAULT_ROLE", "user") or None
+REGISTRY_RBAC_CACHE_SIZE = int(os.getenv("REGISTRY_RBAC_CACHE_SIZE", "50000"))
+
+# -----------------------------
+# Redis + read-through caches, change feed, search, idempotency, RBAC
+# -----------------------------
+class RegistryServices:
+    """The per-process pieces both apps share; built by the app module, not on import."""
+
+    def __init__(self):
+        self.redis = (
+            redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PW,
+                        socket_timeout=0.25, socket_connect_timeout=0.25)
+            if redis is not None else None
+        )
+        self.cache_redis = self.redis if REGISTRY_CACHE_REDIS else None
+        self.spirit_cache = ReadThroughCache("spirit", REGISTRY_CACHE_SIZE, REGISTRY_CACHE_TTL,
+                                             self.cache_redis, REGISTRY_CACHE_REDIS_TTL)
+        self.registry_cache = ReadThroughCache("registry", REGISTRY_CACHE_SIZE, REGISTRY_CACHE_TTL,
+                                               self.cache_redis, REGISTRY_CACHE_REDIS_TTL)
+        feed_redis = self.redis if REGISTRY_FEED_REDIS else None
+        self.change_feed = ChangeFeed(feed_redis, _feed_pubsub_client if feed_redis is not None else None,
+                                      maxlen=REGISTRY_FEED_MAXLEN, queue_size=REGISTRY_FEED_QUEUE)
+        self.memory_search = MemorySearch(result_redis=self.cache_redis)
+        self.idempotency = Idempotency(self.redis if REGISTRY_IDEMPOTENCY_REDIS else None,
+                                       REGISTRY_IDEMPOTENCY_TTL, REGISTRY_IDEMPOTENCY_LOCK_TTL)
+        self.rbac = RBAC(REGISTRY_RBAC_DEFAULT_ROLE, REGISTRY_RBAC_CACHE_SIZE)
+
+    def start_cache_listener(self):
+        if self.cache_redis is not None:
+            start_invalidation_listener(self.cache_redis, [self.spirit_cache, self.registry_cache])
+
+def _feed_pubsub_client():
+    # No socket_timeout: the subscriber blocks until the next event.
+    return aredis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PW)
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+spirit_creations_total = Counter(
+    "spirit_creations_total", "Number of spirit creation requests", ["role"]
+)
+spirit_creation_seconds = Histogram(
+    "spirit_creation_duration_seconds", "Time to create a spirit"
+)
+spirit_batch_seconds = Histogram(
+    "spirit_batch_duration_seconds", "Time to apply a spirit batch", ["op"]
+)
+export_rows_total = Counter(
+    "registry_export_rows_total", "Rows streamed by NDJSON export endpoints", ["table"]
+)
+spirit_batch_items = Histogram(
+    "spirit_batch_items", "Items per spirit batch request", ["op"],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500),
+)
+
+# -----------------------------
+# Helpers
+# -----------------------------
+State = Literal["pending", "created", "ready", "error"]
+
+ALLOWED_TRANSITIONS: dict[State, set[State]] = {
+    "pending": {"created", "error"},
+    "created": {"ready", "error"},
+    "ready": {"error"},
+    "error": {"pending", "created"},
+}
+
+def _json_or_none(obj: Optional[dict]) -> Optional[str]:
+    return json.dumps(obj) if obj is not None else None
+
+SPIRIT_JSON_COLS = ("meta",)
+REGISTRY_JSON_COLS = ("config",)
+
+def get_request_id(request: Request) -> str:
+    req_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+    return req_id
+
+IDEMPOTENCY_KEY_MAX = 255
+
+def idempotency_key(request: Request) -> Optional[str]:
+    key = request.headers.get("idempotency-key")
+    if key is not None and not 0 < len(key) <= IDEMPOTENCY_KEY_MAX:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1..{IDEMPOTENCY_KEY_MAX} characters")
+    return key
+
+def replayed_response(data, request_id: str, replayed: bool):
+    if not replayed:
+        return solace_response(True, data=data, request_id=request_id)
+    return solace_response(True, data=data, request_id=request_id,
+                           meta={"idempotentReplay": True}, headers={"Idempotent-Replayed": "true"})
+
+def solace_response(ok, data=None, error=None, request_id=None, meta=None, headers=None):
+    resp = {"ok": ok}
+    if ok and data is not None:
+        resp["data"] = data
+    if not ok and error is not None:
+        resp["error"] = error
+    resp["meta"] = {"requestId": request_id or str(uuid.uuid4())}
+    if meta:
+        resp["meta"].update(meta)
+    return SolaceJSONResponse(resp, headers=headers)
+
+def parse_sort(sort: str, field_map: dict, default: str = "updated_at") -> tuple[str, str]:
+    f, d = (sort.split(":", 1) + [""])[:2]
+    order_field = field_map.get(f, default)
+    order_dir = "DESC" if d.lower() != "asc" else "ASC"
+    return order_field, order_dir
+
+# -----------------------------
+# Keyset (cursor) pagination
+# -----------------------------
+def _cursor_value(v):
+    if isinstance(v, datetime.datetime):
+        return v.isoformat(sep=" ")
+    if isinstance(v, datetime.date):
+        return v.isoformat()
+    return v
+
+def encode_cursor(order_field: str, order_dir: str, row: dict) -> str:
+    """Opaque cursor: sort field/dir plus the last row's sort value and id."""
+    payload = {"f": order_field, "d": order_dir, "v": _cursor_value(row[order_field]), "id": row["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_field: str, order_dir: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or not {"f", "d", "v", "id"} <= payload.keys():
+            raise ValueError("incomplete cursor")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="invalid cursor") from e
+    if payload["f"] != order_field or payload["d"] != order_dir:
+        raise HTTPException(status_code=400, detail="cursor does not match sort")
+    return payload
+
+def keyset_where(order_field: str, order_dir: str, cursor: dict, params: dict) -> str:
+    """
+    Seek predicate for ORDER BY <field> <dir>, id <dir>. Written as an expanded
+    OR rather than a row constructor so MySQL can range-scan the composite index.
+    """
+    op = "<" if order_dir == "DESC" else ">"
+    params["cur_v"] = cursor["v"]
+    params["cur_id"] = cursor["id"]
+    if order_field == "id":
+        return f"id {op} :cur_id"
+    return f"({order_field} {op} :cur_v OR ({order_field} = :cur_v AND id {op} :cur_id))"
+
+def order_by_sql(order_field: str, order_dir: str) -> str:
+    if order_field == "id":
+        return f"ORDER BY id {order_dir}"
+    return f"ORDER BY {order_field} {order_dir}, id {order_dir}"
+
+def next_cursor_meta(rows, limit: int, order_field: str, order_dir: str) -> dict:
+    """Only hand out a cursor when the page came back full."""
+    if len(rows) < limit:
+        return {"nextCursor": None}
+    return {"nextCursor": encode_cursor(order_field, order_dir, rows[-1])}
+
+# -----------------------------
+# Promoted JSON path filters
+# -----------------------------
+_JSON_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+def json_path_column(prefix: str, path: str) -> str:
+    """Generated column for a promoted path: meta.host -> meta_host, config.a.b -> config_a_b."""
+    return f"{prefix}_{path.replace('.', '_')}"
+
+def json_filters(request: Request, prefix: str, promoted: list[str]) -> list[tuple[str, list[str]]]:
+    """
+    (column, values) for every ?<prefix>.<path>=value parameter; repeating a
+    parameter ORs its values. Paths that are not promoted would scan the
+    table, so they are refused.
+    """
+    filters = {}
+    for key, value in request.query_params.multi_items():
+        if not key.startswith(prefix + "."):
+            continue
+        path = key[len(prefix) + 1:]
+        if not _JSON_PATH.match(path):
+            raise HTTPException(status_code=400, detail=f"invalid filter {key}")
+        if path not in promoted:
+            raise HTTPException(status_code=400, detail=f"{prefix}.{path} is not an indexed path "
+                                                        f"(indexed: {', '.join(promoted) or 'none'})")
+        filters.setdefault(json_path_column(prefix, path), []).append(value)
+    return sorted(filters.items())
+
+def json_filters_where(filters: list[tuple[str, list[str]]], params: dict) -> list[str]:
+    where = []
+    for n, (column, values) in enumerate(filters):
+        names = [f"jf{n}_{i}" for i in range(len(values))]
+        params.update(zip(names, values))
+        where.append(f"{column} = :{names[0]}" if len(names) == 1
+                     else f"{column} IN ({', '.join(':' + v for v in names)})")
+    return where
+
+# -----------------------------
+# Conditional GETs (ETag / If-None-Match)
+# -----------------------------
+def _etag(*parts) -> str:
+    digest = hashlib.blake2b(":".join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def row_etag(row: dict) -> str:
+    """
+    Weak validator for one spirit/registry row: a hash of the serialized row.
+    updated_at alone has one-second resolution, so two writes in the same
+    second would otherwise share a validator. JSON columns are decoded first:
+    a Fragment holds MySQL's text verbatim, which serializes differently from
+    the same value after a Redis-tier round trip.
+    """
+    normal = {k: plain(v) for k, v in row.items()}
+    return f'W/"{hashlib.blake2b(dumps(normal), digest_size=12).hexdigest()}"'
+
+# Every column a list page renders, for page_etag (updated_at is not enough, see row_etag).
+PAGE_ETAG_COLS = {
+    "spirits": "id, name, role, state, meta, updated_at",
+    "registry_services": "id, name, type, config, auth_mode, status, updated_at",
+}
+
+def page_etag(conn, table: str, tail: str, params: dict) -> str:
+    """
+    Validator for one list page, computed by a single aggregate over the page's
+    columns in MySQL; the rows themselves are not fetched or decoded.
+    """
+    cols = PAGE_ETAG_COLS[table]
+    agg = conn.execute(
+        text(
+            f"SELECT COUNT(*), MAX(updated_at), BIT_XOR(CRC32(CONCAT_WS(':', {cols}))) "
+            f"FROM (SELECT {cols} FROM {table} {tail}) AS page"
+        ),
+        params,
+    ).first()
+    return _etag(table, sorted(params.items()), *agg)
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore W/ prefixes on both sides.
+    want = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == want for t in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+def log_event(conn, spirit_id: int, event_type: str,
+              prev_state: Optional[str] = None,
+              new_state: Optional[str] = None,
+              note: Optional[str] = None,
+              meta: Optional[dict] = None):
+    conn.execute(
+        text(
+            "INSERT INTO spirit_events (spirit_id, event_type, prev_state, new_state, note, meta) "
+            "VALUES (:sid, :etype, :prev, :new, :note, CAST(:meta AS JSON))"
+        ),
+        {
+            "sid": spirit_id,
+            "etype": event_type,
+            "prev": prev_state,
+            "new": new_state,
+            "note": note,
+            "meta": _json_or_none(meta),
+        },
+    )
+
+def log_events(conn, events: list[dict]):
+    """Multi-row variant of log_event: one INSERT for the whole list."""
+    if not events:
+        return
+    values, params = [], {}
+    for i, ev in enumerate(events):
+        values.append(f"(:sid{i}, :etype{i}, :prev{i}, :new{i}, :note{i}, CAST(:meta{i} AS JSON))")
+        params.update({
+            f"sid{i}": ev["spirit_id"],
+            f"etype{i}": ev["event_type"],
+            f"prev{i}": ev.get("prev_state"),
+            f"new{i}": ev.get("new_state"),
+            f"note{i}": ev.get("note"),
+            f"meta{i}": _json_or_none(ev.get("meta")),
+        })
+    conn.execute(
+        text(
+            "INSERT INTO spirit_events (spirit_id, event_type, prev_state, new_state, note, meta) "
+            "VALUES " + ", ".join(values)
+        ),
+        params,
+    )
+
+# -----------------------------
+# Spirit counters
+# -----------------------------
+# Each (state, role) count is spread over COUNTER_SLOTS rows and a writer
+# picks one at random, so concurrent creates of one role don't queue on a
+# single row lock. Readers sum the slots. Transition counts are kept per
+# minute in a ring of TRANSITION_RING buckets: a write to a bucket still
+# holding an older minute overwrites it, so the table never needs pruning.
+COUNTER_SLOTS = 16
+STATS_WINDOWS = {"5m": 5, "1h": 60, "24h": 1440}  # transition rate windows, minutes
+TRANSITION_RING = max(STATS_WINDOWS.values())
+
+def bump_counters(conn, deltas: dict[tuple[str, str], int], transitions: dict[tuple[str, str], int]):
+    """
+    Apply {(state, role): +/-n} and {(prev, new): n} inside the caller's
+    transaction. Keys are written in sorted order so two batches never take
+    the same counter rows in opposite orders.
+    """
+    if not REGISTRY_SPIRIT_COUNTERS:
+        return
+    slot = random.randrange(COUNTER_SLOTS)
+    deltas = {k: v for k, v in sorted(deltas.items()) if v}
+    if deltas:
+        values, params = [], {"slot": slot}
+        for i, ((state, role), n) in enumerate(deltas.items()):
+            values.append(f"(:s{i}, :r{i}, :slot, :n{i})")
+            params.update({f"s{i}": state, f"r{i}": role, f"n{i}": n})
+        conn.execute(
+            text("INSERT INTO spirit_counters (state, role, slot, n) VALUES " + ", ".join(values)
+                 + " ON DUPLICATE KEY UPDATE n = n + VALUES(n)"),
+            params,
+        )
+    if transitions:
+        minute = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+        bucket = int(minute.replace(tzinfo=datetime.timezone.utc).timestamp() // 60) % TRANSITION_RING
+        values, params = [], {"slot": slot, "bucket": bucket, "minute": minute}
+        for i, ((prev, new), n) in enumerate(sorted(transitions.items())):
+            values.append(f"(:bucket, :p{i}, :x{i}, :slot, :minute, :n{i})")
+            params.update({f"p{i}": prev, f"x{i}": new, f"n{i}": n})
+        # n is assigned before minute, so the IF still sees the bucket's old minute
+        conn.execute(
+            text("INSERT INTO spirit_transition_counters (bucket, prev_state, new_state, slot, minute, n) VALUES "
+                 + ", ".join(values) + " ON DUPLICATE KEY UPDATE "
+                 "n = IF(minute = VALUES(minute), n + VALUES(n), VALUES(n)), minute = VALUES(minute)"),
+            params,
+        )
+
+def read_stats(conn) -> tuple[dict, str]:
+    """(stats, source): source is "counters", or "scan" before the counters are enabled."""
+    if REGISTRY_SPIRIT_COUNTERS:
+        cells = conn.execute(text(
+            "SELECT state, role, SUM(n) AS n FROM spirit_counters GROUP BY state, role HAVING SUM(n) <> 0"
+        )).all()
+        now = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+        starts = {label: now - datetime.timedelta(minutes=m - 1) for label, m in STATS_WINDOWS.items()}
+        sums = ", ".join(f"SUM(IF(minute >= :w{i}, n, 0))" for i in range(len(starts)))
+        moves = conn.execute(text(
+            f"SELECT prev_state, new_state, {sums} FROM spirit_transition_counters "
+            f"WHERE minute >= :since GROUP BY prev_state, new_state"
+        ), {"since": min(starts.values()), **{f"w{i}": t for i, t in enumerate(starts.values())}}).all()
+        source = "counters"
+    else:
+        cells = conn.execute(text("SELECT state, role, COUNT(*) AS n FROM spirits GROUP BY state, role")).all()
+        moves = []
+        source = "scan"
+    stats = {"total": 0, "by_state": {}, "by_role": {}, "by_state_role": {}, "transitions": {}}
+    for state, role, n in cells:
+        n = int(n)
+        stats["total"] += n
+        stats["by_state"][state] = stats["by_state"].get(state, 0) + n
+        stats["by_role"][role] = stats["by_role"].get(role, 0) + n
+        stats["by_state_role"].setdefault(state, {})[role] = n
+    for i, (label, minutes) in enumerate(STATS_WINDOWS.items()):
+        stats["transitions"][label] = {
+            f"{prev}->{new}": {"count": int(counts[i]), "per_minute": round(int(counts[i]) / minutes, 3)}
+            for prev, new, *counts in sorted(moves) if counts[i]
+        }
+    return stats, source
+
+_autoinc_info: Optional[tuple[bool, int]] = None
+
+def autoinc_info(conn) -> tuple[bool, int]:
+    """
+    (consecutive, step) for multi-row INSERT ids. InnoDB lock modes 0/1 hand a
+    simple multi-row INSERT a consecutive block; mode 2 (interleaved, the
+    MySQL 8 default) may not, so batch creates need innodb_autoinc_lock_mode=1.
+    """
+    global _autoinc_info
+    if _autoinc_info is None:
+        row = conn.execute(text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")).first()
+        _autoinc_info = (int(row[0]) in (0, 1), int(row[1]))
+        if not _autoinc_info[0]:
+            log.warning("innodb_autoinc_lock_mode=%s: POST /spirits:batch inserts one row per statement; "
+                        "set innodb_autoinc_lock_mode=1 on the server for multi-row inserts", row[0])
+    return _autoinc_info
+
+def fetch_spirit(conn, spirit_id: int):
+    row = conn.execute(
+        text("SELECT id, name, role, state, meta, created_at, updated_at FROM spirits WHERE id=:id"),
+        {"id": spirit_id},
+    ).mappings().first()
+    return encode_row(row, SPIRIT_JSON_COLS) if row else None
+
+def fetch_registry(conn, reg_id: str):
+    row = conn.execute(
+        text("SELECT id, name, type, config, auth_mode, status, created_at, updated_at FROM registry_services WHERE id=:id"),
+        {"id": reg_id},
+    ).mappings().first()
+    return encode_row(row, REGISTRY_JSON_COLS) if row else None
+
+def now_mysql():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+# -----------------------------
+# DB operations
+# Route bodies call these inside a transaction; app_async reuses them
+# unchanged through AsyncConnection.run_sync.
+# -----------------------------
+MAX_BATCH = 500
+
+SPIRIT_SORT_FIELDS = {"id": "id", "name": "name", "role": "role", "state": "state",
+                      "created_at": "created_at", "updated_at": "updated_at"}
+EVENT_SORT_FIELDS = {"created_at": "created_at"}
+REGISTRY_SORT_FIELDS = {"id": "id", "name": "name", "type": "type", "status": "status",
+                        "created_at": "created_at", "updated_at": "updated_at"}
+
+def ping_db(conn):
+    conn.execute(text("SELECT 1"))
+
+def rbac_policy_version(conn) -> Optional[int]:
+    return conn.execute(text("SELECT version FROM rbac_policy WHERE id=1")).scalar()
+
+def load_rbac_policy(conn) -> dict:
+    """
+    All rbac_* tables, shaped for rbac.compile_policy(). One REPEATABLE READ
+    transaction, so the version matches the rows read with it.
+    """
+    with conn.begin():
+        version = rbac_policy_version(conn)
+        roles = conn.execute(text("SELECT name, inherits, description FROM rbac_roles ORDER BY name")).mappings().all()
+        rules = conn.execute(text("SELECT role, action, resource, effect FROM rbac_rules ORDER BY id")).mappings().all()
+        assignments = conn.execute(text("SELECT subject, role FROM rbac_assignments")).mappings().all()
+    return {
+        "version": version,
+        "roles": [{"name": r["name"], "description": r["description"],
+                   "inherits": [p.strip() for p in (r["inherits"] or "").split(",") if p.strip()]}
+                  for r in roles],
+        "rules": [dict(r) for r in rules],
+        "assignments": [dict(a) for a in assignments],
+    }
+
+def insert_spirit(conn, name: str, role: str, meta: Optional[dict]) -> int:
+    result = conn.execute(
+        text(
+            "INSERT INTO spirits (name, role, state, meta) "
+            "VALUES (:name, :role, 'pending', CAST(:meta AS JSON))"
+        ),
+        {"name": name, "role": role, "meta": _json_or_none(meta)},
+    )
+    spirit_id = result.lastrowid
+    conn.execute(text("UPDATE spirits SET state='created' WHERE id=:id"), {"id": spirit_id})
+    log_event(conn, spirit_id, event_type="create", prev_state="pending", new_state="created", meta=meta)
+    bump_counters(conn, {("created", role): 1}, {("pending", "created"): 1})
+    return spirit_id
+
+def validate_create_items(items: list[dict], results: list) -> list[tuple]:
+    valid = []
+    for i, it in enumerate(items):
+        name, role, meta = it.get("name"), it.get("role"), it.get("meta")
+        if not isinstance(name, str) or not name or not isinstance(role, str) or not role:
+            results[i] = {"index": i, "ok": False, "error": {"code": "VALIDATION_FAILED", "message": "name and role are required strings"}}
+        elif meta is not None and not isinstance(meta, dict):
+            results[i] = {"index": i, "ok": False, "error": {"code": "VALIDATION_FAILED", "message": "meta must be an object"}}
+        else:
+            valid.append((i, name, role, meta))
+    return valid
+
+def insert_spirits_batch(conn, valid: list[tuple]) -> list[int]:
+    """
+    One multi-row INSERT into spirits and one into spirit_events. The ids are
+    read as lastrowid + n * step, which needs innodb_autoinc_lock_mode=1 (or
+    0); under mode 2 every spirit is its own INSERT (same transaction, same
+    result, one round trip per row).
+    """
+    consecutive, step = autoinc_info(conn)
+    row_sql = "(:name{n}, :role{n}, 'created', CAST(:meta{n} AS JSON))"
+    insert_sql = "INSERT INTO spirits (name, role, state, meta) VALUES "
+    if consecutive:
+        params = {}
+        for n, (_, name, role, meta) in enumerate(valid):
+            params.update({f"name{n}": name, f"role{n}": role, f"meta{n}": _json_or_none(meta)})
+        values = ", ".join(row_sql.format(n=n) for n in range(len(valid)))
+        first_id = conn.execute(text(insert_sql + values), params).lastrowid
+        ids = [first_id + n * step for n in range(len(valid))]
+    else:
+        # Interleaved auto-inc can't promise a contiguous id block;
+        # stay in the one transaction but take ids row by row.
+        ids = [
+            conn.execute(text(insert_sql + row_sql.format(n="")),
+                         {"name": name, "role": role, "meta": _json_or_none(meta)}).lastrowid
+            for (_, name, role, meta) in valid
+        ]
+    log_events(conn, [
+        {"spirit_id": sid, "event_type": "create", "prev_state": "pending",
+         "new_state": "created", "meta": meta}
+        for sid, (_, _, _, meta) in zip(ids, valid)
+    ])
+    per_role: dict[tuple[str, str], int] = {}
+    for _, _, role, _ in valid:
+        per_role[("created", role)] = per_role.get(("created", role), 0) + 1
+    bump_counters(conn, per_role, {("pending", "created"): len(valid)})
+    return ids
+
+def validate_state_items(items: list[dict], results: list) -> list[tuple]:
+    wanted = []
+    for i, it in enumerate(items):
+        sid, new_state = it.get("id"), it.get("new_state")
+        if type(sid) is not int or new_state not in ALLOWED_TRANSITIONS:  # bool is an int subclass
+            results[i] = {"index": i, "ok": False, "error": {"code": "VALIDATION_FAILED", "message": "id must be an int and new_state a known state"}}
+        else:
+            wanted.append((i, sid, new_state, it.get("note")))
+    return wanted
+
+def transition_spirits_batch(conn, wanted: list[tuple], results: list) -> dict[int, dict]:
+    """
+    Read (and row-lock) current states with a single SELECT, check
+    ALLOWED_TRANSITIONS per item in order, then one UPDATE per target state
+    and one events INSERT. Returns {id: {id, name, role}} for the rows found.
+    """
+    rows = conn.execute(
+        text("SELECT id, name, role, state FROM spirits WHERE id IN :ids FOR UPDATE")
+            .bindparams(bindparam("ids", expanding=True)),
+        {"ids": sorted({sid for _, sid, _, _ in wanted})},
+    ).mappings().all()
+    current = {r["id"]: r["state"] for r in rows}
+    original = dict(current)
+    events = []
+    for i, sid, new_state, note in wanted:
+        if sid not in current:
+            results[i] = {"index": i, "ok": False, "error": {"code": "NOT_FOUND", "message": "not found"}}
+            continue
+        prev = current[sid]
+        if new_state not in ALLOWED_TRANSITIONS.get(prev, set()):
+            results[i] = {"index": i, "ok": False, "error": {"code": "CONFLICT", "message": f"illegal transition {prev} -> {new_state}"}}
+            continue
+        current[sid] = new_state
+        events.append({"spirit_id": sid, "event_type": "state_change",
+                       "prev_state": prev, "new_state": new_state, "note": note})
+        results[i] = {"index": i, "ok": True,
+                      "data": {"id": sid, "prev_state": prev, "state": new_state}}
+    by_state: dict[str, list[int]] = {}
+    roles = {r["id"]: r["role"] for r in rows}
+    deltas: dict[tuple[str, str], int] = {}
+    for sid, st in current.items():
+        if st != original[sid]:
+            by_state.setdefault(st, []).append(sid)
+            deltas[(original[sid], roles[sid])] = deltas.get((original[sid], roles[sid]), 0) - 1
+            deltas[(st, roles[sid])] = deltas.get((st, roles[sid]), 0) + 1
+    moves: dict[tuple[str, str], int] = {}
+    for ev in events:
+        moves[(ev["prev_state"], ev["new_state"])] = moves.get((ev["prev_state"], ev["new_state"]), 0) + 1
+    for st, ids in by_state.items():
+        conn.execute(
+            text("UPDATE spirits SET state=:s WHERE id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+            {"s": st, "ids": ids},
+        )
+    log_events(conn, events)
+    bump_counters(conn, deltas, moves)
+    return {r["id"]: {"id": r["id"], "name": r["name"], "role": r["role"]} for r in rows}
+
+def transition_spirit(conn, spirit_id: int, new_state: str, note: Optional[str]) -> tuple[str, dict]:
+    """(previous state, updated row)."""
+    # Locked like the batch path: two racing transitions of one spirit must
+    # not both see the old state (and both move its counters).
+    row = conn.execute(
+        text("SELECT role, state FROM spirits WHERE id=:id FOR UPDATE"), {"id": spirit_id}
+    ).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="not found")
+    prev = row["state"]
+    if new_state not in ALLOWED_TRANSITIONS.get(prev, set()):
+        raise HTTPException(status_code=409, detail=f"illegal transition {prev} -> {new_state}")
+    conn.execute(text("UPDATE spirits SET state=:s WHERE id=:id"), {"s": new_state, "id": spirit_id})
+    log_event(conn, spirit_id, event_type="state_change", prev_state=prev, new_state=new_state, note=note)
+    bump_counters(conn, {(prev, row["role"]): -1, (new_state, row["role"]): 1}, {(prev, new_state): 1})
+    return prev, fetch_spirit(conn, spirit_id)
+
+def update_spirit_fields(conn, spirit_id: int, name: Optional[str], meta: Optional[dict],
+                         note: Optional[str]) -> dict:
+    raw = conn.execute(
+        text("SELECT id, name, role, state, meta FROM spirits WHERE id=:id"),
+        {"id": spirit_id},
+    ).mappings().first()
+    if not raw:
+        raise HTTPException(status_code=404, detail="not found")
+    updates = []
+    params = {"id": spirit_id}
+    if name is not None:
+        updates.append("name=:name")
+        params["name"] = name
+    if meta is not None:
+        updates.append("meta=CAST(:meta AS JSON)")
+        params["meta"] = _json_or_none(meta)
+    conn.execute(text(f"UPDATE spirits SET {', '.join(updates)} WHERE id=:id"), params)
+    if name is not None:
+        log_event(conn, spirit_id, event_type="name_update", note=note)
+    if meta is not None:
+        log_event(conn, spirit_id, event_type="meta_update", note=note, meta=meta)
+    return fetch_spirit(conn, spirit_id)
+
+def _spirits_page_sql(state: Optional[str], role: Optional[str], q: Optional[str],
+                      limit: int, offset: int, cursor: Optional[str], sort: str, meta: list = ()):
+    order_field, order_dir = parse_sort(sort, SPIRIT_SORT_FIELDS)
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="use either cursor or offset, not both")
+
+    where = []
+    params = {}
+    if state:
+        where.append("state = :state")
+        params["state"] = state
+    if role:
+        where.append("role = :role")
+        params["role"] = role
+    if q:
+        where.append(name_contains_sql(q, params))
+    where += json_filters_where(meta, params)
+    if cursor:
+        where.append(keyset_where(order_field, order_dir, decode_cursor(cursor, order_field, order_dir), params))
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    tail = f"{where_sql} {order_by_sql(order_field, order_dir)} LIMIT :limit OFFSET :offset"
+    params.update({"limit": limit, "offset": 0 if cursor else offset})
+    return tail, params, order_field, order_dir
+
+# -----------------------------
+# Spirit name search
+# -----------------------------
+NGRAM = 2  # server ngram_token_size; shorter queries cannot use the index
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _ft_query(q: str) -> str:
+    # Boolean-mode operators would change the meaning of a user's query.
+    return " ".join(re.sub(r'[+\-<>()~*"@]', " ", q).split())
+
+def name_contains_sql(q: str, params: dict) -> str:
+    """
+    Substring match on name. With the ngram index each word of q becomes a
+    required phrase, narrowing to rows that contain its bigrams in order;
+    LIKE rechecks the survivors so results stay exactly those of
+    name LIKE '%q%'.
+    """
+    params["q"] = f"%{_like_escape(q)}%"
+    words = [w for w in _ft_query(q).split() if len(w) >= NGRAM]
+    if not REGISTRY_SPIRIT_FULLTEXT or not words:
+        return "name LIKE :q"
+    params["q_phrase"] = " ".join(f'+"{w}"' for w in words)
+    return "MATCH(name) AGAINST(:q_phrase IN BOOLEAN MODE) AND name LIKE :q"
+
+def spirit_search_sql(q: str, state: Optional[str], role: Optional[str],
+                      limit: int, offset: int, table: str = "spirits") -> tuple[str, dict]:
+    """
+    Ranked search over name + promoted meta fields (search_text).
+
+    Candidates come from a natural-language MATCH on the ngram index: every
+    bigram of the query that a row shares adds to its score, so prefixes,
+    substrings and misspellings ("kestral") still find the row. The best
+    SPIRIT_SEARCH_CANDIDATES are then re-ranked with exact-name and
+    name-prefix boosts. Without the index, prefix/substring LIKE stands in.
+    """
+    terms = _ft_query(q)
+    params = {"q": q, "prefix": f"{_like_escape(q)}%", "contains": f"%{_like_escape(q)}%",
+              "cand": SPIRIT_SEARCH_CANDIDATES, "limit": limit, "offset": offset}
+    filters = []
+    if state:
+        filters.append("state = :state")
+        params["state"] = state
+    if role:
+        filters.append("role = :role")
+        params["role"] = role
+    if REGISTRY_SPIRIT_FULLTEXT and len(terms) >= NGRAM:
+        params["terms"] = terms
+        where = " AND ".join(["MATCH(search_text) AGAINST(:terms)"] + filters)
+        candidates = (f"SELECT id, MATCH(search_text) AGAINST(:terms) AS score FROM {table} "
+                      f"WHERE {where} ORDER BY score DESC LIMIT :cand")
+    else:
+        where = " AND ".join(["name LIKE :contains"] + filters)
+        candidates = f"SELECT id, 0 AS score FROM {table} WHERE {where} ORDER BY name LIMIT :cand"
+    sql = f"""
+        SELECT s.id, s.name, s.role, s.state, s.meta, s.created_at, s.updated_at,
+               c.score + 100 * (s.name = :q) + 10 * (s.name LIKE :prefix) + (s.name LIKE :contains) AS score
+        FROM ({candidates}) AS c
+        JOIN {table} s ON s.id = c.id
+        ORDER BY score DESC, s.id ASC
+        LIMIT :limit OFFSET :offset
+    """
+    return sql, params
+
+def encode_offset_cursor(offset: int) -> str:
+    raw = json.dumps({"f": "score", "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload.get("f") != "score" or not isinstance(payload.get("o"), int) or payload["o"] < 0:
+            raise ValueError("not a search cursor")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="invalid cursor") from e
+    return payload["o"]
+
+def search_spirits(conn, q: str, state: Optional[str], role: Optional[str],
+                   limit: int, cursor: Optional[str]) -> tuple[list, dict]:
+    offset = decode_offset_cursor(cursor) if cursor else 0
+    sql, params = spirit_search_sql(q, state, role, limit, offset)
+    rows = conn.execute(text(sql), params).mappings().all()
+    data = []
+    for r in rows:
+        item = encode_row(r, SPIRIT_JSON_COLS)
+        item["score"] = round(float(item["score"]), 4)
+        data.append(item)
+    end = offset + len(rows)
+    more = len(rows) == limit and end < SPIRIT_SEARCH_CANDIDATES
+    return data, {"nextCursor": encode_offset_cursor(end) if more else None}
+
+def query_spirits(conn, state: Optional[str], role: Optional[str], q: Optional[str],
+                  limit: int, offset: int, cursor: Optional[str], sort: str, meta: list = ()) -> tuple[list, dict]:
+    tail, params, order_field, order_dir = _spirits_page_sql(state, role, q, limit, offset, cursor, sort, meta)
+    sql = f"""
+        SELECT id, name, role, state, meta, created_at, updated_at
+        FROM spirits
+        {tail}
+    """
+    rows = conn.execute(text(sql), params).mappings().all()
+    page = next_cursor_meta(rows, limit, order_field, order_dir)
+    return [encode_row(r, SPIRIT_JSON_COLS) for r in rows], page
+
+def spirits_page_etag(conn, state: Optional[str], role: Optional[str], q: Optional[str],
+                      limit: int, offset: int, cursor: Optional[str], sort: str, meta: list = ()) -> str:
+    tail, params, _, _ = _spirits_page_sql(state, role, q, limit, offset, cursor, sort, meta)
+    return page_etag(conn, "spirits", tail, params)
+
+MYSQL_DUP_ENTRY = 1062
+
+def registry_name_taken(e: IntegrityError, name: str) -> HTTPException:
+    """uq_registry_name (tools/orchestrator_db_migrate_v1.sh) as a 409; anything else stays a 500."""
+    code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+    if code == MYSQL_DUP_ENTRY:
+        return HTTPException(status_code=409, detail=f"registry name {name!r} already exists")
+    return HTTPException(status_code=500, detail=str(e))
+
+def insert_registry(conn, name: str, type: str, config: Optional[dict],
+                    auth_mode: str, status_: str) -> dict:
+    reg_id = str(uuid.uuid4())
+    try:
+        conn.execute(
+            text(
+                "INSERT INTO registry_services (id, name, type, config, auth_mode, status, created_at, updated_at) "
+                "VALUES (:id, :name, :type, :config, :auth_mode, :status, :created_at, :updated_at)"
+            ),
+            {
+                "id": reg_id,
+                "name": name,
+                "type": type,
+                "config": _json_or_none(config),
+                "auth_mode": auth_mode,
+                "status": status_,
+                "created_at": now_mysql(),
+                "updated_at": now_mysql()
+            },
+        )
+    except IntegrityError as e:
+        raise registry_name_taken(e, name) from e
+    return {
+        "id": reg_id,
+        "name": name,
+        "type": type,
+        "status": status_,
+        "auth_mode": auth_mode
+    }
+
+def update_registry(conn, reg_id: str, name: Optional[str], config: Optional[dict],
+                    auth_mode: Optional[str], status_: Optional[str]) -> dict:
+    raw = conn.execute(
+        text("SELECT id FROM registry_services WHERE id=:id"),
+        {"id": reg_id},
+    ).mappings().first()
+    if not raw:
+        raise HTTPException(status_code=404, detail="not found")
+    updates = []
+    params = {"id": reg_id}
+    if name is not None:
+        updates.append("name=:name")
+        params["name"] = name
+    if config is not None:
+        updates.append("config=CAST(:config AS JSON)")
+        params["config"] = _json_or_none(config)
+    if auth_mode is not None:
+        updates.append("auth_mode=:auth_mode")
+        params["auth_mode"] = auth_mode
+    if status_ is not None:
+        updates.append("status=:status")
+        params["status"] = status_
+    updates.append("updated_at=:updated_at")
+    params["updated_at"] = now_mysql()
+    try:
+        conn.execute(text(f"UPDATE registry_services SET {', '.join(updates)} WHERE id=:id"), params)
+    except IntegrityError as e:
+        raise registry_name_taken(e, name) from e
+    return fetch_registry(conn, reg_id)
+
+def remove_registry(conn, reg_id: str):
+    raw = conn.execute(
+        text("SELECT id FROM registry_services WHERE id=:id"),
+        {"id": reg_id},
+    ).mappings().first()
+    if not raw:
+        raise HTTPException(status_code=404, detail="not found")
+    conn.execute(text("DELETE FROM registry_services WHERE id=:id"), {"id": reg_id})
+
+def _registry_page_sql(type_: Optional[str], status_: Optional[str],
+                       limit: int, offset: int, cursor: Optional[str], sort: str, config: list = ()):
+    order_field, order_dir = parse_sort(sort, REGISTRY_SORT_FIELDS)
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="use either cursor or offset, not both")
+
+    where = []
+    params = {}
+    if type_:
+        where.append("type = :type")
+        params["type"] = type_
+    if status_:
+        where.append("status = :status")
+        params["status"] = status_
+    where += json_filters_where(config, params)
+    if cursor:
+        where.append(keyset_where(order_field, order_dir, decode_cursor(cursor, order_field, order_dir), params))
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    tail = f"{where_sql} {order_by_sql(order_field, order_dir)} LIMIT :limit OFFSET :offset"
+    params.update({"limit": limit, "offset": 0 if cursor else offset})
+    return tail, params, order_field, order_dir
+
+def query_registry(conn, type_: Optional[str], status_: Optional[str],
+                   limit: int, offset: int, cursor: Optional[str], sort: str, config: list = ()) -> tuple[list, dict]:
+    tail, params, order_field, order_dir = _registry_page_sql(type_, status_, limit, offset, cursor, sort, config)
+    sql = f"""
+        SELECT id, name, type, config, auth_mode, status, created_at, updated_at
+        FROM registry_services
+        {tail}
+    """
+    rows = conn.execute(text(sql), params).mappings().all()
+    page = next_cursor_meta(rows, limit, order_field, order_dir)
+    return [encode_row(r, REGISTRY_JSON_COLS) for r in rows], page
+
+def registry_page_etag(conn, type_: Optional[str], status_: Optional[str],
+                       limit: int, offset: int, cursor: Optional[str], sort: str, config: list = ()) -> str:
+    tail, params, _, _ = _registry_page_sql(type_, status_, limit, offset, cursor, sort, config)
+    return page_etag(conn, "registry_services", tail, params)
+
+def query_events(conn, spirit_id: Optional[int], event_type: Optional[str],
+                 since: Optional[datetime.datetime], until: Optional[datetime.datetime],
+                 limit: int, cursor: Optional[str], sort: str) -> tuple[list, dict]:
+    """
+    Keyset page over spirit_events ordered by (created_at, id). With spirit_id
+    this seeks idx_spirit_events_spirit_created; the time window also lets
+    MySQL prune monthly partitions.
+    """
+    order_field, order_dir = parse_sort(sort, EVENT_SORT_FIELDS, default="created_at")
+    where, params = [], {}
+    if spirit_id is not None:
+        where.append("spirit_id = :sid")
+        params["sid"] = spirit_id
+    if event_type:
+        where.append("event_type = :etype")
+        params["etype"] = event_type
+    if since:
+        where.append("created_at >= :since")
+        params["since"] = since
+    if until:
+        where.append("created_at < :until")
+        params["until"] = until
+    if cursor:
+        where.append(keyset_where(order_field, order_dir, decode_cursor(cursor, order_field, order_dir), params))
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    sql = f"""
+        SELECT id, spirit_id, event_type, prev_state, new_state, note, meta, created_at
+        FROM spirit_events
+        {where_sql}
+        {order_by_sql(order_field, order_dir)}
+        LIMIT :limit
+    """
+    params["limit"] = limit
+    rows = conn.execute(text(sql), params).mappings().all()
+    page = next_cursor_meta(rows, limit, order_field, order_dir)
+    return [encode_row(r, SPIRIT_JSON_COLS) for r in rows], page
+
+def spirits_export_sql(state: Optional[str], role: Optional[str],
+                       since: Optional[datetime.datetime], until: Optional[datetime.datetime]):
+    where, params = [], {}
+    if state:
+        where.append("state = :state")
+        params["state"] = state
+    if role:
+        where.append("role = :role")
+        params["role"] = role
+    if since:
+        where.append("updated_at >= :since")
+        params["since"] = since
+    if until:
+        where.append("updated_at < :until")
+        params["until"] = until
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    sql = f"SELECT id, name, role, state, meta, created_at, updated_at FROM spirits {where_sql} ORDER BY id"
+    return sql, params
+
+def events_export_sql(spirit_id: Optional[int], event_type: Optional[str],
+                      since: Optional[datetime.datetime], until: Optional[datetime.datetime]):
+    where, params = [], {}
+    if spirit_id is not None:
+        where.append("spirit_id = :sid")
+        params["sid"] = spirit_id
+    if event_type:
+        where.append("event_type = :etype")
+        params["etype"] = event_type
+    if since:
+        where.append("created_at >= :since")
+        params["since"] = since
+    if until:
+        where.append("created_at < :until")
+        params["until"] = until
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    sql = (
+        "SELECT id, spirit_id, event_type, prev_state, new_state, note, meta, created_at "
+        f"FROM spirit_events {where_sql} ORDER BY id"
+    )
+    return sql, params
+
+def ndjson_chunk(rows, json_cols) -> bytes:
+    return b"".join(dumps(encode_row(r, json_cols)) + b"\n" for r in rows)
+
+def ndjson_response(body, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# -----------------------------
+# Error handling
+# -----------------------------
+async def solace_http_exception_handler(request: Request, exc: HTTPException):
+    request_id = get_request_id(request)
+    code = exc.status_code
+    msg = exc.detail if isinstance(exc.detail, str) else str(exc.detail)
+    error_code = {
+        400: "VALIDATION_FAILED",
+        401: "UNAUTHENTICATED",
+        403: "RBAC_DENIED",
+        404: "NOT_FOUND",
+        409: "CONFLICT",
+        429: "RATE_LIMITED",
+        500: "INTERNAL_ERROR",
+        503: "UNAVAILABLE"
+    }.get(code, "INTERNAL_ERROR")
+    error = { "code": error_code, "message": msg }
+    request.state.solace_status = code  # counted by RequestMetrics
+    return solace_response(False, error=error, request_id=request_id)
+
+# -----------------------------
+# RBAC, memory search and change feed helpers
+# -----------------------------
+def rbac_check_items(subject: Optional[str], checks: list[dict]) -> list[tuple[str, str, str]]:
+    """Validate a check:batch body into (subject, action, resource) triples; 400 on the first bad item."""
+    if not checks or len(checks) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"checks must contain 1..{MAX_BATCH} entries")
+    triples = []
+    for i, c in enumerate(checks):
+        who = c.get("subject", subject) if isinstance(c, dict) else None
+        action = c.get("action") if isinstance(c, dict) else None
+        resource = c.get("resource") if isinstance(c, dict) else None
+        if not all(isinstance(v, str) and v for v in (who, action, resource)):
+            raise HTTPException(status_code=400,
+                                detail=f"checks[{i}] needs string subject (or a top-level one), action and resource")
+        triples.append((who, action, resource))
+    return triples
+
+MemoryMode = Literal["hybrid", "vector"]
+
+def created_changes(ids: list[int], valid: list[tuple]) -> list[dict]:
+    return [spirit_change("created", {"id": sid, "name": name, "role": role, "state": "created"}, "pending")
+            for sid, (_, name, role, _) in zip(ids, valid)]
+
+def state_changes(results: list, spirits: dict[int, dict]) -> list[dict]:
+    return [spirit_change("state_change", {**spirits[r["data"]["id"]], "state": r["data"]["state"]},
+                          r["data"]["prev_state"])
+            for r in results if r and r["ok"]]
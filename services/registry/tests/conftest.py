@@ -0,0 +1,70 @@
+import os, sys
+
+import pytest
+
+# The registry modules import each other as top-level modules (uvicorn app:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeRedis:
+    """The handful of redis-py calls the registry makes, kept in a dict (no expiry)."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.published: list[tuple[str, str]] = []
+
+    @staticmethod
+    def _b(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._b(value)
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def incr(self, key):
+        self.data[key] = self._b(int(self.data.get(key, b"0")) + 1)
+        return int(self.data[key])
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        redis, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *a, **kw: calls.append((name, a, kw)) or self
+
+            def execute(self):
+                return [getattr(redis, name)(*a, **kw) for name, a, kw in calls]
+
+        return Pipeline()
+
+    def register_script(self, source):
+        from cache import _SET_IF_GENERATION
+        assert source == _SET_IF_GENERATION, "FakeRedis only knows the cache's Lua script"
+
+        def set_if_generation(keys, args):
+            value_key, gen_key = keys
+            payload, ttl, seen = args
+            if (self.data.get(gen_key) or b"").decode() != seen:
+                return 0
+            self.set(value_key, payload, ex=ttl)
+            return 1
+
+        return set_if_generation
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
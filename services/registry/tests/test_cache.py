@@ -0,0 +1,67 @@
+import time
+
+from cache import LRUTTLCache, ReadThroughCache, is_miss
+
+def test_lru_evicts_least_recently_used():
+    c = LRUTTLCache("t", maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)
+    assert is_miss(c.get("b")) and c.get("a") == 1 and c.get("c") == 3
+
+def test_lru_expires_entries():
+    c = LRUTTLCache("t", maxsize=2, ttl=0.01)
+    c.set("a", 1)
+    time.sleep(0.02)
+    assert is_miss(c.get("a"))
+
+def test_get_or_load_loads_once_and_skips_none():
+    cache = ReadThroughCache("t", ttl=60)
+    calls = []
+    assert cache.get_or_load(1, lambda: calls.append(1) or {"id": 1}) == {"id": 1}
+    assert cache.get_or_load(1, lambda: calls.append(1) or {"id": 1}) == {"id": 1}
+    assert cache.get_or_load(2, lambda: None) is None
+    assert is_miss(cache.get(2))
+    assert calls == [1]
+
+def test_invalidate_during_load_does_not_store_the_old_row():
+    cache = ReadThroughCache("t", ttl=60)
+
+    def load_then_concurrent_update():
+        row = {"id": 1, "name": "before"}
+        cache.invalidate(1)  # a writer commits and invalidates while we hold the old row
+        return row
+
+    assert cache.get_or_load(1, load_then_concurrent_update)["name"] == "before"
+    assert is_miss(cache.get(1))
+    assert cache.get_or_load(1, lambda: {"id": 1, "name": "after"})["name"] == "after"
+    assert cache.get(1)["name"] == "after"
+
+def test_stale_generation_after_eviction_never_matches():
+    cache = ReadThroughCache("t", maxsize=2, ttl=60)
+    generation = cache.generation("k")
+    cache.invalidate("k")
+    for other in range(5):  # pushes "k"'s stamp out of the bounded generation table
+        cache.invalidate(other)
+    cache.set("k", "stale", generation)
+    assert is_miss(cache.get("k"))
+
+def test_invalidation_from_another_worker_bumps_the_generation():
+    cache = ReadThroughCache("t", ttl=60)
+    generation = cache.generation(1)
+    cache.invalidate_local(1)  # what the pub/sub listener calls
+    cache.set(1, "stale", generation)
+    assert is_miss(cache.get(1))
+
+def test_redis_tier_is_shared_and_raced_sets_are_dropped(fake_redis):
+    a = ReadThroughCache("t", ttl=60, redis_client=fake_redis)
+    b = ReadThroughCache("t", ttl=60, redis_client=fake_redis)
+    a.get_or_load(1, lambda: {"v": 1})
+    assert b.get(1) == {"v": 1}
+
+    generation = a.generation(2)
+    b.invalidate(2)  # another worker's update lands during a's load
+    a.set(2, {"v": "stale"}, generation)
+    assert is_miss(b.get(2))
+    assert fake_redis.published[-1][1] == '["t", 2]'
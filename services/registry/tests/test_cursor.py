@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+
+from registry_core import (
+    _spirits_page_sql, decode_cursor, encode_cursor, keyset_where, next_cursor_meta,
+)
+
+def test_cursor_round_trips_datetimes_and_ids():
+    row = {"id": 42, "updated_at": datetime.datetime(2026, 10, 18, 12, 0, 0, 123000)}
+    cursor = encode_cursor("updated_at", "DESC", row)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "updated_at", "DESC") == {
+        "f": "updated_at", "d": "DESC", "v": "2026-10-18 12:00:00.123000", "id": 42}
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "bnVsbA"])  # garbage, {}, null
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as info:
+        decode_cursor(cursor, "id", "DESC")
+    assert info.value.status_code == 400
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = encode_cursor("name", "ASC", {"id": 1, "name": "Eira"})
+    with pytest.raises(HTTPException) as info:
+        decode_cursor(cursor, "name", "DESC")
+    assert info.value.detail == "cursor does not match sort"
+
+def test_keyset_predicates():
+    params = {}
+    assert keyset_where("id", "DESC", {"v": 9, "id": 9}, params) == "id < :cur_id"
+    assert keyset_where("name", "ASC", {"v": "Eira", "id": 3}, params) == \
+        "(name > :cur_v OR (name = :cur_v AND id > :cur_id))"
+    assert params == {"cur_v": "Eira", "cur_id": 3}
+
+def test_no_cursor_on_a_short_page():
+    assert next_cursor_meta([{"id": 1}], 2, "id", "DESC") == {"nextCursor": None}
+    assert next_cursor_meta([{"id": 2}, {"id": 1}], 2, "id", "DESC")["nextCursor"] is not None
+
+def test_cursor_and_offset_are_exclusive():
+    with pytest.raises(HTTPException):
+        _spirits_page_sql(None, None, None, 10, 5, encode_cursor("id", "DESC", {"id": 1}), "id:desc")
+
+@pytest.fixture
+def spirits():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE spirits (id INTEGER PRIMARY KEY, name TEXT, role TEXT, "
+                          "state TEXT, updated_at TEXT)"))
+        # few distinct timestamps and names, so pages split inside runs of ties
+        conn.execute(text("INSERT INTO spirits VALUES (:id, :name, :role, 'ready', :ts)"),
+                     [{"id": i, "name": f"n{i % 4}", "role": "scout" if i % 3 else "guide",
+                       "ts": f"2026-10-18 12:00:0{i % 3}"} for i in range(1, 24)])
+    with engine.connect() as conn:
+        yield conn
+
+def walk(conn, sort, role=None, limit=5):
+    seen, cursor = [], None
+    while True:
+        tail, params, field, direction = _spirits_page_sql(None, role, None, limit, 0, cursor, sort)
+        rows = conn.execute(text(f"SELECT id, name, updated_at FROM spirits {tail}"), params).mappings().all()
+        seen += [r["id"] for r in rows]
+        cursor = next_cursor_meta(rows, limit, field, direction)["nextCursor"]
+        if cursor is None:
+            return seen
+
+@pytest.mark.parametrize("sort, order", [
+    ("updated_at:desc", "updated_at DESC, id DESC"),
+    ("updated_at:asc", "updated_at ASC, id ASC"),
+    ("name:asc", "name ASC, id ASC"),
+    ("id:desc", "id DESC"),
+])
+def test_walking_every_page_matches_one_big_query(spirits, sort, order):
+    everything = [r[0] for r in spirits.execute(text(f"SELECT id FROM spirits ORDER BY {order}"))]
+    assert walk(spirits, sort) == everything
+
+def test_walk_keeps_filters(spirits):
+    guides = [r[0] for r in spirits.execute(
+        text("SELECT id FROM spirits WHERE role = 'guide' ORDER BY updated_at DESC, id DESC"))]
+    assert walk(spirits, "updated_at:desc", role="guide", limit=2) == guides
@@ -0,0 +1,67 @@
+import datetime
+
+from starlette.requests import Request
+
+from cache import ReadThroughCache
+from fastjson import dumps, encode_row, loads
+from registry_core import SPIRIT_JSON_COLS, if_none_match, row_etag
+
+SAME_SECOND = datetime.datetime(2026, 10, 18, 12, 0, 0)
+
+def spirit(**changes):
+    row = {"id": 7, "name": "Eira", "role": "guide", "state": "ready", "meta": {"mood": "calm"},
+           "created_at": SAME_SECOND, "updated_at": SAME_SECOND}
+    row.update(changes)
+    return row
+
+def request(header=None):
+    headers = [(b"if-none-match", header.encode())] if header is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_row_etag_is_stable_for_the_same_row():
+    assert row_etag(spirit()) == row_etag(spirit())
+    assert row_etag(spirit()).startswith('W/"')
+
+def test_row_etag_changes_with_any_field_within_the_same_second():
+    base = row_etag(spirit())
+    assert row_etag(spirit(name="Mica")) != base
+    assert row_etag(spirit(meta={"mood": "stormy"})) != base
+    assert row_etag(spirit(state="error")) != base
+
+def test_if_none_match_uses_weak_comparison():
+    etag = row_etag(spirit())
+    assert if_none_match(request(etag), etag)
+    assert if_none_match(request(etag.removeprefix("W/")), etag)
+    assert if_none_match(request(f'"other", {etag}'), etag)
+    assert if_none_match(request("*"), etag)
+    assert not if_none_match(request('W/"other"'), etag)
+    assert not if_none_match(request(), etag)
+
+def mysql_row():
+    """A spirit as fetch_spirit hands it out: JSON column as MySQL text, datetimes untouched."""
+    return encode_row({"id": 7, "name": "Eira", "role": "guide", "state": "ready", "meta": '{"mood": "calm"}',
+                       "created_at": SAME_SECOND, "updated_at": SAME_SECOND}, SPIRIT_JSON_COLS)
+
+def test_row_etag_survives_the_redis_round_trip():
+    row = mysql_row()
+    assert row_etag(row) == row_etag(loads(dumps(row)))
+
+def test_get_spirit_answers_304_across_cache_tiers(fake_redis, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    worker_a = ReadThroughCache("spirit", ttl=60, redis_client=fake_redis)
+    worker_b = ReadThroughCache("spirit", ttl=60, redis_client=fake_redis)
+    worker_a.set(7, mysql_row())  # a loaded it from MySQL; b only sees the Redis copy
+    client = TestClient(app.app)
+
+    monkeypatch.setattr(app, "spirit_cache", worker_a)
+    first = client.get("/spirits/7")
+    assert first.status_code == 200
+    again = client.get("/spirits/7", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+    monkeypatch.setattr(app, "spirit_cache", worker_b)
+    other = client.get("/spirits/7", headers={"If-None-Match": first.headers["ETag"]})
+    assert other.status_code == 304
+    assert other.content == b"" and other.headers["ETag"] == first.headers["ETag"]
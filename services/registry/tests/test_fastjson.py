@@ -0,0 +1,16 @@
+import datetime, json
+
+import pytest
+
+import fastjson
+
+orjson = pytest.importorskip("orjson")
+
+def test_plain_decodes_fragments_and_passes_everything_else():
+    assert fastjson.plain(orjson.Fragment(b'{"mood": "calm"}')) == {"mood": "calm"}
+    assert fastjson.plain({"mood": "calm"}) == {"mood": "calm"}
+    assert fastjson.plain("text") == "text"
+
+def test_stdlib_default_decodes_fragments_and_datetimes():
+    row = {"meta": orjson.Fragment(b'{"a": 1}'), "at": datetime.datetime(2026, 10, 18, 12, 0)}
+    assert json.loads(json.dumps(row, default=fastjson._default)) == {"meta": {"a": 1}, "at": "2026-10-18T12:00:00"}
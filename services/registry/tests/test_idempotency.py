@@ -0,0 +1,106 @@
+import threading
+
+import anyio
+import pytest
+
+from fastjson import dumps
+from idempotency import Idempotency, IdempotencyConflict
+
+BODY = {"name": "Eira", "role": "guide"}
+FP = Idempotency.fingerprint(BODY)
+
+class Create:
+    """Stands in for the INSERT: counts runs and hands out ids."""
+
+    def __init__(self, gate: threading.Event = None):
+        self.calls = 0
+        self.gate = gate
+
+    def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return {"id": self.calls}
+
+def test_fingerprint_ignores_key_order():
+    assert Idempotency.fingerprint({"a": 1, "b": 2}) == Idempotency.fingerprint({"b": 2, "a": 1})
+
+def test_retry_replays_the_first_response():
+    idem, create = Idempotency(), Create()
+    assert idem.run("spirit", "k1", FP, create) == ({"id": 1}, False)
+    assert idem.run("spirit", "k1", FP, create) == ({"id": 1}, True)
+    assert create.calls == 1
+
+def test_other_keys_and_scopes_are_independent():
+    idem, create = Idempotency(), Create()
+    idem.run("spirit", "k1", FP, create)
+    idem.run("spirit", "k2", FP, create)
+    idem.run("registry", "k1", FP, create)
+    assert create.calls == 3
+
+def test_same_key_different_body_is_a_conflict():
+    idem = Idempotency()
+    idem.run("spirit", "k1", FP, Create())
+    with pytest.raises(IdempotencyConflict):
+        idem.run("spirit", "k1", Idempotency.fingerprint({**BODY, "role": "scout"}), Create())
+
+def test_failure_releases_the_key():
+    idem = Idempotency()
+
+    def boom():
+        raise RuntimeError("deadlock found")
+
+    with pytest.raises(RuntimeError):
+        idem.run("spirit", "k1", FP, boom)
+    assert idem.run("spirit", "k1", FP, Create()) == ({"id": 1}, False)
+
+def test_concurrent_requests_coalesce_onto_one_write():
+    gate = threading.Event()
+    idem, create = Idempotency(), Create(gate)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(idem.run("spirit", "k1", FP, create)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert create.calls == 1
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 7
+    assert {r["id"] for r, _ in results} == {1}
+
+def test_second_worker_replays_through_redis(fake_redis):
+    worker_a, worker_b, create = Idempotency(fake_redis), Idempotency(fake_redis), Create()
+    worker_a.run("spirit", "k1", FP, create)
+    assert worker_b.run("spirit", "k1", FP, create) == ({"id": 1}, True)
+    assert create.calls == 1
+
+def test_claim_stuck_pending_past_lock_ttl_is_a_conflict(fake_redis):
+    idem = Idempotency(fake_redis, lock_ttl=0, poll=0)
+    fake_redis.set(idem._rkey("spirit", "k1"), dumps({"state": "pending", "fp": FP}))
+    with pytest.raises(IdempotencyConflict, match="still in progress"):
+        idem.run("spirit", "k1", FP, Create())
+
+def test_async_retry_replays_and_coalesces():
+    idem, calls = Idempotency(), []
+
+    async def create():
+        calls.append(1)
+        await anyio.sleep(0.01)
+        return {"id": len(calls)}
+
+    async def main():
+        results = []
+
+        async def one():
+            results.append(await idem.arun("spirit", "k1", FP, create))
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(4):
+                tg.start_soon(one)
+        results.append(await idem.arun("spirit", "k1", FP, create))
+        return results
+
+    results = anyio.run(main)
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 4
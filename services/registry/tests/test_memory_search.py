@@ -0,0 +1,49 @@
+import numpy as np
+
+import memory_search
+from memory_search import MemorySearch, SearchUnavailable
+
+class FixedEmbedder:
+    name, dim = "fixed", 2
+
+    def embed(self, texts):
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+class OneDocIndex:
+    def search(self, vector, limit, nprobe=0):
+        return [(0.5, 0)]
+
+    def doc(self, row):
+        return {"id": "local-0", "title": "Local", "text": "from the local index", "metadata": {"pageid": 1}}
+
+WEAVIATE_HIT = {"id": "w-0", "title": "Remote", "text": "from weaviate", "score": 0.9, "source": None,
+                "pageid": 2, "revid": None, "chunk": 0, "chunks": 1}
+
+def searcher(monkeypatch, weaviate_up):
+    s = MemorySearch(local_index="")
+    s._embedder = FixedEmbedder()
+    s._index = OneDocIndex()
+
+    def graphql(query, vector, mode, alpha, limit):
+        if not weaviate_up[0]:
+            raise SearchUnavailable("weaviate: connection refused")
+        return [dict(WEAVIATE_HIT)]
+
+    monkeypatch.setattr(s, "_graphql", graphql)
+    monkeypatch.setattr(memory_search, "MEMORY_WEAVIATE_RETRY", 0.0)
+    return s
+
+def test_weaviate_results_are_cached(monkeypatch):
+    s = searcher(monkeypatch, [True])
+    hits, meta = s.search("who keeps the archive")
+    assert meta["backend"] == "weaviate" and hits[0]["id"] == "w-0"
+    assert s.search("who keeps the archive")[1] == {"cached": True}
+
+def test_local_fallback_is_not_cached_under_the_weaviate_key(monkeypatch):
+    up = [False]
+    s = searcher(monkeypatch, up)
+    hits, meta = s.search("who keeps the archive")
+    assert meta["backend"] == "local" and hits[0]["id"] == "local-0"
+    up[0] = True
+    hits, meta = s.search("who keeps the archive")
+    assert meta["backend"] == "weaviate" and hits[0]["id"] == "w-0"
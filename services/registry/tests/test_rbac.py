@@ -0,0 +1,90 @@
+import copy
+
+import pytest
+
+from rbac import DEFAULT_POLICY, RBAC, PolicyError, compile_policy
+
+def policy(rules=(), assignments=(), version=1, roles=None):
+    p = copy.deepcopy(DEFAULT_POLICY)
+    p["version"] = version
+    p["rules"] += list(rules)
+    p["assignments"] = list(assignments)
+    if roles is not None:
+        p["roles"] = roles
+    return p
+
+def test_unassigned_subject_named_like_a_role_gets_the_default_role():
+    engine = RBAC(default_role="user")
+    for name in ("owner", "admin"):
+        d = engine.check(name, "delete", "spirit:1")
+        assert not d.allowed
+        assert engine.policy.roles_of(name) == ("user",)
+
+def test_assigned_owner_may_delete_and_admin_may_not():
+    engine = RBAC(default_role="user")
+    engine.swap(policy(assignments=[{"subject": "mel", "role": "owner"}, {"subject": "ash", "role": "admin"}]))
+    assert engine.check("mel", "delete", "spirit:1").allowed
+    assert engine.check("mel", "delete", "spirit:1").role == "owner"
+    assert not engine.check("ash", "delete", "spirit:1").allowed
+    assert engine.check("ash", "configure", "registry:7").allowed
+
+def test_inheritance_and_prefix_matching():
+    compiled = compile_policy(policy(assignments=[{"subject": "g", "role": "reader"},
+                                                  {"subject": "m", "role": "maintainer"}]))
+    assert compiled.decide("g", "view", "spirit:public:3").allowed
+    assert not compiled.decide("g", "view", "spirit:3").allowed
+    # "spirit:*" also covers the bare kind
+    assert compiled.decide("m", "create", "spirit").allowed
+    assert compiled.decide("m", "view", "spirit:3").role == "maintainer"
+    assert not compiled.decide("m", "create", "spiritual").allowed
+
+def test_nothing_matching_is_denied():
+    compiled = compile_policy(policy(), default_role=None)
+    d = compiled.decide("nobody", "view", "spirit:public:1")
+    assert not d.allowed and d.role is None
+
+def test_deny_wins_over_allow_at_any_prefix():
+    rules = [{"role": "maintainer", "action": "*", "resource": "spirit:core:*", "effect": "deny"}]
+    compiled = compile_policy(policy(rules, [{"subject": "m", "role": "maintainer"}]))
+    assert not compiled.decide("m", "update", "spirit:core:1").allowed
+    assert compiled.decide("m", "update", "spirit:2").allowed
+
+def test_deny_in_one_role_wins_over_another_roles_allow():
+    roles = copy.deepcopy(DEFAULT_POLICY["roles"]) + [{"name": "frozen", "inherits": []}]
+    rules = [{"role": "frozen", "action": "update", "resource": "spirit:9", "effect": "deny"}]
+    compiled = compile_policy(policy(rules, [{"subject": "m", "role": "maintainer"},
+                                             {"subject": "m", "role": "frozen"}], roles=roles))
+    d = compiled.decide("m", "update", "spirit:9")
+    assert not d.allowed and d.role == "frozen"
+
+@pytest.mark.parametrize("bad, message", [
+    ({"roles": [{"name": "a", "inherits": ["b"]}, {"name": "b", "inherits": ["a"]}], "rules": []}, "cycle"),
+    ({"roles": [{"name": "a", "inherits": ["ghost"]}], "rules": []}, "unknown role"),
+    ({"roles": [{"name": "a"}], "rules": [{"role": "b", "action": "*", "resource": "*"}]}, "unknown role"),
+    ({"roles": [{"name": "a"}], "rules": [{"role": "a", "action": "*", "resource": "*", "effect": "maybe"}]}, "effect"),
+])
+def test_invalid_policies_are_rejected(bad, message):
+    with pytest.raises(PolicyError, match=message):
+        compile_policy(bad)
+
+def test_swap_never_serves_a_decision_from_the_old_policy():
+    engine = RBAC(default_role="user")
+    assert engine.check("alice", "view", "spirit:1").allowed
+    deny = [{"role": "user", "action": "view", "resource": "spirit:1", "effect": "deny"}]
+    engine.swap(policy(deny, version=2))
+    assert not engine.check("alice", "view", "spirit:1").allowed
+
+def test_check_many_uses_one_policy_snapshot():
+    engine = RBAC(default_role="user")
+    snapshot = engine.policy
+    engine.swap(policy([{"role": "user", "action": "view", "resource": "spirit:1", "effect": "deny"}], version=2))
+    decisions = engine.check_many([("alice", "view", "spirit:1")] * 2, snapshot)
+    assert [d.allowed for d in decisions] == [True, True]
+
+def test_refresh_keeps_the_last_good_policy_on_error():
+    engine = RBAC(default_role="user")
+    engine.refresh(lambda: 3, lambda: {"roles": [{"name": "a", "inherits": ["a"]}], "rules": []})
+    assert engine.policy.version == 0
+    engine.refresh(lambda: 3, lambda: policy(version=3))
+    assert engine.policy.version == 3
+    engine.refresh(lambda: 3, lambda: pytest.fail("same version must not reload"))
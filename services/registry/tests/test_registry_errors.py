@@ -0,0 +1,23 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from registry_core import MYSQL_DUP_ENTRY, insert_registry, registry_name_taken
+
+class DuplicateConn:
+    def execute(self, statement, params=None):
+        raise IntegrityError(str(statement), params, Exception(MYSQL_DUP_ENTRY, "Duplicate entry 'qdrant' for key 'uq_registry_name'"))
+
+def test_duplicate_name_is_a_409():
+    e = registry_name_taken(IntegrityError("INSERT", {}, Exception(1062, "Duplicate entry")), "qdrant")
+    assert e.status_code == 409
+    assert "qdrant" in e.detail
+
+def test_other_integrity_errors_stay_500():
+    e = registry_name_taken(IntegrityError("INSERT", {}, Exception(1048, "Column 'type' cannot be null")), "qdrant")
+    assert e.status_code == 500
+
+def test_insert_registry_raises_409_on_duplicate():
+    with pytest.raises(HTTPException) as info:
+        insert_registry(DuplicateConn(), "qdrant", "vector", None, "none", "active")
+    assert info.value.status_code == 409
@@ -0,0 +1,17 @@
+import pathlib, subprocess, sys
+
+HERE = pathlib.Path(__file__).resolve().parent.parent
+
+def imported_modules(stmt: str) -> set[str]:
+    out = subprocess.run([sys.executable, "-c", f"import sys; {stmt}; print(' '.join(sys.modules))"],
+                         cwd=HERE, capture_output=True, text=True, check=True)
+    return set(out.stdout.split())
+
+def test_registry_core_builds_nothing_on_import():
+    import registry_core
+    assert not hasattr(registry_core, "engine")
+    assert not hasattr(registry_core, "app")
+    assert not hasattr(registry_core, "spirit_cache")
+
+def test_async_app_does_not_import_the_sync_app():
+    assert "app" not in imported_modules("import app_async")
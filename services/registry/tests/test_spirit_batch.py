@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+import registry_core
+from registry_core import insert_spirits_batch, validate_create_items, validate_state_items
+
+class Result:
+    def __init__(self, lastrowid=None, row=None):
+        self.lastrowid = lastrowid
+        self._row = row
+
+    def first(self):
+        return self._row
+
+class FakeConn:
+    """Answers the lock-mode query and hands out auto-increment ids like InnoDB."""
+
+    def __init__(self, lock_mode: int, step: int = 1):
+        self.lock_mode, self.step = lock_mode, step
+        self.next_id = 100
+        self.spirit_inserts = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT @@innodb_autoinc_lock_mode"):
+            return Result(row=(self.lock_mode, self.step))
+        if sql.startswith("INSERT INTO spirits "):
+            self.spirit_inserts += 1
+            first = self.next_id
+            self.next_id += sql.count("CAST(") * self.step
+            return Result(lastrowid=first)
+        return Result()
+
+@pytest.fixture(autouse=True)
+def fresh_autoinc(monkeypatch):
+    monkeypatch.setattr(registry_core, "_autoinc_info", None)
+
+def items(n):
+    results = [None] * n
+    return validate_create_items([{"name": f"s{i}", "role": "scout"} for i in range(n)], results)
+
+def test_consecutive_lock_mode_inserts_the_batch_in_one_statement():
+    conn = FakeConn(lock_mode=1, step=2)
+    assert insert_spirits_batch(conn, items(3)) == [100, 102, 104]
+    assert conn.spirit_inserts == 1
+
+def test_interleaved_lock_mode_falls_back_to_one_insert_per_row_and_warns(caplog):
+    conn = FakeConn(lock_mode=2)
+    with caplog.at_level(logging.WARNING, logger="solace.registry"):
+        assert insert_spirits_batch(conn, items(3)) == [100, 101, 102]
+    assert conn.spirit_inserts == 3
+    assert "innodb_autoinc_lock_mode=1" in caplog.text
+
+def test_state_items_reject_bool_ids():
+    body = [{"id": True, "new_state": "ready"}, {"id": 1, "new_state": "ready"}, {"id": "1", "new_state": "ready"}]
+    results = [None] * len(body)
+    wanted = validate_state_items(body, results)
+    assert [sid for _, sid, _, _ in wanted] == [1]
+    assert results[0]["error"]["code"] == "VALIDATION_FAILED"
+    assert results[2]["error"]["code"] == "VALIDATION_FAILED"
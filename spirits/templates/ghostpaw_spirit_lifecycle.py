@@ -1,30 +1,269 @@
-def initiate_spirit_workflow(action: str, spirit_template: dict, user_inputs: dict):
+# /home/melynxis/solace/spirits/templates/ghostpaw_spirit_lifecycle.py
+"""
+Spirit creation/modification lifecycle, run as a workflow DAG (see
+workflow_engine.py) so many spirits move through it at once:
+
+    session ─────────────────┐
+    expand ──> submit ──> build ──> test (refine -> rebuild -> retest) ──> deploy
+
+Templates are compiled once against the global defaults (template_compiler.py);
+each workflow's expand step only overlays its user inputs.
+
+Builds and test runs are limited resources (SPIRIT_MAX_BUILDS,
+SPIRIT_MAX_TESTS); everything else runs as soon as its inputs are ready.
+Each step and each refine round is checkpointed (SPIRIT_CHECKPOINT_DIR), so
+re-running a workflow that failed in the test/refine loop resumes at its
+last finished round instead of rebuilding from scratch.
+
+The tmux orchestrator, builder, tester and MCP deploy are reached through
+LifecycleServices; local_services() wires in-process stubs for development:
+
+    python ghostpaw_spirit_lifecycle.py --spirits 50 --max-builds 2 --build-delay 0.2
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import argparse, json, os, threading, time, uuid
+
+from template_compiler import CompiledTemplate, TemplateCompiler
+from workflow_engine import CheckpointStore, Step, WorkflowEngine, WorkflowFailed, digest
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_REFINE_ROUNDS = int(os.getenv("SPIRIT_MAX_REFINE_ROUNDS", "3"))
+
+def load_global_config(path: str = os.path.join(TEMPLATE_DIR, "spirit_default_template.json")) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+global_config = load_global_config()
+compiler = TemplateCompiler()
+
+def auto_expand_template(spirit_template: dict, user_inputs: dict, global_config: dict) -> dict:
+    """Global defaults < template < user inputs; nested objects are merged key by key."""
+    return compiler.expand(spirit_template, user_inputs, global_config)
+
+class SpecRejected(Exception):
+    pass
+
+@dataclass
+class LifecycleServices:
+    sessions: Any   # start(action, name) -> dict
+    builder: Any    # submit_spec(spec) -> job_id, build_spirit(job_id, spec) -> dict
+    tester: Any     # run_tests(job_id) -> {"passed": bool, "issues": [...]}
+    refiner: Any    # refine_spec(job_id, spec, issues) -> spec
+    deployer: Any   # deploy_spirit(job_id) -> dict
+
+# -----------------------------
+# Local stubs
+# -----------------------------
+class LocalSessions:
+    def start(self, action: str, name: str) -> dict:
+        return {"session": f"ghostpaw-{name or 'unnamed'}", "action": action}
+
+class LocalBuilder:
+    """Writes the spec as the build artifact (under root, or in memory)."""
+
+    def __init__(self, root: Optional[str] = None, delay: float = 0.0):
+        self.root = root
+        self.delay = delay
+        self._artifacts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def submit_spec(self, spec: dict) -> str:
+        return uuid.uuid4().hex[:12]
+
+    def build_spirit(self, job_id: str, spec: dict) -> dict:
+        time.sleep(self.delay)
+        if self.root:
+            with open(os.path.join(self.root, f"{job_id}.json"), "w", encoding="utf-8") as f:
+                json.dump(spec, f)
+        with self._lock:
+            self._artifacts[job_id] = spec
+        return {"job_id": job_id, "spec_digest": digest(spec)}
+
+    def artifact(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            spec = self._artifacts.get(job_id)
+        if spec is None and self.root and os.path.exists(os.path.join(self.root, f"{job_id}.json")):
+            with open(os.path.join(self.root, f"{job_id}.json"), encoding="utf-8") as f:
+                spec = json.load(f)
+        return spec
+
+class LocalTester:
+    TYPES = ("lore", "hybrid", "mechanical")
+
+    def __init__(self, builder: LocalBuilder, delay: float = 0.0):
+        self.builder = builder
+        self.delay = delay
+
+    def run_tests(self, job_id: str) -> dict:
+        time.sleep(self.delay)
+        spec = self.builder.artifact(job_id)
+        if spec is None:
+            return {"passed": False, "issues": ["no build artifact"]}
+        issues = []
+        if not spec.get("name"):
+            issues.append("name is empty")
+        if spec.get("type") not in self.TYPES:
+            issues.append(f"type must be one of {', '.join(self.TYPES)}")
+        if not spec.get("description"):
+            issues.append("description is empty")
+        if not spec.get("functions"):
+            issues.append("functions is empty")
+        return {"passed": not issues, "issues": issues}
+
+class LocalRefiner:
+    """Fills what the tester complained about with safe defaults."""
+
+    def refine_spec(self, job_id: str, spec: dict, issues: List[str]) -> dict:
+        spec = dict(spec)
+        for issue in issues:
+            if issue.startswith("type"):
+                spec["type"] = "hybrid"
+            elif issue.startswith("description"):
+                spec["description"] = f"{spec.get('name') or 'A spirit'} of Solace"
+            elif issue.startswith("functions"):
+                spec["functions"] = ["conversation"]
+        return spec
+
+class LocalDeployer:
+    def deploy_spirit(self, job_id: str) -> dict:
+        return {"job_id": job_id, "status": "live"}
+
+def local_services(root: Optional[str] = None, build_delay: float = 0.0, test_delay: float = 0.0) -> LifecycleServices:
+    builder = LocalBuilder(root, build_delay)
+    return LifecycleServices(LocalSessions(), builder, LocalTester(builder, test_delay),
+                             LocalRefiner(), LocalDeployer())
+
+# -----------------------------
+# Workflow
+# -----------------------------
+def lifecycle_steps(action: str, template: CompiledTemplate, user_inputs: dict,
+                    services: LifecycleServices, max_rounds: int = MAX_REFINE_ROUNDS) -> List[Step]:
     # action: "create" or "modify"
-    # spirit_template: uploaded or selected (e.g. Eira, Cantrelle)
+    # template: uploaded or selected (e.g. Eira, Cantrelle), compiled with global defaults
     # user_inputs: interactive or API-driven field values
 
-    # Step 1: Kick to tmux orchestrator
-    tmux_orchestrator.start(action)
+    def session(ctx):
+        # Kick to tmux orchestrator
+        return services.sessions.start(action, user_inputs.get("name") or template.base.get("name", ""))
+
+    def expand(ctx):
+        # Generate SPEC from template + user inputs + global defaults
+        return template.expand(user_inputs)
+
+    def submit(ctx):
+        return {"job_id": services.builder.submit_spec(ctx["expand"])}
+
+    def build(ctx):
+        # Builder pulls default template, merges, builds spirit, sets up DB
+        return services.builder.build_spirit(ctx["submit"]["job_id"], ctx["expand"])
+
+    def test(ctx):
+        # Automated tests; a failure is refined, rebuilt and retested
+        job_id, spec = ctx["submit"]["job_id"], ctx["expand"]
+        result = ctx.memo("test.0", lambda: services.tester.run_tests(job_id), resource="test")
+        rounds = 0
+        while not result["passed"]:
+            rounds += 1
+            if rounds > max_rounds:
+                raise SpecRejected(f"still failing after {max_rounds} refine rounds: {'; '.join(result['issues'])}")
+            spec = ctx.memo(f"refine.{rounds}", lambda: services.refiner.refine_spec(job_id, spec, result["issues"]))
+            ctx.memo(f"build.{rounds}", lambda: services.builder.build_spirit(job_id, spec), resource="build")
+            result = ctx.memo(f"test.{rounds}", lambda: services.tester.run_tests(job_id), resource="test")
+        return {"rounds": rounds, "spec": spec}
+
+    def deploy(ctx):
+        # Finalization
+        return services.deployer.deploy_spirit(ctx["submit"]["job_id"])
+
+    return [
+        Step("session", session),
+        Step("expand", expand),
+        Step("submit", submit, after=("expand",)),
+        Step("build", build, after=("expand", "submit", "session"), resource="build"),
+        Step("test", test, after=("submit", "expand", "build")),
+        Step("deploy", deploy, after=("submit", "test")),
+    ]
+
+def default_engine() -> WorkflowEngine:
+    return WorkflowEngine(
+        workers=int(os.getenv("SPIRIT_WORKFLOW_WORKERS", "8")),
+        limits={"build": int(os.getenv("SPIRIT_MAX_BUILDS", "2")), "test": int(os.getenv("SPIRIT_MAX_TESTS", "4"))},
+        checkpoints=CheckpointStore(os.getenv("SPIRIT_CHECKPOINT_DIR") or None),
+    )
 
-    # Step 2: Generate SPEC from template + user inputs + global defaults
-    spec = auto_expand_template(spirit_template, user_inputs, global_config)
+def workflow_id_for(action: str, template: CompiledTemplate, user_inputs: dict) -> str:
+    """Same request, same id: re-submitting it resumes from its checkpoints."""
+    return digest(action, template.version, user_inputs)
 
-    # Step 3: Submit SPEC to Builder
-    builder_job_id = builder.submit_spec(spec)
+def submit_spirit_workflow(engine: WorkflowEngine, action: str, spirit_template: dict | CompiledTemplate,
+                           user_inputs: dict, services: LifecycleServices, workflow_id: Optional[str] = None,
+                           max_rounds: int = MAX_REFINE_ROUNDS):
+    """Start one spirit's workflow; returns (workflow_id, future of {step: result})."""
+    template = (spirit_template if isinstance(spirit_template, CompiledTemplate)
+                else compiler.compile(spirit_template, global_config))
+    workflow_id = workflow_id or workflow_id_for(action, template, user_inputs)
+    steps = lifecycle_steps(action, template, user_inputs, services, max_rounds)
+    # everything the steps close over, so a reused workflow_id with new inputs recomputes
+    inputs = {"action": action, "template": template.version, "user_inputs": user_inputs, "max_rounds": max_rounds}
+    return workflow_id, engine.submit(workflow_id, steps, inputs)
 
-    # Step 4: Builder pulls default template, merges, builds spirit, sets up DB
-    builder.build_spirit(builder_job_id)
+def submit_spirit_workflows(engine: WorkflowEngine, action: str, spirit_template: dict, inputs: List[dict],
+                            services: LifecycleServices, max_rounds: int = MAX_REFINE_ROUNDS):
+    """Many spirits from one template: compiled once, each workflow only overlays its inputs."""
+    template = compiler.compile(spirit_template, global_config)
+    return [submit_spirit_workflow(engine, action, template, user_inputs, services, max_rounds=max_rounds)
+            for user_inputs in inputs]
 
-    # Step 5: Testing phase (automated + user validation)
-    test_result = tester.run_tests(builder_job_id)
+def initiate_spirit_workflow(action: str, spirit_template: dict, user_inputs: dict,
+                             engine: Optional[WorkflowEngine] = None,
+                             services: Optional[LifecycleServices] = None) -> dict:
+    """Run one workflow to completion (blocking); raises WorkflowFailed."""
+    own = engine is None
+    engine = engine or default_engine()
+    try:
+        workflow_id, future = submit_spirit_workflow(engine, action, spirit_template, user_inputs,
+                                                     services or local_services())
+        results = future.result()
+    finally:
+        if own:
+            engine.close()
+    return {"workflow_id": workflow_id, "deploy": results["deploy"], "refine_rounds": results["test"]["rounds"]}
 
-    # Step 6: If test fails, push back into workflow for correction
-    while not test_result.passed:
-        spec = workflow.refine_spec(builder_job_id, test_result.issues)
-        builder.build_spirit(builder_job_id)
-        test_result = tester.run_tests(builder_job_id)
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--spirits", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--max-builds", type=int, default=2)
+    ap.add_argument("--max-tests", type=int, default=4)
+    ap.add_argument("--build-delay", type=float, default=0.1)
+    ap.add_argument("--test-delay", type=float, default=0.05)
+    ap.add_argument("--checkpoints", default=None, help="checkpoint dir (default: in memory)")
+    args = ap.parse_args()
 
-    # Step 7: Finalization
-    mcp.deploy_spirit(builder_job_id)
+    engine = WorkflowEngine(args.workers, {"build": args.max_builds, "test": args.max_tests},
+                            CheckpointStore(args.checkpoints))
+    services = local_services(build_delay=args.build_delay, test_delay=args.test_delay)
+    template = {"type": "hybrid", "functions": ["conversation"]}
+    t0 = time.perf_counter()
+    # every third spirit arrives without a description and needs a refine round
+    inputs = [{"name": f"Spirit{i}", "description": "" if i % 3 == 0 else f"Spirit {i} of the grove"}
+              for i in range(args.spirits)]
+    runs = submit_spirit_workflows(engine, "create", template, inputs, services)
+    failed = 0
+    for workflow_id, future in runs:
+        try:
+            future.result()
+        except WorkflowFailed as e:
+            failed += 1
+            print(e)
+    elapsed = time.perf_counter() - t0
+    print(f"{args.spirits} workflows ({failed} failed) in {elapsed:.2f}s, "
+          f"max {args.max_builds} builds / {args.max_tests} tests at a time")
+    engine.close()
 
-    return "Spirit creation/modification complete and live!"
\ No newline at end of file
+if __name__ == "__main__":
+    main()
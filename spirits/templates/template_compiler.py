@@ -0,0 +1,152 @@
+# /home/melynxis/solace/spirits/templates/template_compiler.py
+"""
+Compiled spirit templates.
+
+compile(template, global_config) merges the template over the global
+defaults once per template version and freezes the result. expand(inputs)
+then only overlays the user inputs: the paths the inputs touch are copied
+and every other subtree is shared with the base, so an expansion costs
+O(size of inputs), not O(size of template + defaults).
+
+expand() caches specs by content address (template version + the inputs
+in canonical form, compared by value and type, so 1, 1.0 and True differ),
+so the same create retried, or modified and refined again with unchanged
+inputs, is a dictionary lookup.
+expand_many() expands N spirits from one template with a single compile
+and one overlay each.
+
+Specs are FrozenDicts: plain dicts for json and isinstance checks, but
+mutation raises. Use thaw() for an editable deep copy.
+"""
+
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+import hashlib, json, threading
+
+def digest(obj) -> str:
+    raw = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+class FrozenDict(dict):
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("compiled spirit specs are read-only; thaw() for an editable copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def __hash__(self):
+        return hash(digest(self))
+
+def freeze(obj):
+    if isinstance(obj, FrozenDict):
+        return obj
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+_NESTED = (dict, list, tuple)
+
+def _scalar(v):
+    # 1, 1.0 and True are equal (and hash alike) in Python but not in a spec
+    return v if type(v) is str else (type(v).__name__, v)
+
+def canonical(obj):
+    """Hashable, order-independent, type-aware form of a JSON-like value (a cache key, not a digest)."""
+    if isinstance(obj, dict):
+        return tuple(sorted([(k, canonical(v) if isinstance(v, _NESTED) else _scalar(v)) for k, v in obj.items()]))
+    if isinstance(obj, (list, tuple)):
+        return ("[", *[canonical(v) if isinstance(v, _NESTED) else _scalar(v) for v in obj])
+    return _scalar(obj)
+
+def thaw(obj):
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [thaw(v) for v in obj]
+    return obj
+
+_set = dict.__setitem__
+
+def overlay(base: FrozenDict, over: dict) -> FrozenDict:
+    """base with over merged in (nested objects key by key); untouched subtrees are shared."""
+    out = FrozenDict(base)
+    for k, v in over.items():
+        if not isinstance(v, _NESTED):
+            _set(out, k, v)
+        elif isinstance(v, dict) and isinstance(base.get(k), dict):
+            _set(out, k, overlay(base[k], v))
+        else:
+            _set(out, k, freeze(v))
+    return out
+
+class CompiledTemplate:
+    def __init__(self, version: str, base: FrozenDict, compiler: "TemplateCompiler"):
+        self.version = version
+        self.base = base
+        self._compiler = compiler
+
+    def expand(self, user_inputs: Optional[dict] = None) -> FrozenDict:
+        if not user_inputs:
+            return self.base
+        return self._compiler._expand(self, canonical(user_inputs), user_inputs)
+
+    def expand_many(self, inputs: Iterable[Optional[dict]]) -> List[FrozenDict]:
+        """
+        Expand a batch against this one base. Inputs in a batch are usually
+        distinct, so they go straight to overlay() without the spec cache
+        (keying them would cost as much as expanding them).
+        """
+        base = self.base
+        return [overlay(base, user_inputs) if user_inputs else base for user_inputs in inputs]
+
+class TemplateCompiler:
+    def __init__(self, max_templates: int = 256, max_specs: int = 10000):
+        self.max_templates = max_templates
+        self.max_specs = max_specs
+        self._templates: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._specs: "OrderedDict[tuple, FrozenDict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"compiles": 0, "template_hits": 0, "spec_hits": 0, "spec_misses": 0}
+
+    def compile(self, template: dict, global_config: dict, version: Optional[str] = None) -> CompiledTemplate:
+        """
+        Merge template over global_config once per version. Pass `version`
+        (e.g. a file hash) to skip hashing the template and config.
+        """
+        version = version or digest([global_config, template])
+        with self._lock:
+            compiled = self._templates.get(version)
+            if compiled is not None:
+                self._templates.move_to_end(version)
+                self.stats["template_hits"] += 1
+                return compiled
+        compiled = CompiledTemplate(version, overlay(freeze(global_config), template), self)
+        with self._lock:
+            self._templates[version] = compiled
+            self.stats["compiles"] += 1
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return compiled
+
+    def expand(self, template: dict, user_inputs: dict, global_config: dict) -> FrozenDict:
+        return self.compile(template, global_config).expand(user_inputs)
+
+    def _expand(self, compiled: CompiledTemplate, inputs_key: tuple, user_inputs: dict) -> FrozenDict:
+        key = (compiled.version, inputs_key)
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is not None:
+                self._specs.move_to_end(key)
+                self.stats["spec_hits"] += 1
+                return spec
+        spec = overlay(compiled.base, user_inputs)
+        with self._lock:
+            self._specs[key] = spec
+            self.stats["spec_misses"] += 1
+            while len(self._specs) > self.max_specs:
+                self._specs.popitem(last=False)
+        return spec
@@ -0,0 +1,4 @@
+import os, sys
+
+# The lifecycle modules import each other as top-level modules (python ghostpaw_spirit_lifecycle.py).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
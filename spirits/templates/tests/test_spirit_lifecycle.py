@@ -0,0 +1,48 @@
+import pytest
+
+from ghostpaw_spirit_lifecycle import (
+    initiate_spirit_workflow, local_services, submit_spirit_workflows, workflow_id_for, compiler,
+)
+from workflow_engine import WorkflowEngine, WorkflowFailed
+
+TEMPLATE = {"type": "hybrid", "functions": ["conversation"]}
+
+def test_missing_description_is_refined_then_deployed():
+    result = initiate_spirit_workflow("create", TEMPLATE, {"name": "Kestrel", "description": ""})
+    assert result["deploy"]["status"] == "live"
+    assert result["refine_rounds"] == 1
+
+def test_unfixable_spec_is_rejected_after_max_rounds():
+    with pytest.raises(WorkflowFailed) as e:
+        initiate_spirit_workflow("create", TEMPLATE, {"name": ""})
+    assert e.value.step == "test"
+
+def test_same_request_gets_the_same_workflow_id():
+    template = compiler.compile(TEMPLATE, {})
+    assert workflow_id_for("create", template, {"name": "A"}) == workflow_id_for("create", template, {"name": "A"})
+    assert workflow_id_for("create", template, {"name": "A"}) != workflow_id_for("modify", template, {"name": "A"})
+
+def test_batch_of_spirits_all_deploy():
+    engine = WorkflowEngine(4, {"build": 2, "test": 2})
+    try:
+        runs = submit_spirit_workflows(engine, "create", TEMPLATE,
+                                       [{"name": f"S{i}", "description": "" if i % 2 else "ok"} for i in range(8)],
+                                       local_services())
+        assert all(f.result(timeout=20)["deploy"]["status"] == "live" for _, f in runs)
+    finally:
+        engine.close()
+
+def test_reused_workflow_id_with_new_inputs_recomputes():
+    from ghostpaw_spirit_lifecycle import submit_spirit_workflow
+
+    engine = WorkflowEngine(2)
+    services = local_services()
+    try:
+        _, first = submit_spirit_workflow(engine, "create", TEMPLATE, {"name": "Kestrel", "description": "old"},
+                                          services, workflow_id="spirit-42")
+        assert first.result(timeout=20)["expand"]["description"] == "old"
+        _, second = submit_spirit_workflow(engine, "create", TEMPLATE, {"name": "Kestrel", "description": "NEW"},
+                                           services, workflow_id="spirit-42")
+        assert second.result(timeout=20)["expand"]["description"] == "NEW"
+    finally:
+        engine.close()
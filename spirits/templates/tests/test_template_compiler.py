@@ -0,0 +1,74 @@
+import pytest
+
+from template_compiler import FrozenDict, TemplateCompiler, canonical, overlay, thaw, freeze
+
+DEFAULTS = {"type": "hybrid", "limits": {"memory": 64, "tokens": 512}, "functions": ["conversation"]}
+TEMPLATE = {"name": "Eira", "limits": {"tokens": 1024}}
+
+def test_compile_merges_template_over_defaults_once():
+    compiler = TemplateCompiler()
+    a = compiler.compile(TEMPLATE, DEFAULTS)
+    b = compiler.compile(dict(TEMPLATE), dict(DEFAULTS))
+    assert a is b
+    assert compiler.stats["compiles"] == 1 and compiler.stats["template_hits"] == 1
+    assert thaw(a.base) == {"type": "hybrid", "name": "Eira", "functions": ["conversation"],
+                            "limits": {"memory": 64, "tokens": 1024}}
+
+def test_expand_overlays_inputs_and_shares_untouched_subtrees():
+    compiled = TemplateCompiler().compile(TEMPLATE, DEFAULTS)
+    spec = compiled.expand({"description": "river spirit", "limits": {"memory": 128}})
+    assert spec["limits"] == {"memory": 128, "tokens": 1024}
+    assert spec["functions"] is compiled.base["functions"]
+    assert compiled.base["limits"]["memory"] == 64
+
+def test_specs_are_read_only():
+    spec = TemplateCompiler().compile(TEMPLATE, DEFAULTS).expand({"name": "Mica"})
+    assert isinstance(spec, FrozenDict)
+    with pytest.raises(TypeError):
+        spec["name"] = "Brume"
+    with pytest.raises(TypeError):
+        spec["limits"].update(memory=1)
+    editable = thaw(spec)
+    editable["limits"]["memory"] = 1
+    assert spec["limits"]["memory"] == 64
+
+def test_expand_cache_is_order_independent():
+    compiler = TemplateCompiler()
+    compiled = compiler.compile(TEMPLATE, DEFAULTS)
+    first = compiled.expand({"a": 1, "b": {"c": [1, 2]}})
+    again = compiled.expand({"b": {"c": [1, 2]}, "a": 1})
+    assert again is first
+    assert compiler.stats["spec_hits"] == 1
+
+@pytest.mark.parametrize("value", [True, 1.0, "1", [1], {"v": 1}, None])
+def test_expand_cache_tells_equal_values_of_different_types_apart(value):
+    compiled = TemplateCompiler().compile(TEMPLATE, DEFAULTS)
+    assert compiled.expand({"x": 1})["x"] == 1
+    spec = compiled.expand({"x": value})
+    assert spec["x"] == freeze(value) and type(spec["x"]) is type(freeze(value))
+
+def test_canonical_is_type_aware():
+    assert canonical({"x": 1}) != canonical({"x": True}) != canonical({"x": 1.0})
+    assert canonical([1]) != canonical([True])
+    assert canonical({}) != canonical([])
+    assert canonical({"a": [1, {"b": 2}]}) == canonical({"a": (1, {"b": 2})})
+
+def test_expand_many_matches_expand():
+    compiled = TemplateCompiler().compile(TEMPLATE, DEFAULTS)
+    inputs = [{"name": f"S{i}", "limits": {"memory": i}} for i in range(5)] + [None]
+    assert [thaw(s) for s in compiled.expand_many(inputs)] == [thaw(compiled.expand(i)) for i in inputs]
+
+def test_overlay_replaces_non_dict_values_wholesale():
+    base = freeze({"functions": ["a", "b"], "limits": {"m": 1}})
+    out = overlay(base, {"functions": ["c"], "limits": 5})
+    assert out["functions"] == ("c",) and out["limits"] == 5
+
+def test_lru_bounds_templates_and_specs():
+    compiler = TemplateCompiler(max_templates=2, max_specs=2)
+    for i in range(3):
+        compiler.compile({"name": str(i)}, DEFAULTS)
+    assert len(compiler._templates) == 2
+    compiled = compiler.compile({"name": "2"}, DEFAULTS)
+    for i in range(3):
+        compiled.expand({"i": i})
+    assert len(compiler._specs) == 2
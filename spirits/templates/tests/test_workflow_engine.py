@@ -0,0 +1,137 @@
+import threading, time
+
+import pytest
+
+from workflow_engine import CheckpointStore, Step, WorkflowEngine, WorkflowFailed
+
+@pytest.fixture
+def engine():
+    engines = []
+
+    def make(workers=4, limits=None, checkpoints=None):
+        e = WorkflowEngine(workers, limits, checkpoints)
+        engines.append(e)
+        return e
+
+    yield make
+    for e in engines:
+        e.close()
+
+def test_steps_run_after_their_dependencies(engine):
+    steps = [
+        Step("a", lambda ctx: 1),
+        Step("b", lambda ctx: ctx["a"] + 1, after=("a",)),
+        Step("c", lambda ctx: ctx["a"] * 10, after=("a",)),
+        Step("d", lambda ctx: ctx["b"] + ctx["c"], after=("b", "c")),
+    ]
+    assert engine().run("w", steps) == {"a": 1, "b": 2, "c": 10, "d": 12}
+
+def test_context_only_exposes_direct_dependencies(engine):
+    steps = [Step("a", lambda ctx: 1), Step("b", lambda ctx: 2, after=("a",)),
+             Step("c", lambda ctx: sorted(ctx.results), after=("b",))]
+    assert engine().run("w", steps)["c"] == ["b"]
+
+def test_empty_workflow_resolves_immediately(engine):
+    assert engine().submit("w", []).result(timeout=1) == {}
+
+@pytest.mark.parametrize("steps, message", [
+    ([Step("a", None), Step("a", None)], "duplicate"),
+    ([Step("a", None, after=("x",))], "unknown"),
+    ([Step("a", None, after=("b",)), Step("b", None, after=("a",))], "cycle"),
+])
+def test_invalid_workflows_are_rejected(engine, steps, message):
+    with pytest.raises(ValueError, match=message):
+        engine().submit("w", steps)
+
+def test_failed_step_fails_the_workflow(engine):
+    def boom(ctx):
+        raise RuntimeError("no")
+    with pytest.raises(WorkflowFailed) as e:
+        engine().run("w", [Step("a", lambda ctx: 1), Step("b", boom, after=("a",))])
+    assert e.value.step == "b" and isinstance(e.value.error, RuntimeError)
+
+def test_resource_limit_is_never_exceeded(engine):
+    lock, current, peak = threading.Lock(), [0], [0]
+
+    def build(ctx):
+        with lock:
+            current[0] += 1
+            peak[0] = max(peak[0], current[0])
+        time.sleep(0.01)
+        with lock:
+            current[0] -= 1
+        return ctx.workflow_id
+
+    e = engine(workers=8, limits={"build": 2})
+    futures = [e.submit(f"w{i}", [Step("build", build, resource="build")]) for i in range(20)]
+    assert [f.result(timeout=10)["build"] for f in futures] == [f"w{i}" for i in range(20)]
+    assert peak[0] == 2
+
+def test_memo_waits_do_not_deadlock_with_queued_steps(engine):
+    """
+    More spirits than threads, each holding a thread in a memo wait for the
+    single build slot while other spirits' build steps are still queued
+    (the ordering that used to deadlock the pool).
+    """
+    def build(ctx):
+        time.sleep(0.001)
+        return 1
+
+    def test(ctx):
+        for i in range(3):
+            ctx.memo(f"build.{i}", lambda: build(ctx), resource="build")
+        return True
+
+    e = engine(workers=2, limits={"build": 1})
+    steps = [Step("build", build, resource="build"), Step("test", test, after=("build",))]
+    futures = [e.submit(f"w{i}", steps) for i in range(12)]
+    for f in futures:
+        assert f.result(timeout=20)["test"] is True
+    assert e.resources.in_use() == {}
+
+def test_resubmit_resumes_from_checkpoints(engine):
+    calls = {"a": 0, "b": 0}
+    fail = [True]
+
+    def a(ctx):
+        calls["a"] += 1
+        return "a"
+
+    def b(ctx):
+        calls["b"] += 1
+        if fail[0]:
+            raise RuntimeError("flaky")
+        return ctx["a"] + "b"
+
+    e = engine(checkpoints=CheckpointStore())
+    steps = [Step("a", a), Step("b", b, after=("a",))]
+    with pytest.raises(WorkflowFailed):
+        e.run("w", steps, {"x": 1})
+    fail[0] = False
+    assert e.run("w", steps, {"x": 1}) == {"a": "a", "b": "ab"}
+    assert calls == {"a": 1, "b": 2}
+    # different inputs: nothing is reused
+    e.run("w", steps, {"x": 2})
+    assert calls == {"a": 2, "b": 3}
+
+def test_memo_rounds_resume_after_a_failure(engine, tmp_path):
+    rounds = []
+    fail_at = [2]
+
+    def loop(ctx):
+        for i in range(4):
+            def work(i=i):
+                rounds.append(i)
+                if i == fail_at[0]:
+                    raise RuntimeError("round failed")
+                return i
+            ctx.memo(f"round.{i}", work)
+        return "done"
+
+    steps = [Step("loop", loop)]
+    with pytest.raises(WorkflowFailed):
+        engine(checkpoints=CheckpointStore(str(tmp_path))).run("w", steps)
+    fail_at[0] = None
+    # a fresh engine over the same directory, as after a restart
+    assert engine(checkpoints=CheckpointStore(str(tmp_path))).run("w", steps) == {"loop": "done"}
+    assert rounds == [0, 1, 2, 2, 3]
@@ -0,0 +1,299 @@
+# /home/melynxis/solace/spirits/templates/workflow_engine.py
+"""
+Small DAG workflow engine for the spirit lifecycle.
+
+A workflow is a list of Steps; a step runs once all of its `after` steps
+have finished and gets their results through its StepContext. Many
+workflows share one thread pool, so independent spirits (and independent
+steps of one spirit) run concurrently. A step naming a `resource` only
+starts while that resource is under its limit (e.g. {"build": 2}); steps
+waiting on a full resource never hold a pool thread, and a slot is only
+taken together with a free thread, so every slot holder is running.
+
+ctx.memo(..., resource=...) is the exception: it runs inside a step, so it
+waits for its slot on that step's worker thread (still counted as busy, so
+the rule above holds and the wait always ends). Spirits parked in a memo
+wait therefore lower the pool's effective parallelism; size `workers`
+above the resource limits by the number of such waits you expect.
+
+Every step result is checkpointed under a digest of the workflow inputs
+and the results it was computed from. Submitting a workflow id again
+(after a crash or a failed step) skips every step whose digest still
+matches and resumes at the first one that doesn't. Steps with an inner
+loop (test -> refine -> rebuild) checkpoint each iteration with
+ctx.memo(), so a resumed loop continues from its last finished round.
+
+Step results must be JSON-serializable.
+"""
+
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib, json, logging, os, tempfile, threading
+
+log = logging.getLogger("ghostpaw.workflow")
+
+def digest(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    fn: Callable[["StepContext"], Any]
+    after: Tuple[str, ...] = ()
+    resource: Optional[str] = None
+
+class WorkflowFailed(Exception):
+    def __init__(self, workflow_id: str, step: str, error: BaseException):
+        super().__init__(f"workflow {workflow_id}: step {step} failed: {error}")
+        self.workflow_id = workflow_id
+        self.step = step
+        self.error = error
+
+# -----------------------------
+# Resources and checkpoints
+# -----------------------------
+class Resources:
+    """Counting limits per resource name; names without a limit are unbounded."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(limits or {})
+        self._used: Dict[str, int] = defaultdict(int)
+        self._cond = threading.Condition()
+
+    def try_acquire(self, name: Optional[str]) -> bool:
+        if name is None or name not in self.limits:
+            return True
+        with self._cond:
+            if self._used[name] >= self.limits[name]:
+                return False
+            self._used[name] += 1
+            return True
+
+    def release(self, name: Optional[str]):
+        if name is None or name not in self.limits:
+            return
+        with self._cond:
+            self._used[name] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def hold(self, name: Optional[str]):
+        """Blocking acquire, for work started from inside a running step."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.try_acquire(name))
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def in_use(self) -> Dict[str, int]:
+        with self._cond:
+            return {k: v for k, v in self._used.items() if v}
+
+class CheckpointStore:
+    """Step results per workflow: one JSON file each under root, or in memory when root is None."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+        self._mem: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, workflow_id: str) -> str:
+        return os.path.join(self.root, f"{workflow_id}.json")
+
+    def load(self, workflow_id: str) -> Dict[str, dict]:
+        with self._lock:
+            if workflow_id not in self._mem and self.root and os.path.exists(self._path(workflow_id)):
+                with open(self._path(workflow_id), encoding="utf-8") as f:
+                    self._mem[workflow_id] = json.load(f)
+            return dict(self._mem.get(workflow_id, {}))
+
+    def save(self, workflow_id: str, key: str, key_digest: str, result):
+        with self._lock:
+            steps = self._mem.setdefault(workflow_id, {})
+            steps[key] = {"digest": key_digest, "result": result}
+            if not self.root:
+                return
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f".{workflow_id}.")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(steps, f, default=str)
+            os.replace(tmp, self._path(workflow_id))
+
+    def clear(self, workflow_id: str):
+        with self._lock:
+            self._mem.pop(workflow_id, None)
+            if self.root and os.path.exists(self._path(workflow_id)):
+                os.remove(self._path(workflow_id))
+
+# -----------------------------
+# Runs
+# -----------------------------
+class StepContext:
+    def __init__(self, engine: "WorkflowEngine", run: "_Run", step: Step, step_digest: str):
+        self.engine = engine
+        self.workflow_id = run.id
+        self.inputs = run.inputs
+        self.results = {name: run.results[name] for name in step.after}
+        self._checkpoints = run.checkpoints
+        self._step = step.name
+        self._digest = step_digest
+
+    def __getitem__(self, name: str):
+        return self.results[name]
+
+    def memo(self, key: str, fn: Callable[[], Any], resource: Optional[str] = None, inputs=None):
+        """
+        Checkpointed sub-step: replayed if this step already ran it with the
+        same inputs. A `resource` slot is waited for on this worker thread.
+        """
+        ck_key, ck_digest = f"{self._step}/{key}", digest(self._digest, key, inputs)
+        hit = self._checkpoints.get(ck_key)
+        if hit is not None and hit["digest"] == ck_digest:
+            return hit["result"]
+        with self.engine.resources.hold(resource):
+            result = fn()
+        self.engine.checkpoints.save(self.workflow_id, ck_key, ck_digest, result)
+        self._checkpoints[ck_key] = {"digest": ck_digest, "result": result}
+        return result
+
+class _Run:
+    def __init__(self, workflow_id: str, steps: List[Step], inputs: dict, checkpoints: Dict[str, dict]):
+        self.id = workflow_id
+        self.steps = {s.name: s for s in steps}
+        self.inputs = inputs
+        self.inputs_digest = digest(inputs)
+        self.checkpoints = checkpoints
+        self.results: Dict[str, Any] = {}
+        self.digests: Dict[str, str] = {}
+        self.waiting = {s.name: len(s.after) for s in steps}
+        self.dependents: Dict[str, List[str]] = defaultdict(list)
+        for s in steps:
+            for dep in s.after:
+                self.dependents[dep].append(s.name)
+        self.resumed: List[str] = []
+        self.failed = False
+        self.future: Future = Future()
+
+def _check_dag(steps: List[Step]):
+    names = [s.name for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate step names")
+    known = set(names)
+    for s in steps:
+        missing = set(s.after) - known
+        if missing:
+            raise ValueError(f"step {s.name} depends on unknown steps {sorted(missing)}")
+    indeg = {s.name: len(s.after) for s in steps}
+    children = defaultdict(list)
+    for s in steps:
+        for dep in s.after:
+            children[dep].append(s.name)
+    queue, seen = deque(n for n, d in indeg.items() if d == 0), 0
+    while queue:
+        n = queue.popleft()
+        seen += 1
+        for c in children[n]:
+            indeg[c] -= 1
+            if indeg[c] == 0:
+                queue.append(c)
+    if seen != len(steps):
+        raise ValueError("workflow steps contain a cycle")
+
+class WorkflowEngine:
+    def __init__(self, workers: int = 8, limits: Optional[Dict[str, int]] = None,
+                 checkpoints: Optional[CheckpointStore] = None):
+        self.resources = Resources(limits)
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="workflow")
+        self._ready: deque = deque()  # (run, step, digest) waiting for a thread or resource slot
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, workflow_id: str, steps: List[Step], inputs: Optional[dict] = None) -> Future:
+        """Start (or resume) a workflow; the future resolves to {step: result} or WorkflowFailed."""
+        _check_dag(steps)
+        run = _Run(workflow_id, steps, inputs or {}, self.checkpoints.load(workflow_id))
+        if not steps:
+            run.future.set_result({})
+            return run.future
+        for step in steps:
+            if not step.after:
+                self._make_ready(run, step)
+        self._dispatch()
+        return run.future
+
+    def run(self, workflow_id: str, steps: List[Step], inputs: Optional[dict] = None) -> Dict[str, Any]:
+        return self.submit(workflow_id, steps, inputs).result()
+
+    def close(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    # -- scheduling --
+    def _make_ready(self, run: _Run, step: Step):
+        step_digest = digest(step.name, run.inputs_digest, [run.digests[d] for d in step.after])
+        hit = run.checkpoints.get(step.name)
+        if hit is not None and hit["digest"] == step_digest:
+            run.resumed.append(step.name)
+            self._complete(run, step, hit["result"])
+            return
+        with self._lock:
+            self._ready.append((run, step, step_digest))
+
+    def _dispatch(self):
+        with self._lock:
+            blocked = deque()
+            while self._ready:
+                run, step, step_digest = self._ready.popleft()
+                if run.failed:
+                    continue
+                if self._running < self.workers and self.resources.try_acquire(step.resource):
+                    self._running += 1
+                    self._pool.submit(self._execute, run, step, step_digest)
+                else:
+                    blocked.append((run, step, step_digest))
+            self._ready = blocked
+
+    def _execute(self, run: _Run, step: Step, step_digest: str):
+        try:
+            result = step.fn(StepContext(self, run, step, step_digest))
+            self.checkpoints.save(run.id, step.name, step_digest, result)
+        except BaseException as e:
+            log.warning("workflow %s: step %s failed: %s", run.id, step.name, e)
+            self._release(step)
+            if not run.failed:
+                run.failed = True
+                run.future.set_exception(WorkflowFailed(run.id, step.name, e))
+            self._dispatch()
+            return
+        self._release(step)
+        self._complete(run, step, result)
+        self._dispatch()
+
+    def _release(self, step: Step):
+        self.resources.release(step.resource)
+        with self._lock:
+            self._running -= 1
+
+    def _complete(self, run: _Run, step: Step, result):
+        with self._lock:
+            run.results[step.name] = result
+            run.digests[step.name] = digest(step.name, result)
+            ready = []
+            for child in run.dependents[step.name]:
+                run.waiting[child] -= 1
+                if run.waiting[child] == 0:
+                    ready.append(run.steps[child])
+            finished = len(run.results) == len(run.steps)
+        for child in ready:
+            self._make_ready(run, child)
+        if finished and not run.failed:
+            if run.resumed:
+                log.info("workflow %s: resumed from checkpoints: %s", run.id, ", ".join(run.resumed))
+            run.future.set_result(dict(run.results))
@@ -0,0 +1,36 @@
+# /home/melynxis/solace/tools/ingest_db_migrate_v1.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+# Per-title state for services/ingest delta refreshes: the revision and
+# content hash last written to Weaviate and how many chunk objects it made.
+echo "[1/2] Creating wiki_ingest_state in ${MYSQL_DB} …"
+docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" <<'SQL'
+CREATE TABLE IF NOT EXISTS wiki_ingest_state (
+  title VARCHAR(255) NOT NULL,
+  pageid BIGINT UNSIGNED NULL,
+  revid BIGINT UNSIGNED NULL,
+  content_hash CHAR(64) NULL,
+  chunks INT UNSIGNED NOT NULL DEFAULT 1,
+  ingested_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (title),
+  KEY idx_wiki_ingest_pageid (pageid)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+SQL
+
+echo "[2/2] Verify …"
+docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" -e "USE ${MYSQL_DB}; SHOW CREATE TABLE wiki_ingest_state\G"
+
+echo "✅ Ingest migration v1 applied."
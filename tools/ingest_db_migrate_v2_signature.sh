@@ -0,0 +1,36 @@
+# /home/melynxis/solace/tools/ingest_db_migrate_v2_signature.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+# The chunking/embedding signature each page was written with. Delta refreshes
+# only skip a page on an unchanged revid when its signature also matches, so
+# switching chunker or embedder rewrites existing pages. Rows from before this
+# migration have no signature and are re-checked once by the next refresh.
+echo "[1/2] Adding wiki_ingest_state.signature if missing …"
+docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" <<'SQL'
+SET @col_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'wiki_ingest_state' AND COLUMN_NAME = 'signature'
+);
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE wiki_ingest_state ADD COLUMN signature VARCHAR(255) NULL AFTER chunks',
+  'SELECT "wiki_ingest_state.signature already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+
+echo "[2/2] Verify …"
+docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" -e "USE ${MYSQL_DB}; SHOW CREATE TABLE wiki_ingest_state\G"
+
+echo "✅ Ingest migration v2 (signature) applied."
@@ -0,0 +1,55 @@
+# /home/melynxis/solace/tools/orchestrator_db_migrate_v1.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+# Ghostpaw check-ins (ORCH_STORE=mysql) upsert registry_services rows by name
+# and track heartbeats in last_checkin (unix seconds). Rows created through the
+# registry API keep last_checkin NULL and are not listed by the orchestrator.
+DUPES=$(mysql_q -e "SELECT COUNT(*) FROM (SELECT name FROM registry_services GROUP BY name HAVING COUNT(*) > 1) d;")
+if [[ "$DUPES" != "0" ]]; then
+  echo "registry_services has $DUPES duplicated names; resolve them before adding the unique key:"
+  mysql_q -e "SELECT name, COUNT(*) FROM registry_services GROUP BY name HAVING COUNT(*) > 1;"
+  exit 1
+fi
+
+echo "[1/2] Adding last_checkin and unique name to registry_services if missing …"
+mysql_q <<'SQL'
+SET @col_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'registry_services' AND COLUMN_NAME = 'last_checkin'
+);
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE registry_services ADD COLUMN last_checkin INT UNSIGNED NULL',
+  'SELECT "last_checkin already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @idx_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'registry_services' AND INDEX_NAME = 'uq_registry_name'
+);
+SET @sql := IF(@idx_exists = 0,
+  'CREATE UNIQUE INDEX uq_registry_name ON registry_services (name)',
+  'SELECT "uq_registry_name already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+
+echo "[2/2] Verify …"
+mysql_q -e "SHOW COLUMNS FROM registry_services LIKE 'last_checkin'; SHOW INDEX FROM registry_services WHERE Key_name = 'uq_registry_name';"
+
+echo "✅ Orchestrator migration v1 applied."
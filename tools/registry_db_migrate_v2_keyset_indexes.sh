@@ -0,0 +1,53 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v2_keyset_indexes.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+# Composite (sort_key, id) indexes backing cursor pagination on GET /spirits and
+# GET /registry. Filtered variants lead with the equality column so
+# "WHERE state=? ORDER BY updated_at, id" is a single index range scan.
+INDEXES=(
+  "spirits idx_spirits_updated_id (updated_at, id)"
+  "spirits idx_spirits_created_id (created_at, id)"
+  "spirits idx_spirits_name_id (name, id)"
+  "spirits idx_spirits_state_updated_id (state, updated_at, id)"
+  "spirits idx_spirits_role_updated_id (role, updated_at, id)"
+  "registry_services idx_registry_updated_id (updated_at, id)"
+  "registry_services idx_registry_created_id (created_at, id)"
+  "registry_services idx_registry_type_updated_id (type, updated_at, id)"
+  "registry_services idx_registry_status_updated_id (status, updated_at, id)"
+)
+
+echo "[1/2] Creating keyset pagination indexes on ${MYSQL_DB} if missing …"
+for spec in "${INDEXES[@]}"; do
+  read -r tbl idx cols <<<"$spec"
+  docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" <<SQL
+SET @idx_exists := (
+  SELECT COUNT(*)
+  FROM INFORMATION_SCHEMA.STATISTICS
+  WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = '${tbl}'
+    AND INDEX_NAME = '${idx}'
+);
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ${idx} ON ${tbl} ${cols}',
+  'SELECT "${idx} already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+done
+
+echo "[2/2] Verify …"
+docker exec -i solace_mysql mysql -uroot -p"${MYSQL_ROOT_PASSWORD}" -e "USE ${MYSQL_DB}; SHOW INDEX FROM spirits WHERE Key_name LIKE 'idx_spirits_%'; SHOW INDEX FROM registry_services WHERE Key_name LIKE 'idx_registry_%';"
+
+echo "✅ Migration v2 (keyset indexes) applied."
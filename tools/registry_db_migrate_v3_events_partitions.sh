@@ -0,0 +1,66 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v3_events_partitions.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+AHEAD_MONTHS="${AHEAD_MONTHS:-3}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+PARTITIONED=$(mysql_q -e "SELECT COUNT(*) FROM INFORMATION_SCHEMA.PARTITIONS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='spirit_events' AND PARTITION_NAME IS NOT NULL;")
+if [[ "$PARTITIONED" != "0" ]]; then
+  echo "spirit_events is already partitioned ($PARTITIONED partitions); use services/registry/events_retention.py for upkeep."
+  exit 0
+fi
+
+# MySQL partitioning rules: no foreign keys on partitioned tables, and every
+# unique key (including the PK) must contain the partitioning column.
+echo "[1/3] Reshaping spirit_events keys for partitioning …"
+mysql_q <<'SQL'
+SET @fk_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'spirit_events'
+    AND CONSTRAINT_NAME = 'fk_spirit_events_spirit'
+);
+SET @sql := IF(@fk_exists = 1,
+  'ALTER TABLE spirit_events DROP FOREIGN KEY fk_spirit_events_spirit',
+  'SELECT "fk already dropped"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+ALTER TABLE spirit_events
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, created_at),
+  ADD KEY idx_spirit_events_spirit_created (spirit_id, created_at, id),
+  ADD KEY idx_spirit_events_created (created_at, id);
+SQL
+
+echo "[2/3] Partitioning spirit_events by month …"
+FIRST=$(mysql_q -e "SELECT DATE_FORMAT(COALESCE(MIN(created_at), NOW()), '%Y-%m-01') FROM spirit_events;")
+LAST=$(date -u -d "$(date -u +%Y-%m-01) +${AHEAD_MONTHS} month" +%Y-%m-01)
+PARTS=""
+m="$FIRST"
+while [[ "$m" < "$LAST" || "$m" == "$LAST" ]]; do
+  next=$(date -u -d "$m +1 month" +%Y-%m-01)
+  PARTS+="PARTITION p$(date -u -d "$m" +%Y%m) VALUES LESS THAN (UNIX_TIMESTAMP('${next} 00:00:00')), "
+  m="$next"
+done
+PARTS+="PARTITION pmax VALUES LESS THAN MAXVALUE"
+mysql_q -e "ALTER TABLE spirit_events PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (${PARTS});"
+
+echo "[3/3] Verify …"
+mysql_q -e "SELECT PARTITION_NAME, TABLE_ROWS FROM INFORMATION_SCHEMA.PARTITIONS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='spirit_events' ORDER BY PARTITION_ORDINAL_POSITION;"
+
+echo "✅ Migration v3 (spirit_events monthly partitions) applied."
@@ -0,0 +1,69 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v4_spirit_search.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+# meta fields searched next to the name by GET /spirits/search
+SEARCH_META_FIELDS="${SEARCH_META_FIELDS:-title description tags aliases}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+# The ngram parser splits text into ngram_token_size-character tokens (server
+# option, default 2), which is what makes substring, prefix and misspelled
+# queries matchable. Bigrams containing a stopword ("a", "i", "in", ...) would
+# be dropped from the index, so stopwords are off for these indexes.
+NGRAM=$(mysql_q -e "SELECT @@ngram_token_size;")
+if [[ "$NGRAM" != "2" ]]; then
+  echo "⚠️  ngram_token_size=$NGRAM; the registry assumes 2 (shorter queries fall back to LIKE)."
+fi
+
+EXPR="name"
+for f in $SEARCH_META_FIELDS; do
+  EXPR+=", JSON_UNQUOTE(JSON_EXTRACT(meta, '\$.${f}'))"
+done
+
+echo "[1/3] Adding spirits.search_text (STORED generated column; rebuilds the table) …"
+mysql_q <<SQL
+SET @col_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'spirits' AND COLUMN_NAME = 'search_text'
+);
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE spirits ADD COLUMN search_text TEXT GENERATED ALWAYS AS (CONCAT_WS('' '', ${EXPR//\'/\'\'})) STORED',
+  'SELECT "search_text already exists; drop it first to change SEARCH_META_FIELDS"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+
+echo "[2/3] Creating ngram FULLTEXT indexes if missing …"
+for spec in "ft_spirits_name (name)" "ft_spirits_search (search_text)"; do
+  read -r idx cols <<<"$spec"
+  mysql_q <<SQL
+SET SESSION innodb_ft_enable_stopword = OFF;
+SET @idx_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'spirits' AND INDEX_NAME = '${idx}'
+);
+SET @sql := IF(@idx_exists = 0,
+  'CREATE FULLTEXT INDEX ${idx} ON spirits ${cols} WITH PARSER ngram',
+  'SELECT "${idx} already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+done
+
+echo "[3/3] Verify …"
+mysql_q -e "SHOW INDEX FROM spirits WHERE Key_name LIKE 'ft_spirits_%';"
+
+echo "✅ Migration v4 (spirit search) applied. Set REGISTRY_SPIRIT_FULLTEXT=1 for the registry."
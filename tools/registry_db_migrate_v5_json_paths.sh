@@ -0,0 +1,68 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v5_json_paths.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+# Promoted JSON paths; must match the registry's REGISTRY_SPIRIT_META_PATHS /
+# REGISTRY_CONFIG_PATHS. Re-run after adding a path; existing ones are skipped.
+REGISTRY_SPIRIT_META_PATHS="${REGISTRY_SPIRIT_META_PATHS:-host,owner,node}"
+REGISTRY_CONFIG_PATHS="${REGISTRY_CONFIG_PATHS:-host,api_url}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+# One VIRTUAL generated column per path (no table rebuild, nothing stored) and
+# a (column, updated_at, id) index, so "?meta.host=X" is an index seek that
+# also serves the default updated_at keyset order. Values are cut to 191
+# characters so an oversized JSON value can never make a write fail.
+promote() {
+  local tbl="$1" json_col="$2" path="$3"
+  [[ "$path" =~ ^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$ ]] || { echo "skip invalid path $path"; return; }
+  local col="${json_col}_${path//./_}"
+  local idx="idx_${tbl%%_*}_${col}"
+  mysql_q <<SQL
+SET @col_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '${tbl}' AND COLUMN_NAME = '${col}'
+);
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE ${tbl} ADD COLUMN ${col} VARCHAR(191) GENERATED ALWAYS AS (LEFT(JSON_UNQUOTE(JSON_EXTRACT(${json_col}, ''\$.${path}'')), 191)) VIRTUAL',
+  'SELECT "${tbl}.${col} already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @idx_exists := (
+  SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '${tbl}' AND INDEX_NAME = '${idx}'
+);
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ${idx} ON ${tbl} (${col}, updated_at, id)',
+  'SELECT "${idx} already exists"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+  echo "  ${tbl}.${col}"
+}
+
+echo "[1/3] Promoting spirits.meta paths: ${REGISTRY_SPIRIT_META_PATHS} …"
+IFS=',' read -ra PATHS <<<"$REGISTRY_SPIRIT_META_PATHS"
+for p in "${PATHS[@]}"; do promote spirits meta "$p"; done
+
+echo "[2/3] Promoting registry_services.config paths: ${REGISTRY_CONFIG_PATHS} …"
+IFS=',' read -ra PATHS <<<"$REGISTRY_CONFIG_PATHS"
+for p in "${PATHS[@]}"; do promote registry_services config "$p"; done
+
+echo "[3/3] Verify …"
+mysql_q -e "SHOW INDEX FROM spirits WHERE Key_name LIKE 'idx_spirits_meta_%'; SHOW INDEX FROM registry_services WHERE Key_name LIKE 'idx_registry_config_%';"
+
+echo "✅ Migration v5 (promoted JSON paths) applied."
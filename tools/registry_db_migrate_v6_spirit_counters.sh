@@ -0,0 +1,59 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v6_spirit_counters.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+# Run with the registry stopped (or with REGISTRY_SPIRIT_COUNTERS unset, which
+# it is by default): the seed below is a snapshot, and writes that land
+# between the seed and REGISTRY_SPIRIT_COUNTERS=1 would be missing from it.
+
+echo "[1/3] Creating counter tables if missing …"
+mysql_q <<SQL
+CREATE TABLE IF NOT EXISTS spirit_counters (
+  state VARCHAR(32) NOT NULL,
+  role  VARCHAR(64) NOT NULL,
+  slot  TINYINT UNSIGNED NOT NULL,
+  n     BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (state, role, slot)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS spirit_transition_counters (
+  bucket     SMALLINT UNSIGNED NOT NULL,
+  prev_state VARCHAR(32) NOT NULL,
+  new_state  VARCHAR(32) NOT NULL,
+  slot       TINYINT UNSIGNED NOT NULL,
+  minute     DATETIME NOT NULL,
+  n          BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, prev_state, new_state, slot),
+  KEY idx_transition_minute (minute)
+) ENGINE=InnoDB;
+SQL
+
+echo "[2/3] Seeding spirit_counters from spirits (only when empty) …"
+mysql_q <<SQL
+SET @seeded := (SELECT COUNT(*) FROM spirit_counters);
+SET @sql := IF(@seeded = 0,
+  'INSERT INTO spirit_counters (state, role, slot, n) SELECT state, role, 0, COUNT(*) FROM spirits GROUP BY state, role',
+  'SELECT "spirit_counters already seeded"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+
+echo "[3/3] Verify …"
+mysql_q -e "SELECT (SELECT COUNT(*) FROM spirits) AS spirits, (SELECT SUM(n) FROM spirit_counters) AS counted;"
+
+echo "✅ Migration v6 (spirit counters) applied. Set REGISTRY_SPIRIT_COUNTERS=1 for the registry."
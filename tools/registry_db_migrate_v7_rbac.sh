@@ -0,0 +1,138 @@
+# /home/melynxis/solace/tools/registry_db_migrate_v7_rbac.sh
+#!/usr/bin/env bash
+set -euo pipefail
+
+BASE="/home/melynxis/solace"
+ENV_FILE="$BASE/.env"
+
+# load MySQL env
+set -a
+# shellcheck disable=SC1090
+source "$ENV_FILE"
+set +a
+
+: "${MYSQL_ROOT_PASSWORD:?Missing in .env}"
+: "${MYSQL_DB:?Missing in .env}"
+
+mysql_q() {
+  docker exec -i solace_mysql mysql -N -uroot -p"${MYSQL_ROOT_PASSWORD}" "${MYSQL_DB}" "$@"
+}
+
+# Policy tables for services/registry/rbac.py. Every change to rbac_roles,
+# rbac_rules or rbac_assignments bumps rbac_policy.version (triggers below);
+# registries with REGISTRY_RBAC_DB=1 poll it and recompile on change.
+
+echo "[1/4] Creating RBAC tables if missing …"
+mysql_q <<SQL
+CREATE TABLE IF NOT EXISTS rbac_policy (
+  id         TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+  version    BIGINT NOT NULL DEFAULT 1,
+  updated_at DATETIME NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS rbac_roles (
+  name        VARCHAR(64) NOT NULL PRIMARY KEY,
+  inherits    VARCHAR(255) NULL,   -- comma-separated role names
+  description VARCHAR(255) NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS rbac_rules (
+  id       BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  role     VARCHAR(64) NOT NULL,
+  action   VARCHAR(64) NOT NULL,    -- or *
+  resource VARCHAR(255) NOT NULL,   -- exact, prefix:* or *
+  effect   ENUM('allow','deny') NOT NULL DEFAULT 'allow',
+  UNIQUE KEY uq_rbac_rule (role, action, resource, effect)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS rbac_assignments (
+  subject VARCHAR(128) NOT NULL,
+  role    VARCHAR(64) NOT NULL,
+  PRIMARY KEY (subject, role),
+  KEY idx_rbac_assignment_role (role)
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO rbac_policy (id, version, updated_at) VALUES (1, 1, UTC_TIMESTAMP());
+SQL
+
+echo "[2/4] Seeding the default policy (only when rbac_rules is empty) …"
+# Mirrors rbac.DEFAULT_POLICY (keep both in sync).
+mysql_q <<SQL
+SET @seeded := (SELECT COUNT(*) FROM rbac_rules);
+SET @sql := IF(@seeded = 0,
+  'INSERT IGNORE INTO rbac_roles (name, inherits, description) VALUES
+  (''reader'', NULL, ''Guest: read-only public spirits, curated memory, registry''),
+  (''user'', ''reader'', ''Contributor: draft spirits, submit memory''),
+  (''maintainer'', ''user'', ''Sub-admin: edit and archive, restart spirits''),
+  (''admin'', ''maintainer'', ''Everything but hard deletes''),
+  (''owner'', ''admin'', ''Full control'')',
+  'SELECT "rbac_roles already seeded"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SET @sql := IF(@seeded = 0,
+  'INSERT IGNORE INTO rbac_rules (role, action, resource, effect) VALUES
+  (''reader'', ''view'', ''spirit:public:*'', ''allow''),
+  (''reader'', ''view'', ''memory:curated:*'', ''allow''),
+  (''reader'', ''view'', ''registry:*'', ''allow''),
+  (''reader'', ''view'', ''health:*'', ''allow''),
+  (''user'', ''view'', ''spirit:*'', ''allow''),
+  (''user'', ''view'', ''memory:*'', ''allow''),
+  (''user'', ''view'', ''metrics:*'', ''allow''),
+  (''user'', ''create'', ''spirit:*'', ''allow''),
+  (''user'', ''create'', ''memory:*'', ''allow''),
+  (''user'', ''create'', ''registry:pending:*'', ''allow''),
+  (''maintainer'', ''update'', ''spirit:*'', ''allow''),
+  (''maintainer'', ''update'', ''memory:*'', ''allow''),
+  (''maintainer'', ''archive'', ''spirit:*'', ''allow''),
+  (''maintainer'', ''archive'', ''memory:*'', ''allow''),
+  (''maintainer'', ''restart'', ''spirit:*'', ''allow''),
+  (''maintainer'', ''create'', ''registry:*'', ''allow''),
+  (''maintainer'', ''update'', ''registry:*'', ''allow''),
+  (''maintainer'', ''view'', ''logs:*'', ''allow''),
+  (''maintainer'', ''assign'', ''role:user'', ''allow''),
+  (''admin'', ''view'', ''*'', ''allow''),
+  (''admin'', ''create'', ''*'', ''allow''),
+  (''admin'', ''update'', ''*'', ''allow''),
+  (''admin'', ''archive'', ''*'', ''allow''),
+  (''admin'', ''restart'', ''*'', ''allow''),
+  (''admin'', ''assign'', ''*'', ''allow''),
+  (''admin'', ''configure'', ''*'', ''allow''),
+  (''owner'', ''*'', ''*'', ''allow'')',
+  'SELECT "rbac_rules already seeded"');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SQL
+
+echo "[3/4] Creating version triggers …"
+mysql_q <<SQL
+DROP TRIGGER IF EXISTS trg_rbac_roles_insert;
+CREATE TRIGGER trg_rbac_roles_insert AFTER INSERT ON rbac_roles FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_roles_update;
+CREATE TRIGGER trg_rbac_roles_update AFTER UPDATE ON rbac_roles FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_roles_delete;
+CREATE TRIGGER trg_rbac_roles_delete AFTER DELETE ON rbac_roles FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_rules_insert;
+CREATE TRIGGER trg_rbac_rules_insert AFTER INSERT ON rbac_rules FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_rules_update;
+CREATE TRIGGER trg_rbac_rules_update AFTER UPDATE ON rbac_rules FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_rules_delete;
+CREATE TRIGGER trg_rbac_rules_delete AFTER DELETE ON rbac_rules FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_assignments_insert;
+CREATE TRIGGER trg_rbac_assignments_insert AFTER INSERT ON rbac_assignments FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_assignments_update;
+CREATE TRIGGER trg_rbac_assignments_update AFTER UPDATE ON rbac_assignments FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+DROP TRIGGER IF EXISTS trg_rbac_assignments_delete;
+CREATE TRIGGER trg_rbac_assignments_delete AFTER DELETE ON rbac_assignments FOR EACH ROW
+  UPDATE rbac_policy SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1;
+SQL
+
+echo "[4/4] Verify …"
+mysql_q -e "SELECT (SELECT version FROM rbac_policy WHERE id=1) AS version, (SELECT COUNT(*) FROM rbac_roles) AS roles, (SELECT COUNT(*) FROM rbac_rules) AS rules, (SELECT COUNT(*) FROM rbac_assignments) AS assignments;"
+
+echo "✅ Migration v7 (rbac policy) applied. Set REGISTRY_RBAC_DB=1 for the registry."